@@ -1,4 +1,9 @@
-from fastapi import Depends, HTTPException, status
+import math
+from typing import Callable
+from fastapi import Depends, HTTPException, Request, status
+from config.settings import settings
+from core.admission import BATCH, INTERACTIVE, AdmissionRejected, current_lane, get_admission_pool, get_rate_limiter
+from core.deadline import start_deadline
 from core.vectorstore import get_vector_store
 from core.embeddings import get_embeddings
 from loguru import logger
@@ -25,4 +30,111 @@ async def get_embeddings_with_error_handling():
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Embeddings service unavailable"
-        )
\ No newline at end of file
+        )
+
+def _too_many_requests(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+def client_id(request: Request) -> str:
+    """Identify the caller for rate limiting: the configured header, else the client address."""
+    header = request.headers.get(settings.RATE_LIMIT_CLIENT_HEADER)
+    if header:
+        return header
+    return request.client.host if request.client else "unknown"
+
+def request_budget(request: Request, lane: str) -> float:
+    """
+    Time budget of a request: the lane's deadline, shortened by the client's deadline header.
+    
+    Args:
+        request: The incoming request
+        lane: INTERACTIVE or BATCH
+        
+    Returns:
+        Budget in seconds; 0 means no deadline
+    """
+    budget = settings.BATCH_DEADLINE_SECONDS if lane == BATCH else settings.INTERACTIVE_DEADLINE_SECONDS
+    try:
+        requested = float(request.headers.get(settings.DEADLINE_HEADER, "0"))
+    except ValueError:
+        requested = 0.0
+    if requested > 0:
+        budget = min(budget, requested) if budget > 0 else requested
+    return budget
+
+def admission(lane: str):
+    """
+    Build a dependency admitting requests into a lane.
+    
+    The request's deadline starts here, so time spent queueing counts
+    against it. The request is checked against the client's rate limit,
+    then holds a slot of the lane's pool until the endpoint returns, or
+    until its stream ends when the endpoint calls hold_admission. Both
+    limits answer 429 with a Retry-After header instead of queueing without
+    bound.
+    
+    Args:
+        lane: INTERACTIVE or BATCH
+        
+    Returns:
+        A FastAPI dependency
+    """
+    async def dependency(request: Request):
+        deadline = start_deadline(request_budget(request, lane))
+        if settings.RATE_LIMIT_ENABLED:
+            retry_after = get_rate_limiter(lane).acquire(client_id(request))
+            if retry_after is not None:
+                logger.warning(f"Rate limit exceeded for {lane} requests from {client_id(request)}")
+                raise _too_many_requests(f"Rate limit exceeded for {lane} requests", retry_after)
+        
+        # Outbound calls made for this request inherit its lane
+        current_lane.set(lane)
+        if not settings.ADMISSION_CONTROL_ENABLED:
+            yield
+            return
+        
+        pool = get_admission_pool(lane)
+        try:
+            await pool.acquire(deadline.remaining() if deadline is not None else None)
+        except AdmissionRejected as e:
+            raise _too_many_requests(str(e), e.retry_after)
+        released = False
+        
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                pool.release()
+        
+        request.state.release_admission = release
+        try:
+            yield
+        finally:
+            if not getattr(request.state, "admission_held", False):
+                release()
+    
+    return dependency
+
+def hold_admission(request: Request) -> Callable[[], None]:
+    """
+    Keep the request's admission slot after the endpoint returns.
+    
+    Dependencies exit before a streamed body is sent, so streaming endpoints
+    take over the slot and release it when the stream ends.
+    
+    Args:
+        request: The incoming request
+        
+    Returns:
+        A function releasing the slot; calling it more than once is harmless
+    """
+    request.state.admission_held = True
+    return getattr(request.state, "release_admission", lambda: None)
+
+admit_interactive = admission(INTERACTIVE)
+admit_batch = admission(BATCH)
+
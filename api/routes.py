@@ -1,19 +1,34 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Request
-from fastapi.responses import JSONResponse
-from langchain_pinecone import PineconeVectorStore
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import TYPE_CHECKING
 import time
 from loguru import logger
 
 from api.schemas import (
     CrawlRequest, CrawlResponse,
+    CrawlBatchRequest, CrawlBatchResponse,
+    CrawlJobResponse,
+    ReindexRequest,
+    MaintenanceResponse,
     QueryRequest, QueryResponse,
+    QueryBatchRequest, QueryBatchResponse,
     ChatRequest, ChatResponse,
+    SessionMessagesResponse,
     ErrorResponse
 )
-from api.dependencies import get_vector_store_with_error_handling
-from services.crawl_service import process_crawl
-from services.query_service import process_query
-from services.chat_service import process_chat
+from api.dependencies import admit_batch, admit_interactive, get_vector_store_with_error_handling, hold_admission
+from config.settings import settings
+from core.lifecycle import lifecycle
+from services.crawl_service import get_crawl_job, process_crawl, process_crawl_batch, reindex_from_snapshots, submit_crawl_job
+from services.maintenance_service import run_maintenance
+from services.query_service import process_query, process_query_batch
+from services.chat_service import process_chat, process_chat_stream
+from services.session_service import get_session_messages
+from utils.logging_utils import preview
+
+if TYPE_CHECKING:
+    from langchain_pinecone import PineconeVectorStore
 
 # Create router
 api_router = APIRouter(prefix="/api")
@@ -21,7 +36,9 @@ api_router = APIRouter(prefix="/api")
 @api_router.post(
     "/crawl", 
     response_model=CrawlResponse, 
+    dependencies=[Depends(admit_batch)],
     responses={
+        429: {"model": ErrorResponse, "description": "Too Many Requests"},
         500: {"model": ErrorResponse, "description": "Internal Server Error"},
         503: {"model": ErrorResponse, "description": "Service Unavailable"}
     }
@@ -40,7 +57,9 @@ async def crawl_endpoint(request: CrawlRequest):
     start_time = time.time()
     
     try:
-        result = await process_crawl(str(request.url))
+        # Tracked so that graceful shutdown waits for the crawl to finish
+        async with lifecycle.track("crawl"):
+            result = await process_crawl(str(request.url))
         
         elapsed_time = time.time() - start_time
         logger.info(f"Crawl completed in {elapsed_time:.2f}s: {result.chunk_count} chunks, {result.indexed_count} indexed")
@@ -53,17 +72,195 @@ async def crawl_endpoint(request: CrawlRequest):
             detail=f"Crawling failed: {str(e)}"
         )
 
+@api_router.post(
+    "/crawl/batch", 
+    response_model=CrawlBatchResponse, 
+    dependencies=[Depends(admit_batch)],
+    responses={
+        429: {"model": ErrorResponse, "description": "Too Many Requests"},
+        500: {"model": ErrorResponse, "description": "Internal Server Error"},
+        503: {"model": ErrorResponse, "description": "Service Unavailable"}
+    }
+)
+async def crawl_batch_endpoint(request: CrawlBatchRequest):
+    """
+    Crawl a list of URLs or the pages of a sitemap and index their content.
+    
+    Args:
+        request: The batch crawl request containing URLs and/or a sitemap URL
+        
+    Returns:
+        Per-URL crawl results with aggregated totals
+    """
+    logger.info(f"Batch crawl request received: {len(request.urls or [])} URLs, sitemap: {request.sitemap_url}")
+    start_time = time.time()
+    
+    try:
+        async with lifecycle.track("crawl_batch"):
+            result = await process_crawl_batch(
+                urls=[str(url) for url in request.urls or []],
+                sitemap_url=str(request.sitemap_url) if request.sitemap_url else None,
+                max_pages=request.max_pages
+            )
+        
+        elapsed_time = time.time() - start_time
+        logger.info(f"Batch crawl completed in {elapsed_time:.2f}s: {result.succeeded}/{result.total_urls} URLs, {result.indexed_count} chunks indexed")
+        
+        return result
+    except Exception as e:
+        logger.error(f"Error during batch crawl operation: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch crawling failed: {str(e)}"
+        )
+
+@api_router.post(
+    "/crawl/jobs", 
+    response_model=CrawlJobResponse, 
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(admit_batch)],
+    responses={
+        429: {"model": ErrorResponse, "description": "Too Many Requests"},
+        500: {"model": ErrorResponse, "description": "Internal Server Error"}
+    }
+)
+async def crawl_job_endpoint(request: CrawlBatchRequest):
+    """
+    Start a batch crawl in the background.
+    
+    Poll GET /api/crawl/jobs/{job_id} for progress and the final results.
+    
+    Args:
+        request: The batch crawl request containing URLs and/or a sitemap URL
+        
+    Returns:
+        The queued job
+    """
+    logger.info(f"Crawl job request received: {len(request.urls or [])} URLs, sitemap: {request.sitemap_url}")
+    try:
+        return await submit_crawl_job(
+            urls=[str(url) for url in request.urls or []],
+            sitemap_url=str(request.sitemap_url) if request.sitemap_url else None,
+            max_pages=request.max_pages
+        )
+    except Exception as e:
+        logger.error(f"Error submitting crawl job: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Crawl job submission failed: {str(e)}"
+        )
+
+@api_router.get(
+    "/crawl/jobs/{job_id}", 
+    response_model=CrawlJobResponse, 
+    responses={
+        404: {"model": ErrorResponse, "description": "Not Found"}
+    }
+)
+async def crawl_job_status_endpoint(job_id: str):
+    """
+    Get the status and progress of a crawl job.
+    
+    Args:
+        job_id: The id returned when the job was submitted
+        
+    Returns:
+        The job's status, progress and, once finished, its results
+    """
+    job = await get_crawl_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown crawl job: {job_id}"
+        )
+    return job
+
+@api_router.post(
+    "/reindex", 
+    response_model=CrawlBatchResponse, 
+    dependencies=[Depends(admit_batch)],
+    responses={
+        429: {"model": ErrorResponse, "description": "Too Many Requests"},
+        500: {"model": ErrorResponse, "description": "Internal Server Error"},
+        503: {"model": ErrorResponse, "description": "Service Unavailable"}
+    }
+)
+async def reindex_endpoint(request: ReindexRequest):
+    """
+    Re-run chunking, preprocessing and indexing over stored page snapshots.
+    
+    Args:
+        request: The reindex request with optional URLs to limit the run to
+        
+    Returns:
+        Per-URL reindex results with aggregated totals
+    """
+    logger.info(f"Reindex request received for {len(request.urls) if request.urls else 'all'} URLs")
+    start_time = time.time()
+    
+    try:
+        async with lifecycle.track("reindex"):
+            result = await reindex_from_snapshots([str(url) for url in request.urls] if request.urls else None)
+        
+        elapsed_time = time.time() - start_time
+        logger.info(f"Reindex completed in {elapsed_time:.2f}s: {result.succeeded}/{result.total_urls} URLs, {result.indexed_count} chunks indexed")
+        
+        return result
+    except Exception as e:
+        logger.error(f"Error during reindex operation: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Reindexing failed: {str(e)}"
+        )
+
+@api_router.post(
+    "/maintenance", 
+    response_model=MaintenanceResponse, 
+    dependencies=[Depends(admit_batch)],
+    responses={
+        429: {"model": ErrorResponse, "description": "Too Many Requests"},
+        500: {"model": ErrorResponse, "description": "Internal Server Error"},
+        503: {"model": ErrorResponse, "description": "Service Unavailable"}
+    }
+)
+async def maintenance_endpoint():
+    """
+    Expire stale chunks and compact the indexes.
+    
+    Returns:
+        Counts of expired references, deleted chunks and compacted bytes
+    """
+    logger.info("Index maintenance request received")
+    start_time = time.time()
+    
+    try:
+        async with lifecycle.track("maintenance"):
+            result = await run_maintenance()
+        
+        elapsed_time = time.time() - start_time
+        logger.info(f"Index maintenance completed in {elapsed_time:.2f}s: {result.deleted_chunks} chunks deleted")
+        
+        return result
+    except Exception as e:
+        logger.error(f"Error during index maintenance: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Index maintenance failed: {str(e)}"
+        )
+
 @api_router.post(
     "/query", 
     response_model=QueryResponse,
+    dependencies=[Depends(admit_interactive)],
     responses={
+        429: {"model": ErrorResponse, "description": "Too Many Requests"},
         500: {"model": ErrorResponse, "description": "Internal Server Error"},
         503: {"model": ErrorResponse, "description": "Service Unavailable"}
     }
 )
 async def query_endpoint(
     request: QueryRequest, 
-    vector_store: PineconeVectorStore = Depends(get_vector_store_with_error_handling)
+    vector_store: "PineconeVectorStore" = Depends(get_vector_store_with_error_handling)
 ):
     """
     Query the vector store for relevant documents.
@@ -75,11 +272,11 @@ async def query_endpoint(
     Returns:
         Query results containing matching documents
     """
-    logger.info(f"Query request received: '{request.query}'")
+    logger.info(f"Query request received: '{preview(request.query)}'")
     start_time = time.time()
     
     try:
-        result = await process_query(request.query, vector_store)
+        result = await process_query(request.query, vector_store, request.namespaces)
         
         elapsed_time = time.time() - start_time
         logger.info(f"Query completed in {elapsed_time:.2f}s: {len(result.results)} results found")
@@ -92,17 +289,68 @@ async def query_endpoint(
             detail=f"Query failed: {str(e)}"
         )
 
+@api_router.post(
+    "/query/batch", 
+    response_model=QueryBatchResponse,
+    dependencies=[Depends(admit_batch)],
+    responses={
+        400: {"model": ErrorResponse, "description": "Too many queries"},
+        429: {"model": ErrorResponse, "description": "Too Many Requests"},
+        500: {"model": ErrorResponse, "description": "Internal Server Error"},
+        503: {"model": ErrorResponse, "description": "Service Unavailable"}
+    }
+)
+async def query_batch_endpoint(
+    request: QueryBatchRequest, 
+    vector_store: "PineconeVectorStore" = Depends(get_vector_store_with_error_handling)
+):
+    """
+    Query the vector store for many queries in one request.
+    
+    Args:
+        request: The batch query request containing the search queries
+        vector_store: The vector store to search in (injected dependency)
+        
+    Returns:
+        Per-query results with similarity scores, in request order
+    """
+    if len(request.queries) > settings.QUERY_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.QUERY_BATCH_MAX_SIZE} queries are allowed per batch, got {len(request.queries)}"
+        )
+    
+    logger.info(f"Batch query request received for {len(request.queries)} queries")
+    start_time = time.time()
+    
+    try:
+        async with lifecycle.track("query_batch"):
+            result = await process_query_batch(request.queries, vector_store, request.namespaces)
+        
+        elapsed_time = time.time() - start_time
+        logger.info(f"Batch query completed in {elapsed_time:.2f}s for {len(request.queries)} queries")
+        
+        return result
+    except Exception as e:
+        logger.error(f"Error during batch query operation: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch query failed: {str(e)}"
+        )
+
 @api_router.post(
     "/chat", 
     response_model=ChatResponse,
+    dependencies=[Depends(admit_interactive)],
     responses={
+        429: {"model": ErrorResponse, "description": "Too Many Requests"},
         500: {"model": ErrorResponse, "description": "Internal Server Error"},
         503: {"model": ErrorResponse, "description": "Service Unavailable"}
     }
 )
 async def chat_endpoint(
     request: ChatRequest, 
-    vector_store: PineconeVectorStore = Depends(get_vector_store_with_error_handling)
+    vector_store: "PineconeVectorStore" = Depends(get_vector_store_with_error_handling)
 ):
     """
     Chat with the RAG-enhanced assistant.
@@ -114,7 +362,7 @@ async def chat_endpoint(
     Returns:
         The assistant's response based on retrieved documents and conversation context
     """
-    logger.info(f"Chat request received: '{request.message}'")
+    logger.info(f"Chat request received: '{preview(request.message)}'")
     start_time = time.time()
     
     try:
@@ -129,4 +377,83 @@ async def chat_endpoint(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Chat processing failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@api_router.post(
+    "/chat/stream", 
+    dependencies=[Depends(admit_interactive)],
+    responses={
+        200: {"content": {"application/x-ndjson": {}}, "description": "One ChatStreamEvent per line"},
+        429: {"model": ErrorResponse, "description": "Too Many Requests"},
+        503: {"model": ErrorResponse, "description": "Service Unavailable"}
+    }
+)
+async def chat_stream_endpoint(
+    request: ChatRequest, 
+    http_request: Request,
+    vector_store: "PineconeVectorStore" = Depends(get_vector_store_with_error_handling)
+):
+    """
+    Chat with the RAG-enhanced assistant, streaming the answer as it is generated.
+    
+    The body is newline-delimited JSON: delta events with pieces of the
+    answer, then a done event with the response metadata.
+    
+    Args:
+        request: The chat request containing the user message and optional conversation history
+        http_request: The raw request, whose admission slot is held until the stream ends
+        vector_store: The vector store to search in (injected dependency)
+        
+    Returns:
+        A streaming response of ChatStreamEvent lines
+    """
+    logger.info(f"Streamed chat request received: '{preview(request.message)}'")
+    release_admission = hold_admission(http_request)
+    
+    async def events():
+        start_time = time.time()
+        try:
+            # Tracked so that graceful shutdown lets the stream finish
+            async with lifecycle.track("chat_stream"):
+                async for event in process_chat_stream(request, vector_store):
+                    yield event.model_dump_json() + "\n"
+            logger.info(f"Streamed chat completed in {time.time() - start_time:.2f}s")
+        finally:
+            release_admission()
+    
+    # The background task also releases the slot if the client leaves before the stream starts
+    return StreamingResponse(events(), media_type="application/x-ndjson", background=BackgroundTask(release_admission))
+
+@api_router.get(
+    "/chat/sessions/{session_id}/messages",
+    response_model=SessionMessagesResponse,
+    responses={
+        500: {"model": ErrorResponse, "description": "Internal Server Error"}
+    }
+)
+async def session_messages_endpoint(
+    session_id: str,
+    offset: int = Query(0, ge=0, description="Number of messages to skip"),
+    limit: int = Query(20, ge=1, le=settings.SESSION_PAGE_MAX_SIZE, description="Maximum number of messages to return")
+):
+    """
+    Get a page of a chat session's stored messages, oldest first.
+    
+    Unknown sessions return an empty page.
+    
+    Args:
+        session_id: The session id the client sends with its chat requests
+        offset: Number of messages to skip
+        limit: Maximum number of messages to return
+        
+    Returns:
+        The page of messages, the session's total and its rolling summary
+    """
+    try:
+        return await get_session_messages(session_id, offset, limit)
+    except Exception as e:
+        logger.error(f"Error reading chat session {session_id}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Reading chat session failed: {str(e)}"
+        )
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, HttpUrl
-from typing import List, Optional
+from pydantic import BaseModel, Field, HttpUrl, model_validator
+from typing import Any, Dict, List, Optional
 
 class CrawlRequest(BaseModel):
     """Request model for the crawl endpoint."""
@@ -11,16 +11,96 @@ class CrawlResponse(BaseModel):
     chunk_count: int = Field(..., description="Number of text chunks extracted")
     processed_count: int = Field(..., description="Number of relevant text chunks after preprocessing")
     indexed_count: int = Field(..., description="Number of chunks successfully indexed")
+    skipped_count: int = Field(0, description="Number of chunks discarded by the local relevance pre-filter")
+    fast_tracked_count: int = Field(0, description="Number of chunks indexed without LLM preprocessing")
+    bytes_removed: int = Field(0, description="Bytes of boilerplate stripped by main-content extraction")
+    stage_stats: Optional[Dict[str, Dict[str, float]]] = Field(None, description="Per-stage ingest pipeline throughput")
+
+class CrawlBatchRequest(BaseModel):
+    """Request model for the batch crawl endpoint."""
+    urls: Optional[List[HttpUrl]] = Field(default=None, description="URLs to crawl")
+    sitemap_url: Optional[HttpUrl] = Field(default=None, description="sitemap.xml whose pages should be crawled")
+    max_pages: Optional[int] = Field(default=None, ge=1, description="Upper bound on pages crawled (capped by the server limit)")
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if not self.urls and self.sitemap_url is None:
+            raise ValueError("Either urls or sitemap_url must be provided")
+        return self
+
+class CrawlBatchItem(BaseModel):
+    """Outcome of crawling a single URL within a batch."""
+    url: str = Field(..., description="URL that was crawled")
+    success: bool = Field(..., description="Whether the URL was crawled and indexed")
+    chunk_count: int = Field(0, description="Number of text chunks extracted")
+    processed_count: int = Field(0, description="Number of relevant text chunks after preprocessing")
+    indexed_count: int = Field(0, description="Number of chunks successfully indexed")
+    skipped_count: int = Field(0, description="Number of chunks discarded by the local relevance pre-filter")
+    fast_tracked_count: int = Field(0, description="Number of chunks indexed without LLM preprocessing")
+    bytes_removed: int = Field(0, description="Bytes of boilerplate stripped by main-content extraction")
+    error: Optional[str] = Field(None, description="Error message if the URL failed")
+
+class CrawlBatchResponse(BaseModel):
+    """Response model for the batch crawl endpoint."""
+    results: List[CrawlBatchItem] = Field(..., description="Per-URL results in request order")
+    total_urls: int = Field(..., description="Number of URLs crawled")
+    succeeded: int = Field(..., description="Number of URLs crawled and indexed successfully")
+    failed: int = Field(..., description="Number of URLs that failed")
+    indexed_count: int = Field(..., description="Total number of chunks indexed across all URLs")
+    stage_stats: Optional[Dict[str, Dict[str, float]]] = Field(None, description="Per-stage ingest pipeline throughput")
+
+class CrawlJobResponse(BaseModel):
+    """Status of a background crawl job."""
+    job_id: str = Field(..., description="Job identifier to poll")
+    status: str = Field(..., description="queued, running, succeeded or failed")
+    total_urls: int = Field(0, description="Number of URLs to crawl, known once the job has resolved its URL list")
+    pages_done: int = Field(0, description="Number of pages fetched so far, successfully or not")
+    indexed_count: int = Field(0, description="Number of chunks indexed so far")
+    created_at: float = Field(..., description="Submission time as epoch seconds")
+    updated_at: float = Field(..., description="Last progress update as epoch seconds")
+    result: Optional[CrawlBatchResponse] = Field(None, description="Per-URL results once the job has succeeded")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+
+class ReindexRequest(BaseModel):
+    """Request model for the reindex-from-snapshots endpoint."""
+    urls: Optional[List[HttpUrl]] = Field(default=None, description="URLs to reindex; all snapshotted URLs when omitted")
+
+class MaintenanceResponse(BaseModel):
+    """Response model for the index maintenance endpoint."""
+    expired_references: int = Field(..., description="Chunk references dropped because their source was re-crawled or exceeded the TTL")
+    deleted_chunks: int = Field(..., description="Chunks deleted from the vector store and lexical index")
+    deleted_by_namespace: Dict[str, int] = Field(default_factory=dict, description="Deleted chunks per namespace")
+    failed_namespaces: List[str] = Field(default_factory=list, description="Namespaces whose deletes failed and will be retried on the next run")
+    lexical_bytes_before: int = Field(0, description="Lexical index log size before compaction")
+    lexical_bytes_after: int = Field(0, description="Lexical index log size after compaction")
+    pruned_snapshots: int = Field(0, description="Page snapshots dropped beyond the newest SNAPSHOT_KEEP_VERSIONS per URL")
+    expired_sessions: int = Field(0, description="Chat sessions dropped after SESSION_RETENTION_DAYS without activity")
 
 class QueryRequest(BaseModel):
     """Request model for the query endpoint."""
     query: str = Field(..., min_length=1, description="Query string to search for similar documents")
+    namespaces: Optional[List[str]] = Field(default=None, description="Only search these namespaces (site hosts); all when omitted")
 
 class QueryResponse(BaseModel):
     """Response model for the query endpoint."""
     query: str = Field(..., description="Original query string")
     results: List[str] = Field(..., description="List of retrieved text chunks")
 
+class QueryBatchRequest(BaseModel):
+    """Request model for the batch query endpoint."""
+    queries: List[str] = Field(..., min_length=1, description="Query strings, searched independently")
+    namespaces: Optional[List[str]] = Field(default=None, description="Only search these namespaces (site hosts); all when omitted")
+
+class QueryBatchItem(BaseModel):
+    """Results of one query within a batch."""
+    query: str = Field(..., description="Original query string")
+    results: List[str] = Field(..., description="List of retrieved text chunks, best first")
+    scores: List[float] = Field(..., description="Similarity score of each retrieved chunk")
+
+class QueryBatchResponse(BaseModel):
+    """Response model for the batch query endpoint."""
+    results: List[QueryBatchItem] = Field(..., description="Per-query results in request order")
+
 class ConversationItem(BaseModel):
     """Model for a single conversation message."""
     role: str = Field(..., description="Role of the message sender (user or assistant)")
@@ -33,10 +113,35 @@ class ChatRequest(BaseModel):
         default=None, 
         description="Previous conversation history"
     )
+    namespaces: Optional[List[str]] = Field(default=None, description="Only retrieve from these namespaces (site hosts); all when omitted")
+    session_id: Optional[str] = Field(
+        default=None,
+        max_length=128,
+        description="Server-side session holding the conversation; history and summary are loaded from it and the turn is stored in it"
+    )
+    memory_data: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Summary of earlier conversation; filled from the session when session_id is given"
+    )
 
 class ChatResponse(BaseModel):
     """Response model for the chat endpoint."""
     response: str = Field(..., description="Assistant's response")
+    metadata: Optional[Dict[str, Any]] = Field(default=None, description="Pipeline details, including any degradations applied to meet the request deadline")
+
+class SessionMessagesResponse(BaseModel):
+    """A page of a chat session's messages."""
+    session_id: str = Field(..., description="The session id")
+    total: int = Field(..., description="Number of messages in the session")
+    offset: int = Field(..., description="Number of messages skipped before this page")
+    summary: str = Field("", description="Rolling summary of the messages that have left the history window")
+    messages: List[ConversationItem] = Field(..., description="Messages of this page, oldest first")
+
+class ChatStreamEvent(BaseModel):
+    """One line of a streamed chat response."""
+    type: str = Field(..., description="delta for a piece of the answer, done for the final event")
+    content: str = Field("", description="Text to append to the answer; a done event carries the whole answer when it was not generated token by token")
+    metadata: Optional[Dict[str, Any]] = Field(default=None, description="Pipeline details (done event)")
 
 class ErrorResponse(BaseModel):
     """Standard error response model."""
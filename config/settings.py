@@ -18,19 +18,143 @@ class Settings(BaseSettings):
     # LLM Models
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "models/text-embedding-004")
     LLM_MODEL: str = os.getenv("LLM_MODEL", "gemini-1.5-pro")
+    LLM_FAST_MODEL: str = os.getenv("LLM_FAST_MODEL", "gemini-1.5-flash")
+    LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "google")
+    
+    # LLM Routing: model profile ("fast" or "quality") per pipeline stage
+    LLM_PROFILE_INTENT: str = os.getenv("LLM_PROFILE_INTENT", "fast")
+    LLM_PROFILE_PREPROCESS: str = os.getenv("LLM_PROFILE_PREPROCESS", "fast")
+    LLM_PROFILE_FILTER: str = os.getenv("LLM_PROFILE_FILTER", "quality")
+    LLM_PROFILE_RAG: str = os.getenv("LLM_PROFILE_RAG", "quality")
+    LLM_PROFILE_SUMMARY: str = os.getenv("LLM_PROFILE_SUMMARY", "fast")
+    LLM_FAST_FALLBACK: str = os.getenv("LLM_FAST_FALLBACK", "quality")
+    LLM_QUALITY_FALLBACK: str = os.getenv("LLM_QUALITY_FALLBACK", "fast")
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "30"))
+    
+    # LLM Hedged Requests
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "True").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    LLM_HEDGE_MIN_DELAY: float = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5"))
+    LLM_HEDGE_DEFAULT_DELAY: float = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "5"))
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_HEDGE_WINDOW: int = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+    
+    # Fake LLM provider (LLM_PROVIDER=fake) for local testing
+    FAKE_LLM_LATENCY_MS: float = float(os.getenv("FAKE_LLM_LATENCY_MS", "50"))
+    FAKE_LLM_ERROR_RATE: float = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+    
+    # Query Embeddings
+    QUERY_EMBEDDING_CACHE_SIZE: int = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+    QUERY_EMBEDDING_BATCH_WINDOW_MS: float = float(os.getenv("QUERY_EMBEDDING_BATCH_WINDOW_MS", "10"))
+    QUERY_EMBEDDING_MAX_BATCH: int = int(os.getenv("QUERY_EMBEDDING_MAX_BATCH", "64"))
+    
+    # Crawling
+    CRAWL_HTTP_FIRST: bool = os.getenv("CRAWL_HTTP_FIRST", "True").lower() == "true"
+    CRAWL_USER_AGENT: str = os.getenv("CRAWL_USER_AGENT", "Mozilla/5.0 (compatible; RAGCrawler/1.0)")
+    CRAWL_BLOCK_RESOURCES: str = os.getenv("CRAWL_BLOCK_RESOURCES", "image,font,media")
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "15"))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+    HTTP_MIN_TEXT_CHARS: int = int(os.getenv("HTTP_MIN_TEXT_CHARS", "200"))
+    CRAWL_CONCURRENCY: int = int(os.getenv("CRAWL_CONCURRENCY", "4"))
+    CRAWL_BATCH_MAX_PAGES: int = int(os.getenv("CRAWL_BATCH_MAX_PAGES", "200"))
+    CRAWL_BATCH_PAGE_CONCURRENCY: int = int(os.getenv("CRAWL_BATCH_PAGE_CONCURRENCY", "8"))
+    INDEX_BATCH_SIZE: int = int(os.getenv("INDEX_BATCH_SIZE", "256"))
+    INDEX_BATCH_WAIT_MS: float = float(os.getenv("INDEX_BATCH_WAIT_MS", "50"))
+    INDEX_CONCURRENCY: int = int(os.getenv("INDEX_CONCURRENCY", "2"))
+    PIPELINE_QUEUE_SIZE: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))
+    SITEMAP_TIMEOUT: float = float(os.getenv("SITEMAP_TIMEOUT", "30"))
+    
+    # Chat Sessions (server-side conversation history, keyed by the client's session id)
+    SESSION_HISTORY_WINDOW: int = int(os.getenv("SESSION_HISTORY_WINDOW", "5"))  # recent messages sent to the LLM verbatim
+    SESSION_SUMMARY_ENABLED: bool = os.getenv("SESSION_SUMMARY_ENABLED", "True").lower() == "true"
+    SESSION_SUMMARIZE_EVERY: int = int(os.getenv("SESSION_SUMMARIZE_EVERY", "4"))  # messages that left the window, folded into the summary together
+    SESSION_MAX_MESSAGE_CHARS: int = int(os.getenv("SESSION_MAX_MESSAGE_CHARS", "8000"))
+    SESSION_RETENTION_DAYS: float = float(os.getenv("SESSION_RETENTION_DAYS", "30"))
+    SESSION_PAGE_MAX_SIZE: int = int(os.getenv("SESSION_PAGE_MAX_SIZE", "100"))
+    
+    # Background Crawl Jobs
+    CRAWL_JOB_MAX_CONCURRENCY: int = int(os.getenv("CRAWL_JOB_MAX_CONCURRENCY", "2"))  # per worker; more jobs stay queued
+    CRAWL_JOB_PROGRESS_INTERVAL: float = float(os.getenv("CRAWL_JOB_PROGRESS_INTERVAL", "1"))  # also the worker's heartbeat
+    CRAWL_JOB_STALE_INTERVALS: int = int(os.getenv("CRAWL_JOB_STALE_INTERVALS", "10"))  # missed heartbeats before a job counts as failed
+    CRAWL_JOB_RETENTION_HOURS: float = float(os.getenv("CRAWL_JOB_RETENTION_HOURS", "24"))
+    
+    # Page Snapshots (raw fetched pages kept for reindexing without crawling)
+    SNAPSHOTS_ENABLED: bool = os.getenv("SNAPSHOTS_ENABLED", "True").lower() == "true"
+    SNAPSHOT_COMPRESSION_LEVEL: int = int(os.getenv("SNAPSHOT_COMPRESSION_LEVEL", "3"))
+    SNAPSHOT_KEEP_VERSIONS: int = int(os.getenv("SNAPSHOT_KEEP_VERSIONS", "3"))  # per URL, older ones are pruned by maintenance
+    
+    # Main-content Extraction (boilerplate removal before chunking)
+    CONTENT_EXTRACTION_ENABLED: bool = os.getenv("CONTENT_EXTRACTION_ENABLED", "True").lower() == "true"
+    CONTENT_MAX_LINK_DENSITY: float = float(os.getenv("CONTENT_MAX_LINK_DENSITY", "0.5"))
+    CONTENT_MIN_WORDS: int = int(os.getenv("CONTENT_MIN_WORDS", "25"))
+    CONTENT_REPEAT_MIN_PAGES: int = int(os.getenv("CONTENT_REPEAT_MIN_PAGES", "3"))
+    CONTENT_SITE_MEMORY: int = int(os.getenv("CONTENT_SITE_MEMORY", "5000"))
     
     # Text Processing
     CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "10000"))
     CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "200"))
     
+    # Relevance Pre-filter (local scoring before LLM preprocessing)
+    PREFILTER_ENABLED: bool = os.getenv("PREFILTER_ENABLED", "True").lower() == "true"
+    PREFILTER_SKIP_THRESHOLD: float = float(os.getenv("PREFILTER_SKIP_THRESHOLD", "0.05"))
+    PREFILTER_FAST_TRACK_THRESHOLD: float = float(os.getenv("PREFILTER_FAST_TRACK_THRESHOLD", "0.9"))
+    PREFILTER_FAST_TRACK_MAX_CHARS: int = int(os.getenv("PREFILTER_FAST_TRACK_MAX_CHARS", "2000"))
+    PREFILTER_MODEL_PATH: str = os.getenv("PREFILTER_MODEL_PATH", "")
+    PREFILTER_MODEL_WEIGHT: float = float(os.getenv("PREFILTER_MODEL_WEIGHT", "0.5"))
+    
+    # LLM Preprocessing
+    PREPROCESS_CONCURRENCY: int = int(os.getenv("PREPROCESS_CONCURRENCY", "4"))
+    PREPROCESS_BATCH_ENABLED: bool = os.getenv("PREPROCESS_BATCH_ENABLED", "True").lower() == "true"
+    PREPROCESS_BATCH_TOKEN_BUDGET: int = int(os.getenv("PREPROCESS_BATCH_TOKEN_BUDGET", "8000"))
+    PREPROCESS_BATCH_MAX_CHUNKS: int = int(os.getenv("PREPROCESS_BATCH_MAX_CHUNKS", "8"))
+    
     # Vector Search
     SIMILARITY_TOP_K: int = int(os.getenv("SIMILARITY_TOP_K", "10"))  
+    RAG_TOP_K: int = int(os.getenv("RAG_TOP_K", "5"))
+    QUERY_BATCH_MAX_SIZE: int = int(os.getenv("QUERY_BATCH_MAX_SIZE", "1000"))
+    QUERY_BATCH_CONCURRENCY: int = int(os.getenv("QUERY_BATCH_CONCURRENCY", "16"))
+    
+    # Local Quantized Vector Index (alternative to Pinecone for dense search)
+    VECTOR_SEARCH_BACKEND: str = os.getenv("VECTOR_SEARCH_BACKEND", "pinecone")  # "pinecone" or "local"
+    LOCAL_INDEX_DIR: str = os.getenv("LOCAL_INDEX_DIR", os.path.join(os.getenv("CACHE_DIR", "./cache/"), "local_index"))
+    LOCAL_INDEX_QUANTIZATION: str = os.getenv("LOCAL_INDEX_QUANTIZATION", "pq")  # "pq" or "int8"
+    LOCAL_INDEX_PQ_SUBSPACES: int = int(os.getenv("LOCAL_INDEX_PQ_SUBSPACES", "96"))
+    LOCAL_INDEX_RESCORE_CANDIDATES: int = int(os.getenv("LOCAL_INDEX_RESCORE_CANDIDATES", "100"))
+    
+    # Index Lifecycle (per-site namespaces, expiry of stale chunks)
+    NAMESPACE_MODE: str = os.getenv("NAMESPACE_MODE", "site")  # "site" or "single"
+    INDEX_TTL_DAYS: float = float(os.getenv("INDEX_TTL_DAYS", "30"))  # 0 disables age-based expiry
+    NAMESPACE_CACHE_SECONDS: float = float(os.getenv("NAMESPACE_CACHE_SECONDS", "30"))  # how stale other workers' new namespaces may be in unscoped searches
+    NAMESPACE_SEARCH_CONCURRENCY: int = int(os.getenv("NAMESPACE_SEARCH_CONCURRENCY", "8"))  # Pinecone queries in flight per search
+    
+    # Hybrid Search (BM25 + dense, fused with reciprocal rank fusion)
+    HYBRID_SEARCH_ENABLED: bool = os.getenv("HYBRID_SEARCH_ENABLED", "True").lower() == "true"
+    DENSE_TOP_K: int = int(os.getenv("DENSE_TOP_K", "10"))
+    LEXICAL_TOP_K: int = int(os.getenv("LEXICAL_TOP_K", "10"))
+    RRF_K: int = int(os.getenv("RRF_K", "60"))
+    BM25_K1: float = float(os.getenv("BM25_K1", "1.5"))
+    BM25_B: float = float(os.getenv("BM25_B", "0.75"))
+    
+    # Chat Pipeline
+    SPECULATIVE_RETRIEVAL: bool = os.getenv("SPECULATIVE_RETRIEVAL", "True").lower() == "true"
+    
+    # Reranking
+    RERANK_ENABLED: bool = os.getenv("RERANK_ENABLED", "False").lower() == "true"
+    RERANK_BACKEND: str = os.getenv("RERANK_BACKEND", "auto")
+    RERANK_MODEL: str = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_CANDIDATES: int = int(os.getenv("RERANK_CANDIDATES", "20"))
+    RERANK_TOP_N: int = int(os.getenv("RERANK_TOP_N", "4"))
+    RERANK_CACHE_SIZE: int = int(os.getenv("RERANK_CACHE_SIZE", "10000"))
     
     # File Storage
     CACHE_DIR: str = os.getenv("CACHE_DIR", "./cache/")
     
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_JSON: bool = os.getenv("LOG_JSON", str(os.getenv("ENVIRONMENT") == "production")).lower() == "true"  # one JSON object per record
+    LOG_SAMPLE_RATE: float = float(os.getenv("LOG_SAMPLE_RATE", "0.05"))  # share of high-volume debug events kept
+    LOG_PREVIEW_CHARS: int = int(os.getenv("LOG_PREVIEW_CHARS", "80"))  # user messages and queries are cut to this in logs
+    REQUEST_ID_HEADER: str = os.getenv("REQUEST_ID_HEADER", "X-Request-ID")
     
     # API Settings
     APP_TITLE: str = "RAG API"
@@ -40,6 +164,67 @@ class Settings(BaseSettings):
     PORT: int = int(os.getenv("PORT", "8000"))
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
     
+    # Admission Control (per worker process: interactive vs batch lanes, load shedding)
+    ADMISSION_CONTROL_ENABLED: bool = os.getenv("ADMISSION_CONTROL_ENABLED", "True").lower() == "true"
+    INTERACTIVE_MAX_CONCURRENCY: int = int(os.getenv("INTERACTIVE_MAX_CONCURRENCY", "32"))
+    INTERACTIVE_QUEUE_SIZE: int = int(os.getenv("INTERACTIVE_QUEUE_SIZE", "64"))
+    INTERACTIVE_RETRY_AFTER: int = int(os.getenv("INTERACTIVE_RETRY_AFTER", "1"))
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "2"))
+    BATCH_QUEUE_SIZE: int = int(os.getenv("BATCH_QUEUE_SIZE", "4"))
+    BATCH_RETRY_AFTER: int = int(os.getenv("BATCH_RETRY_AFTER", "30"))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+    # Outbound LLM calls; batch work never holds more than LLM_BATCH_MAX_CONCURRENCY, the rest is kept for chat
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_BATCH_MAX_CONCURRENCY: int = int(os.getenv("LLM_BATCH_MAX_CONCURRENCY", "8"))
+    
+    # Request Deadlines (0 disables) and Graceful Degradation
+    INTERACTIVE_DEADLINE_SECONDS: float = float(os.getenv("INTERACTIVE_DEADLINE_SECONDS", "20"))
+    BATCH_DEADLINE_SECONDS: float = float(os.getenv("BATCH_DEADLINE_SECONDS", "0"))
+    DEADLINE_HEADER: str = os.getenv("DEADLINE_HEADER", "X-Request-Timeout")  # clients may ask for a shorter budget
+    INTENT_TIMEOUT: float = float(os.getenv("INTENT_TIMEOUT", "3"))
+    EMBEDDING_TIMEOUT: float = float(os.getenv("EMBEDDING_TIMEOUT", "5"))
+    VECTOR_SEARCH_TIMEOUT: float = float(os.getenv("VECTOR_SEARCH_TIMEOUT", "5"))
+    RERANK_TIMEOUT: float = float(os.getenv("RERANK_TIMEOUT", "3"))
+    # Each stage degrades once less than this many seconds of the budget are left, in this order
+    DEGRADE_SKIP_INTENT_BELOW: float = float(os.getenv("DEGRADE_SKIP_INTENT_BELOW", "15"))
+    DEGRADE_REDUCE_K_BELOW: float = float(os.getenv("DEGRADE_REDUCE_K_BELOW", "12"))
+    DEGRADE_SKIP_RERANK_BELOW: float = float(os.getenv("DEGRADE_SKIP_RERANK_BELOW", "10"))
+    DEGRADE_SHORTEN_CONTEXT_BELOW: float = float(os.getenv("DEGRADE_SHORTEN_CONTEXT_BELOW", "8"))
+    DEGRADE_FALLBACK_ANSWER_BELOW: float = float(os.getenv("DEGRADE_FALLBACK_ANSWER_BELOW", "2"))
+    DEGRADED_CONTEXT_CHARS: int = int(os.getenv("DEGRADED_CONTEXT_CHARS", "4000"))
+    ANSWER_CACHE_SIZE: int = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+    
+    # Circuit Breakers (per outbound dependency: LLM profile, embeddings, vector store)
+    CIRCUIT_BREAKER_ENABLED: bool = os.getenv("CIRCUIT_BREAKER_ENABLED", "True").lower() == "true"
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RECOVERY_SECONDS: float = float(os.getenv("CIRCUIT_RECOVERY_SECONDS", "30"))
+    CIRCUIT_HALF_OPEN_MAX_CALLS: int = int(os.getenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1"))
+    
+    # Outbound Connection Pools
+    OUTBOUND_THREAD_POOL_SIZE: int = int(os.getenv("OUTBOUND_THREAD_POOL_SIZE", "64"))  # threads for blocking SDK calls
+    PINECONE_POOL_THREADS: int = int(os.getenv("PINECONE_POOL_THREADS", "8"))
+    PINECONE_CONNECTION_POOL_SIZE: int = int(os.getenv("PINECONE_CONNECTION_POOL_SIZE", "32"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "1"))  # client-side retries; the breaker handles outages
+    EMBEDDING_BATCH_TIMEOUT: float = float(os.getenv("EMBEDDING_BATCH_TIMEOUT", "60"))
+    
+    # Per-client Rate Limits (token buckets keyed by RATE_LIMIT_CLIENT_HEADER, else the client address)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+    RATE_LIMIT_CLIENT_HEADER: str = os.getenv("RATE_LIMIT_CLIENT_HEADER", "X-API-Key")
+    RATE_LIMIT_INTERACTIVE_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_INTERACTIVE_PER_MINUTE", "120"))
+    RATE_LIMIT_INTERACTIVE_BURST: int = int(os.getenv("RATE_LIMIT_INTERACTIVE_BURST", "20"))
+    RATE_LIMIT_BATCH_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_BATCH_PER_MINUTE", "10"))
+    RATE_LIMIT_BATCH_BURST: int = int(os.getenv("RATE_LIMIT_BATCH_BURST", "5"))
+    RATE_LIMIT_MAX_CLIENTS: int = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+    
+    # Server Mode
+    ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
+    WORKERS: int = int(os.getenv("WORKERS", str(os.cpu_count() or 1)))
+    WARM_UP_ON_STARTUP: bool = os.getenv("WARM_UP_ON_STARTUP", "True").lower() == "true"
+    WARM_UP_LLM: bool = os.getenv("WARM_UP_LLM", "True").lower() == "true"
+    WARM_UP_TIMEOUT: float = float(os.getenv("WARM_UP_TIMEOUT", "30"))
+    SHUTDOWN_DRAIN_TIMEOUT: float = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "60"))
+    SHUTDOWN_READINESS_GRACE: float = float(os.getenv("SHUTDOWN_READINESS_GRACE", "5"))  # /ready reports draining this long before the server stops listening
+    
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,238 @@
+import asyncio
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Deque, Dict, Optional, Tuple
+from loguru import logger
+from config.settings import settings
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+# Lane of the request being served; set by the admission dependency and
+# inherited by every task and single-flight call the request starts
+current_lane: ContextVar[str] = ContextVar("admission_lane", default=INTERACTIVE)
+
+class AdmissionRejected(Exception):
+    """Raised when work is shed instead of queued."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionPool:
+    """
+    Bounded concurrency with a bounded wait queue for one lane of requests.
+
+    Up to max_concurrency requests run at once and up to queue_size more
+    wait for a slot. A request arriving when the queue is full, or that
+    waits longer than queue_timeout, is rejected with AdmissionRejected so
+    the client can back off instead of piling on.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, queue_size: int, queue_timeout: float, retry_after: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def stats(self) -> Dict[str, int]:
+        return {"active": self.active, "queued": len(self._waiters), "rejected": self.rejected}
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        logger.warning(f"Shedding {self.name} request: {reason} ({self.stats()})")
+        raise AdmissionRejected(f"Too many {self.name} requests, {reason}", self.retry_after)
+
+    async def acquire(self, timeout: Optional[float] = None):
+        """
+        Take a slot, waiting in the queue if all slots are busy.
+
+        Args:
+            timeout: Maximum wait in seconds; defaults to the pool's queue timeout
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out
+        """
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            self._reject("queue is full")
+
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended
+                return
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            self._reject(f"no slot within {timeout:g}s")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self):
+        """Free a slot, handing it to the oldest waiter if there is one."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+class PriorityGate:
+    """
+    Concurrency limit on an outbound dependency shared by all lanes.
+
+    Interactive callers are always served before batch callers, and batch
+    work never holds more than batch_limit of the slots, so a burst of
+    ingestion can delay but never starve chat requests.
+    """
+
+    def __init__(self, name: str, limit: int, batch_limit: int):
+        self.name = name
+        self.limit = limit
+        self.batch_limit = min(batch_limit, limit)
+        self.active: Counter = Counter()
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {INTERACTIVE: deque(), BATCH: deque()}
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **{f"active_{lane}": self.active[lane] for lane in (INTERACTIVE, BATCH)},
+            **{f"queued_{lane}": len(waiters) for lane, waiters in self._waiters.items()}
+        }
+
+    def _has_room(self, lane: str) -> bool:
+        if sum(self.active.values()) >= self.limit:
+            return False
+        return lane != BATCH or self.active[BATCH] < self.batch_limit
+
+    def _can_start(self, lane: str) -> bool:
+        if not self._has_room(lane):
+            return False
+        # Never overtake queued callers of the same or a higher priority
+        if self._waiters[INTERACTIVE]:
+            return False
+        return lane == INTERACTIVE or not self._waiters[BATCH]
+
+    def _wake(self):
+        for lane in (INTERACTIVE, BATCH):
+            waiters = self._waiters[lane]
+            while waiters and self._has_room(lane):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self.active[lane] += 1
+                    waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, lane: Optional[str] = None):
+        """
+        Hold one slot for the duration of an outbound call.
+
+        Args:
+            lane: INTERACTIVE or BATCH; defaults to the current request's lane
+        """
+        lane = lane or current_lane.get()
+        if self._can_start(lane):
+            self.active[lane] += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters[lane].append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.active[lane] -= 1
+                    self._wake()
+                else:
+                    self._waiters[lane].remove(waiter)
+                raise
+        try:
+            yield
+        finally:
+            self.active[lane] -= 1
+            self._wake()
+
+class ClientRateLimiter:
+    """
+    Per-client token buckets.
+
+    Each client may make `burst` requests at once and then `per_minute`
+    requests per minute on average. Buckets of the least recently seen
+    clients are dropped once max_clients is reached.
+    """
+
+    def __init__(self, per_minute: float, burst: int, max_clients: int):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, client: str) -> Optional[float]:
+        """
+        Take one token for a client.
+
+        Args:
+            client: Client identifier
+
+        Returns:
+            None if the request may proceed, otherwise seconds until a token is available
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(client, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated_at) * self.rate)
+            retry_after = None
+            if tokens >= 1.0:
+                tokens -= 1.0
+            else:
+                retry_after = (1.0 - tokens) / self.rate if self.rate > 0 else float(settings.BATCH_RETRY_AFTER)
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+@lru_cache(maxsize=None)
+def get_admission_pool(lane: str) -> AdmissionPool:
+    """Get the request admission pool of a lane."""
+    if lane == BATCH:
+        return AdmissionPool(BATCH, settings.BATCH_MAX_CONCURRENCY, settings.BATCH_QUEUE_SIZE,
+                             settings.ADMISSION_QUEUE_TIMEOUT, settings.BATCH_RETRY_AFTER)
+    return AdmissionPool(INTERACTIVE, settings.INTERACTIVE_MAX_CONCURRENCY, settings.INTERACTIVE_QUEUE_SIZE,
+                         settings.ADMISSION_QUEUE_TIMEOUT, settings.INTERACTIVE_RETRY_AFTER)
+
+@lru_cache(maxsize=None)
+def get_rate_limiter(lane: str) -> ClientRateLimiter:
+    """Get the per-client rate limiter of a lane."""
+    if lane == BATCH:
+        return ClientRateLimiter(settings.RATE_LIMIT_BATCH_PER_MINUTE, settings.RATE_LIMIT_BATCH_BURST, settings.RATE_LIMIT_MAX_CLIENTS)
+    return ClientRateLimiter(settings.RATE_LIMIT_INTERACTIVE_PER_MINUTE, settings.RATE_LIMIT_INTERACTIVE_BURST, settings.RATE_LIMIT_MAX_CLIENTS)
+
+@lru_cache(maxsize=None)
+def get_llm_gate() -> PriorityGate:
+    """Get the gate that all outbound LLM calls pass through."""
+    return PriorityGate("llm", settings.LLM_MAX_CONCURRENCY, settings.LLM_BATCH_MAX_CONCURRENCY)
+
+def admission_stats() -> Dict[str, Dict[str, int]]:
+    """Current load of the admission pools and the LLM gate, for readiness reports."""
+    return {
+        **{lane: get_admission_pool(lane).stats() for lane in (INTERACTIVE, BATCH)},
+        "llm": get_llm_gate().stats()
+    }
@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+from loguru import logger
+from config.settings import settings
+from core.deadline import DeadlineExceeded
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open, retry in {retry_after:.1f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one outbound dependency.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail immediately with CircuitOpenError instead of waiting on a dependency
+    that is down. After recovery_timeout the circuit goes half-open and lets
+    up to half_open_max_calls probe calls through: a successful probe closes
+    it, a failed one opens it again for another recovery_timeout.
+
+    Thread-safe, since blocking SDK calls run in worker threads.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float, half_open_max_calls: int):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        """Whether a call would currently be let through (without reserving a probe)."""
+        if not settings.CIRCUIT_BREAKER_ENABLED:
+            return True
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self._opened_at >= self.recovery_timeout
+            return self.state == CLOSED or self._probes < self.half_open_max_calls
+
+    def before_call(self):
+        """
+        Admit a call or fail fast.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with all probes in flight
+        """
+        if not settings.CIRCUIT_BREAKER_ENABLED:
+            return
+        with self._lock:
+            if self.state == OPEN:
+                elapsed = time.monotonic() - self._opened_at
+                if elapsed < self.recovery_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.recovery_timeout - elapsed)
+                self.state = HALF_OPEN
+                self._probes = 0
+                logger.info(f"Circuit '{self.name}' half-open, probing")
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.recovery_timeout)
+                self._probes += 1
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuit '{self.name}' closed after a successful probe")
+            self.state = CLOSED
+            self.failures = 0
+            self._probes = 0
+
+    def record_failure(self, error: BaseException):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"Circuit '{self.name}' opened after {self.failures} failures, last: {str(error) or type(error).__name__}")
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._probes = 0
+
+    def release_probe(self):
+        """Give back a probe slot whose call ended without an outcome (e.g. cancelled)."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """
+        Run a call under the breaker, recording its outcome.
+
+        Cancellation, an abandoned stream and the request's own deadline
+        running out are not counted as failures; a losing hedged request, a
+        client disconnect or a short budget says nothing about the
+        dependency's health.
+
+        Raises:
+            CircuitOpenError: If the call is not admitted
+        """
+        self.before_call()
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit, DeadlineExceeded):
+            self.release_probe()
+            raise
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        else:
+            self.record_success()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures, "rejected": self.rejected}
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    Get the shared circuit breaker of a dependency, creating it on first use.
+
+    Args:
+        name: Dependency name ("embeddings", "vectorstore", "llm.<profile>")
+
+    Returns:
+        The process-wide CircuitBreaker for the dependency
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                recovery_timeout=settings.CIRCUIT_RECOVERY_SECONDS,
+                half_open_max_calls=settings.CIRCUIT_HALF_OPEN_MAX_CALLS
+            )
+            _breakers[name] = breaker
+        return breaker
+
+def circuit_states() -> Dict[str, Dict[str, object]]:
+    """State of every circuit breaker created so far, for readiness reports."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
@@ -0,0 +1,162 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Set
+from urllib.parse import urlsplit
+from loguru import logger
+from config.settings import settings
+from utils.singleflight import normalize_url
+
+MARKDOWN_LINK_PATTERN = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+IMAGE_PATTERN = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+BLOCK_SEPARATOR_PATTERN = re.compile(r"\n\s*\n")
+WORD_PATTERN = re.compile(r"\w+")
+
+@dataclass
+class ExtractionResult:
+    """Main content of a page and how much was stripped from it."""
+    text: str
+    original_bytes: int
+    kept_bytes: int
+    blocks_total: int
+    blocks_removed: int
+
+    @property
+    def bytes_removed(self) -> int:
+        return self.original_bytes - self.kept_bytes
+
+def block_fingerprint(block: str) -> str:
+    """Hash a block after normalizing case and whitespace."""
+    normalized = " ".join(block.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+def link_density(block: str) -> float:
+    """Fraction of a block's characters that belong to markdown links or images."""
+    link_chars = sum(len(match.group(0)) for match in MARKDOWN_LINK_PATTERN.finditer(block))
+    return link_chars / max(1, len(block))
+
+def text_word_count(block: str) -> int:
+    """Words in a block outside link targets and image markup."""
+    visible = MARKDOWN_LINK_PATTERN.sub(lambda match: "" if match.group(0).startswith("!") else match.group(1), block)
+    return len(WORD_PATTERN.findall(visible))
+
+class SiteBlockTracker:
+    """
+    Remember which blocks appear on which pages of each site.
+
+    A block (nav bar, footer, cookie notice, "related links") that shows up
+    on several pages of the same host is template boilerplate rather than
+    page content. Pages are counted by URL, so re-crawling one page never
+    makes its own content look repeated. Memory is bounded per host with LRU
+    eviction, and at most max_pages_per_block URLs are kept per block.
+    """
+
+    def __init__(self, max_blocks_per_site: int, max_pages_per_block: int):
+        self.max_blocks_per_site = max_blocks_per_site
+        self.max_pages_per_block = max_pages_per_block
+        self._sites: Dict[str, "OrderedDict[str, Set[str]]"] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, url: str, fingerprints: List[str]) -> Dict[str, int]:
+        """
+        Record the blocks of one page and return how many pages each has been seen on.
+
+        Args:
+            url: The page URL; pages are grouped by its host
+            fingerprints: Fingerprints of the page's blocks
+
+        Returns:
+            Mapping of fingerprint to the number of distinct pages it appeared on, this one included
+        """
+        page = normalize_url(url)
+        with self._lock:
+            blocks = self._sites.setdefault(urlsplit(page).netloc, OrderedDict())
+            for fingerprint in set(fingerprints):
+                pages = blocks.setdefault(fingerprint, set())
+                if len(pages) < self.max_pages_per_block:
+                    pages.add(page)
+                blocks.move_to_end(fingerprint)
+            while len(blocks) > self.max_blocks_per_site:
+                blocks.popitem(last=False)
+            return {fingerprint: len(blocks.get(fingerprint, ())) or 1 for fingerprint in fingerprints}
+
+class ContentExtractor:
+    """
+    Deterministic main-content extraction for crawled markdown.
+
+    The page is split into blank-line separated blocks and a block is dropped when it is
+    - mostly links with little text of its own (menus, link lists, breadcrumbs),
+    - only images,
+    - repeated on repeat_min_pages or more pages of the same site, or
+    - a heading left with no content beneath it.
+    """
+
+    def __init__(self, max_link_density: float, min_words: int, repeat_min_pages: int, tracker: SiteBlockTracker):
+        self.max_link_density = max_link_density
+        self.min_words = min_words
+        self.repeat_min_pages = repeat_min_pages
+        self.tracker = tracker
+
+    def _is_link_block(self, block: str) -> bool:
+        return link_density(block) > self.max_link_density and text_word_count(block) < self.min_words
+
+    def extract(self, url: str, markdown: str) -> ExtractionResult:
+        """
+        Strip boilerplate blocks from a page.
+
+        Args:
+            url: The page URL, used to group pages by site
+            markdown: The crawled markdown
+
+        Returns:
+            ExtractionResult with the remaining text and size accounting
+        """
+        blocks = [block.strip() for block in BLOCK_SEPARATOR_PATTERN.split(markdown) if block.strip()]
+        fingerprints = [block_fingerprint(block) for block in blocks]
+        page_counts = self.tracker.observe(url, fingerprints)
+
+        kept = []
+        for block, fingerprint in zip(blocks, fingerprints):
+            if page_counts[fingerprint] >= self.repeat_min_pages:
+                continue
+            if not IMAGE_PATTERN.sub("", block).strip():
+                continue
+            if self._is_link_block(block):
+                continue
+            kept.append(block)
+
+        # Drop headings whose section was removed entirely
+        kept = [
+            block for i, block in enumerate(kept)
+            if not (HEADING_PATTERN.match(block) and (i + 1 == len(kept) or HEADING_PATTERN.match(kept[i + 1])) and "\n" not in block)
+        ]
+
+        text = "\n\n".join(kept)
+        result = ExtractionResult(
+            text=text,
+            original_bytes=len(markdown.encode("utf-8")),
+            kept_bytes=len(text.encode("utf-8")),
+            blocks_total=len(blocks),
+            blocks_removed=len(blocks) - len(kept)
+        )
+        logger.debug(f"Content extraction for {url}: removed {result.blocks_removed}/{result.blocks_total} blocks, {result.bytes_removed} bytes")
+        return result
+
+@lru_cache(maxsize=None)
+def get_content_extractor() -> ContentExtractor:
+    """
+    Get the shared content extractor, whose site memory spans all crawls in this process.
+
+    Returns:
+        The process-wide ContentExtractor instance
+    """
+    return ContentExtractor(
+        max_link_density=settings.CONTENT_MAX_LINK_DENSITY,
+        min_words=settings.CONTENT_MIN_WORDS,
+        repeat_min_pages=settings.CONTENT_REPEAT_MIN_PAGES,
+        tracker=SiteBlockTracker(settings.CONTENT_SITE_MEMORY, settings.CONTENT_REPEAT_MIN_PAGES)
+    )
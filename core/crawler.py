@@ -1,33 +1,259 @@
 import asyncio
-from crawl4ai import AsyncWebCrawler
+import gzip
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Dict, List, Optional
 from loguru import logger
+from config.settings import settings
+from core.html_conversion import html_to_markdown
+
+# Empty single-page-app mount points, e.g. <div id="root"></div>
+SPA_MOUNT_PATTERN = re.compile(r"<div[^>]+id=[\"'](?:root|app|__next|__nuxt)[\"'][^>]*>\s*</div>", re.IGNORECASE)
+NOSCRIPT_JS_PATTERN = re.compile(r"<noscript[^>]*>[^<]*(?:enable|requires?)\s+javascript", re.IGNORECASE)
+
+def needs_javascript(html: str, markdown: str) -> bool:
+    """
+    Guess whether a statically fetched page only renders in a browser.
+
+    Args:
+        html: The raw HTML returned by the server
+        markdown: The markdown converted from that HTML
+
+    Returns:
+        True if the page should be fetched again with the headless browser
+    """
+    text_chars = len(markdown.strip())
+    if text_chars < settings.HTTP_MIN_TEXT_CHARS:
+        return True
+    # A mount point or a "please enable JavaScript" notice only matters if there is little real text
+    if text_chars < settings.HTTP_MIN_TEXT_CHARS * 5 and (SPA_MOUNT_PATTERN.search(html) or NOSCRIPT_JS_PATTERN.search(html)):
+        return True
+    return False
+
+@dataclass
+class FetchedPage:
+    """A crawled page: its markdown, and the raw HTML when the HTTP tier fetched it."""
+    markdown: str
+    html: Optional[str] = None
+    tier: str = "http"
 
 class WebCrawlerManager:
-    """Manager for web crawling operations."""
-    
+    """
+    Manager for web crawling operations.
+
+    Pages are first fetched with a pooled HTTP client and converted to
+    markdown locally. Only pages that look like they need JavaScript (or
+    that the HTTP fetch cannot get) go to the headless browser. All browser
+    crawls share one browser, started on first use, with a global semaphore
+    capping how many pages are open in it at once. The browser does not
+    load images, fonts or media.
+    """
+
+    _crawler = None
+    _crawler_lock: Optional[asyncio.Lock] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+    _http_client = None
+    # Number of pages served by each fetch tier since startup
+    tier_counts: Dict[str, int] = {"http": 0, "browser": 0}
+
+    @classmethod
+    def _get_http_client(cls):
+        if cls._http_client is None:
+            import httpx
+
+            cls._http_client = httpx.AsyncClient(
+                timeout=settings.HTTP_TIMEOUT,
+                follow_redirects=True,
+                headers={"User-Agent": settings.CRAWL_USER_AGENT},
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS
+                )
+            )
+        return cls._http_client
+
     @staticmethod
-    async def crawl_url(url: str) -> str:
+    async def _block_resources(page, context, **kwargs):
+        """crawl4ai hook: abort requests for resource types that carry no text."""
+        blocked = {kind.strip() for kind in settings.CRAWL_BLOCK_RESOURCES.split(",") if kind.strip()}
+
+        async def route_filter(route):
+            if route.request.resource_type in blocked:
+                await route.abort()
+            else:
+                await route.continue_()
+
+        if blocked:
+            await context.route("**/*", route_filter)
+        return page
+
+    @classmethod
+    async def _get_crawler(cls):
+        if cls._crawler_lock is None:
+            cls._crawler_lock = asyncio.Lock()
+        async with cls._crawler_lock:
+            if cls._crawler is None:
+                # crawl4ai pulls in playwright; only import it once a crawl is requested
+                from crawl4ai import AsyncWebCrawler
+
+                crawler = AsyncWebCrawler()
+                crawler.crawler_strategy.set_hook("on_page_context_created", cls._block_resources)
+                await crawler.start()
+                cls._crawler = crawler
+                logger.info("Started shared crawler browser")
+        return cls._crawler
+
+    @classmethod
+    def _get_semaphore(cls) -> asyncio.Semaphore:
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(settings.CRAWL_CONCURRENCY)
+        return cls._semaphore
+
+    @classmethod
+    async def close(cls):
+        """Shut down the shared browser and HTTP client, if they were started."""
+        if cls._crawler is not None:
+            crawler, cls._crawler = cls._crawler, None
+            await crawler.close()
+            logger.info("Closed shared crawler browser")
+        if cls._http_client is not None:
+            client, cls._http_client = cls._http_client, None
+            await client.aclose()
+
+    @staticmethod
+    async def fetch_http(url: str) -> Optional[FetchedPage]:
         """
-        Crawl a URL and extract the content as markdown.
-        
+        Fetch a page without a browser and convert it to markdown.
+
+        Args:
+            url: The URL to fetch
+
+        Returns:
+            The page with its raw HTML, or None if the page needs the
+            browser (JavaScript-rendered, non-HTML, or the request failed)
+        """
+        try:
+            response = await WebCrawlerManager._get_http_client().get(url)
+            response.raise_for_status()
+        except Exception as e:
+            logger.debug(f"HTTP fetch failed for {url}, escalating to browser: {str(e)}")
+            return None
+
+        content_type = response.headers.get("content-type", "")
+        if "html" not in content_type:
+            logger.debug(f"Unexpected content type '{content_type}' for {url}, escalating to browser")
+            return None
+
+        html = response.text
+        markdown_text = await asyncio.to_thread(html_to_markdown, html)
+        if needs_javascript(html, markdown_text):
+            logger.debug(f"{url} looks JavaScript-rendered ({len(markdown_text)} characters of text), escalating to browser")
+            return None
+        return FetchedPage(markdown=markdown_text, html=html, tier="http")
+
+    @staticmethod
+    async def crawl_with_browser(url: str) -> str:
+        """
+        Render a URL in the shared headless browser and extract markdown.
+
         Args:
             url: The URL to crawl
-            
+
         Returns:
             The extracted content as markdown text
-            
+        """
+        crawler = await WebCrawlerManager._get_crawler()
+        async with WebCrawlerManager._get_semaphore():
+            result = await crawler.arun(url=url)
+        return result.markdown
+
+    @staticmethod
+    async def fetch_page(url: str) -> FetchedPage:
+        """
+        Crawl a URL, over HTTP when possible and with the browser otherwise.
+
+        Args:
+            url: The URL to crawl
+
+        Returns:
+            The page as markdown, with the raw HTML when it came from the HTTP tier
+
         Raises:
             Exception: If crawling fails
         """
         logger.debug(f"Starting crawl for URL: {url}")
-        
+
         try:
-            async with AsyncWebCrawler() as crawler:
-                result = await crawler.arun(url=url)
-                markdown_text = result.markdown
-                
-            logger.debug(f"Crawl completed for {url}, extracted {len(markdown_text)} characters")
-            return markdown_text
+            page = await WebCrawlerManager.fetch_http(url) if settings.CRAWL_HTTP_FIRST else None
+            if page is None:
+                page = FetchedPage(markdown=await WebCrawlerManager.crawl_with_browser(url), tier="browser")
+            WebCrawlerManager.tier_counts[page.tier] += 1
+
+            logger.debug(f"Crawl completed for {url} via {page.tier}, extracted {len(page.markdown)} characters")
+            return page
         except Exception as e:
             logger.error(f"Crawl failed for URL {url}: {str(e)}", exc_info=True)
-            raise Exception(f"Failed to crawl URL: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to crawl URL: {str(e)}")
+
+    @staticmethod
+    async def crawl_url(url: str) -> str:
+        """
+        Crawl a URL and extract the content as markdown.
+
+        Args:
+            url: The URL to crawl
+
+        Returns:
+            The extracted content as markdown text
+
+        Raises:
+            Exception: If crawling fails
+        """
+        return (await WebCrawlerManager.fetch_page(url)).markdown
+
+    @staticmethod
+    async def fetch_sitemap_urls(sitemap_url: str, max_urls: int) -> List[str]:
+        """
+        Collect page URLs from a sitemap.xml, following nested sitemap indexes.
+
+        Args:
+            sitemap_url: URL of the sitemap (plain or gzip-compressed)
+            max_urls: Maximum number of page URLs to return
+
+        Returns:
+            Page URLs in sitemap order
+
+        Raises:
+            Exception: If the sitemap cannot be fetched or parsed
+        """
+        urls: List[str] = []
+        pending = [sitemap_url]
+        seen = set()
+
+        try:
+            client = WebCrawlerManager._get_http_client()
+            while pending and len(urls) < max_urls:
+                current = pending.pop(0)
+                if current in seen:
+                    continue
+                seen.add(current)
+
+                response = await client.get(current, timeout=settings.SITEMAP_TIMEOUT)
+                response.raise_for_status()
+                content = response.content
+                if content[:2] == b"\x1f\x8b":
+                    content = gzip.decompress(content)
+
+                root = ET.fromstring(content)
+                locations = [loc.text.strip() for loc in root.iter() if loc.tag.endswith("loc") and loc.text]
+                if root.tag.endswith("sitemapindex"):
+                    pending.extend(locations)
+                else:
+                    urls.extend(locations[:max_urls - len(urls)])
+        except Exception as e:
+            logger.error(f"Failed to read sitemap {sitemap_url}: {str(e)}", exc_info=True)
+            raise Exception(f"Failed to read sitemap: {str(e)}")
+
+        logger.info(f"Found {len(urls)} URLs in sitemap {sitemap_url}")
+        return urls
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Awaitable, List, Optional, TypeVar
+from loguru import logger
+
+T = TypeVar("T")
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """A call was cut short by the request's deadline rather than by its own timeout."""
+
+class Deadline:
+    """
+    Time budget of one request, shared by every stage working on it.
+
+    Stages read the remaining budget to bound their outbound calls and to
+    decide whether to degrade (skip a step, fetch less, answer from what
+    they have). Degradations are recorded so the response can report them.
+    """
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+        self.degradations: List[str] = []
+
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def below(self, seconds: float) -> bool:
+        """Whether less than the given number of seconds is left."""
+        return self.remaining() < seconds
+
+    def degrade(self, name: str):
+        """Record that a stage degraded; each degradation is reported once."""
+        if name not in self.degradations:
+            self.degradations.append(name)
+            logger.info(f"Degrading request: {name} ({self.remaining():.2f}s of {self.budget:.0f}s left)")
+
+# Deadline of the request being served; None means no deadline (batch work, scripts)
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+def start_deadline(budget: float) -> Optional[Deadline]:
+    """
+    Start a deadline for the current request.
+
+    Args:
+        budget: Seconds the request may take; 0 or less disables the deadline
+
+    Returns:
+        The new Deadline, or None when disabled
+    """
+    deadline = Deadline(budget) if budget > 0 else None
+    current_deadline.set(deadline)
+    return deadline
+
+def should_degrade(name: str, below: float) -> bool:
+    """
+    Degrade a stage when the current request has less than `below` seconds left.
+
+    Args:
+        name: Degradation recorded when it applies
+        below: Remaining-budget threshold in seconds
+
+    Returns:
+        True if the stage should degrade
+    """
+    deadline = current_deadline.get()
+    if deadline is None or not deadline.below(below):
+        return False
+    deadline.degrade(name)
+    return True
+
+def record_degradation(name: str):
+    """Record a degradation that happened for another reason, such as a timed out call."""
+    deadline = current_deadline.get()
+    if deadline is not None:
+        deadline.degrade(name)
+
+def degradations() -> List[str]:
+    """Degradations applied to the current request so far."""
+    deadline = current_deadline.get()
+    return list(deadline.degradations) if deadline is not None else []
+
+def bounded_timeout(timeout: float) -> float:
+    """
+    Timeout for an outbound call: its own limit, cut to the request's remaining budget.
+
+    Args:
+        timeout: The call's own timeout in seconds
+
+    Returns:
+        Seconds the call may take
+
+    Raises:
+        DeadlineExceeded: If the request's deadline has already passed
+    """
+    deadline = current_deadline.get()
+    if deadline is None:
+        return timeout
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return min(timeout, remaining)
+
+async def within_deadline(awaitable: Awaitable[T], timeout: float) -> T:
+    """
+    Await an outbound call, bounded by its timeout and the request's deadline.
+
+    Args:
+        awaitable: The call
+        timeout: The call's own timeout in seconds
+
+    Returns:
+        The call's result
+
+    Raises:
+        asyncio.TimeoutError: If the call exceeds its own timeout
+        DeadlineExceeded: If the request's deadline cut the call short
+    """
+    try:
+        limit = bounded_timeout(timeout)
+    except DeadlineExceeded:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        elif asyncio.isfuture(awaitable):
+            awaitable.cancel()
+        raise
+    try:
+        return await asyncio.wait_for(awaitable, timeout=limit)
+    except asyncio.TimeoutError:
+        if limit < timeout:
+            raise DeadlineExceeded("Request deadline exceeded") from None
+        raise
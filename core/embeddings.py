@@ -1,21 +1,34 @@
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain.embeddings import CacheBackedEmbeddings
-from langchain.storage import LocalFileStore
+from functools import lru_cache
 from pathlib import Path
 from loguru import logger
 from config.settings import settings
 
+@lru_cache(maxsize=None)
 def get_embeddings():
     """
     Get a configured embeddings model with caching.
     
+    The model is created on first use and shared for the lifetime of the
+    process, so the langchain and Google client imports are paid only once.
+    
+    Document embeddings go through a file-backed CacheBackedEmbeddings;
+    query embeddings are served from an in-memory LRU and concurrent async
+    queries are coalesced into batched embed calls. Calls to the embedding
+    API share the "embeddings" circuit breaker.
+    
     Returns:
-        A CacheBackedEmbeddings instance
+        A QueryCachedEmbeddings instance
         
     Raises:
         Exception: If the embeddings model initialization fails
     """
     try:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        from langchain.embeddings import CacheBackedEmbeddings
+        from langchain.storage import LocalFileStore
+        from core.circuit_breaker import get_circuit_breaker
+        from core.query_embeddings import QueryCachedEmbeddings
+
         # Create cache directory if it doesn't exist
         cache_dir = Path(settings.CACHE_DIR)
         cache_dir.mkdir(exist_ok=True, parents=True)
@@ -23,7 +36,8 @@ def get_embeddings():
         # Initialize Google AI embeddings model
         model = GoogleGenerativeAIEmbeddings(
             model=settings.EMBEDDING_MODEL, 
-            api_key=settings.GOOGLE_API_KEY
+            api_key=settings.GOOGLE_API_KEY,
+            request_options={"timeout": settings.EMBEDDING_BATCH_TIMEOUT}
         )
         
         # Set up caching for embeddings
@@ -34,8 +48,17 @@ def get_embeddings():
             namespace=model.model
         )
         
+        embeddings = QueryCachedEmbeddings(
+            cached_embeddings,
+            model,
+            cache_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+            batch_window=settings.QUERY_EMBEDDING_BATCH_WINDOW_MS / 1000,
+            max_batch_size=settings.QUERY_EMBEDDING_MAX_BATCH,
+            breaker=get_circuit_breaker("embeddings")
+        )
+        
         logger.info(f"Initialized embeddings model {settings.EMBEDDING_MODEL} with caching")
-        return cached_embeddings
+        return embeddings
     except Exception as e:
         logger.error(f"Failed to initialize embeddings model: {str(e)}", exc_info=True)
         raise Exception(f"Embeddings initialization failed: {str(e)}")
\ No newline at end of file
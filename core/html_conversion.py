@@ -0,0 +1,75 @@
+import re
+from typing import List
+from loguru import logger
+
+# Elements that never carry page content
+DROP_TAGS = ["script", "style", "noscript", "template", "svg", "iframe", "form", "head"]
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "header", "footer", "aside", "nav",
+              "table", "tr", "ul", "ol", "blockquote", "pre", "br", "hr"}
+HEADING_TAGS = {"h1": "#", "h2": "##", "h3": "###", "h4": "####", "h5": "#####", "h6": "######"}
+BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+
+def html_to_markdown(html: str) -> str:
+    """
+    Convert an HTML page to lightweight markdown.
+
+    Keeps headings, list items, table cells and paragraph breaks so the
+    output splits the same way as crawler markdown does. Links are kept as
+    markdown links, like in the browser's markdown, so content extraction
+    can tell link lists from text.
+
+    Args:
+        html: Raw HTML document
+
+    Returns:
+        Markdown text
+    """
+    from bs4 import BeautifulSoup, NavigableString
+    from bs4.element import PreformattedString
+
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(DROP_TAGS):
+        tag.decompose()
+
+    parts: List[str] = []
+
+    # Walked with an explicit stack so deeply nested markup cannot exhaust the recursion limit;
+    # a 1-tuple on the stack is text to emit once an element's children are done
+    body = soup.body or soup
+    stack: list = list(reversed(list(body.children)))
+    while stack:
+        child = stack.pop()
+        if isinstance(child, tuple):
+            parts.append(child[0])
+            continue
+        if isinstance(child, PreformattedString):
+            # Comments, doctypes, CDATA and processing instructions are not page text
+            continue
+        if isinstance(child, NavigableString):
+            text = " ".join(str(child).split())
+            if text:
+                parts.append(text + " ")
+            continue
+        name = child.name
+        if name in HEADING_TAGS:
+            parts.append(f"\n\n{HEADING_TAGS[name]} {child.get_text(' ', strip=True)}\n\n")
+            continue
+        if name == "a" and child.get("href"):
+            text = " ".join(child.get_text(" ", strip=True).replace("[", "").replace("]", "").split())
+            if text:
+                href = child["href"].strip().replace(" ", "%20").replace(")", "%29")
+                parts.append(f"[{text}]({href}) ")
+            continue
+        if name == "li":
+            parts.append("\n- ")
+        elif name in ("td", "th"):
+            stack.append((" | ",))
+        elif name in BLOCK_TAGS:
+            parts.append("\n\n" if name not in ("br", "tr") else "\n")
+            stack.append(("\n",))
+        stack.extend(reversed(list(child.children)))
+
+    lines = [" ".join(line.split()) for line in "".join(parts).split("\n")]
+    markdown = BLANK_LINES_PATTERN.sub("\n\n", "\n".join(lines)).strip()
+    logger.debug(f"Converted {len(html)} characters of HTML to {len(markdown)} characters of markdown")
+    return markdown
@@ -0,0 +1,209 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+from config.settings import settings
+
+DEFAULT_NAMESPACE = ""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    namespace TEXT NOT NULL,
+    id TEXT NOT NULL,
+    source_url TEXT NOT NULL,
+    crawled_at REAL NOT NULL,
+    PRIMARY KEY (namespace, id, source_url)
+);
+CREATE INDEX IF NOT EXISTS chunks_by_source ON chunks (source_url, crawled_at);
+CREATE INDEX IF NOT EXISTS chunks_by_age ON chunks (crawled_at);
+CREATE TABLE IF NOT EXISTS sources (
+    source_url TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    last_crawled_at REAL NOT NULL
+);
+"""
+
+def site_namespace(url: str) -> str:
+    """
+    Namespace that holds a page's chunks.
+
+    With NAMESPACE_MODE=site every host gets its own namespace ("www." is
+    dropped so both spellings share one); with NAMESPACE_MODE=single all
+    chunks go to the default namespace.
+
+    Args:
+        url: The page URL
+
+    Returns:
+        The namespace name
+    """
+    if settings.NAMESPACE_MODE != "site":
+        return DEFAULT_NAMESPACE
+    host = urlsplit(url).netloc.lower().split("@")[-1].split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+class IndexRegistry:
+    """
+    Bookkeeping of which chunks each source URL put into which namespace.
+
+    Pinecone cannot list vectors by metadata cheaply, so the registry is the
+    place maintenance looks up what is stale (see services/maintenance_service.py). A chunk row is stale when its
+    source has been crawled again since (the page no longer produced it) or
+    when it is older than the TTL. Rows are keyed by (namespace, id,
+    source_url) because identical chunks from two pages share an id; the
+    vector is only deleted once no source references it any more.
+
+    SQLite in WAL mode, one connection per call, so it is safe to use from
+    worker threads and from several worker processes. The namespace list,
+    which every unscoped search needs, is also kept in memory.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._namespaces: Optional[Set[str]] = None
+        self._namespaces_loaded_at = 0.0
+        self._namespaces_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record_chunks(self, namespace: str, rows: List[Tuple[str, str, float]]):
+        """
+        Record indexed chunks.
+
+        Args:
+            namespace: Namespace the chunks were upserted into
+            rows: (chunk id, source URL, crawl time as epoch seconds) per chunk
+        """
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO chunks (namespace, id, source_url, crawled_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (namespace, id, source_url) DO UPDATE SET crawled_at = MAX(crawled_at, excluded.crawled_at)",
+                [(namespace, doc_id, source_url, crawled_at) for doc_id, source_url, crawled_at in rows]
+            )
+        if rows:
+            with self._namespaces_lock:
+                if self._namespaces is not None:
+                    self._namespaces.add(namespace)
+
+    def mark_crawled(self, source_url: str, namespace: str, crawled_at: float):
+        """Record a completed crawl; chunks of the URL from earlier crawls become stale."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sources (source_url, namespace, last_crawled_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (source_url) DO UPDATE SET namespace = excluded.namespace, "
+                "last_crawled_at = MAX(last_crawled_at, excluded.last_crawled_at)",
+                (source_url, namespace, crawled_at)
+            )
+
+    def namespaces(self) -> List[str]:
+        """All namespaces that hold registered chunks, read from the database (refreshes the in-memory list)."""
+        with self._connect() as conn:
+            namespaces = [row[0] for row in conn.execute("SELECT DISTINCT namespace FROM chunks ORDER BY namespace")]
+        with self._namespaces_lock:
+            self._namespaces = set(namespaces)
+            self._namespaces_loaded_at = time.monotonic()
+        return namespaces
+
+    def cached_namespaces(self, max_age: float) -> Optional[List[str]]:
+        """
+        The in-memory namespace list, without touching the database.
+
+        Namespaces this process indexes into are added right away; the list
+        is re-read after max_age seconds to pick up other workers' crawls.
+
+        Args:
+            max_age: Seconds after which the list has to be read again
+
+        Returns:
+            The namespaces, or None when the list has to be read with namespaces()
+        """
+        with self._namespaces_lock:
+            if self._namespaces is None or time.monotonic() - self._namespaces_loaded_at >= max_age:
+                return None
+            return sorted(self._namespaces)
+
+    def stale_references(self, ttl_seconds: Optional[float]) -> List[Tuple[str, str, str]]:
+        """
+        Find chunk rows whose source has been re-crawled since, or that are older than the TTL.
+
+        Args:
+            ttl_seconds: Maximum chunk age; None disables age-based expiry
+
+        Returns:
+            List of (namespace, chunk id, source URL) rows
+        """
+        stale_where = "c.crawled_at < s.last_crawled_at"
+        params: Tuple = ()
+        if ttl_seconds is not None:
+            stale_where += " OR c.crawled_at < ?"
+            params = (time.time() - ttl_seconds,)
+        with self._connect() as conn:
+            return conn.execute(
+                f"SELECT c.namespace, c.id, c.source_url FROM chunks c "
+                f"LEFT JOIN sources s ON c.source_url = s.source_url WHERE {stale_where}",
+                params
+            ).fetchall()
+
+    def orphaned(self, references: List[Tuple[str, str, str]]) -> Dict[str, List[str]]:
+        """
+        Chunks that no source would reference once the given rows are removed.
+
+        Args:
+            references: (namespace, chunk id, source URL) rows about to be removed
+
+        Returns:
+            Mapping of namespace to chunk ids
+        """
+        removed: Dict[Tuple[str, str], int] = {}
+        for namespace, doc_id, _ in references:
+            removed[(namespace, doc_id)] = removed.get((namespace, doc_id), 0) + 1
+        orphans: Dict[str, List[str]] = {}
+        with self._connect() as conn:
+            for (namespace, doc_id), count in removed.items():
+                (total,) = conn.execute(
+                    "SELECT COUNT(*) FROM chunks WHERE namespace = ? AND id = ?", (namespace, doc_id)
+                ).fetchone()
+                if total <= count:
+                    orphans.setdefault(namespace, []).append(doc_id)
+        return orphans
+
+    def forget(self, references: List[Tuple[str, str, str]]):
+        """Delete chunk rows, once their vectors have been removed or are still referenced elsewhere."""
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM chunks WHERE namespace = ? AND id = ? AND source_url = ?", references)
+        # A namespace may have lost its last chunk
+        with self._namespaces_lock:
+            self._namespaces = None
+
+    def vacuum(self):
+        """Reclaim space left by deleted rows."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+@lru_cache(maxsize=None)
+def get_index_registry() -> IndexRegistry:
+    """
+    Get the shared index registry.
+
+    Returns:
+        The process-wide IndexRegistry instance
+    """
+    return IndexRegistry(Path(settings.CACHE_DIR) / "index_registry.sqlite")
@@ -0,0 +1,169 @@
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+from config.settings import settings
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawl_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total_urls INTEGER NOT NULL DEFAULT 0,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    indexed_count INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS crawl_jobs_by_age ON crawl_jobs (updated_at);
+"""
+
+class CrawlJobStore:
+    """
+    Status and progress of background crawl jobs.
+
+    A job is submitted by one request and polled by later ones, which a
+    load balancer may send to another worker process, so the state lives in
+    SQLite (WAL mode, one connection per call) rather than in memory.
+
+    A worker refreshes updated_at on its queued and running jobs every
+    CRAWL_JOB_PROGRESS_INTERVAL. When it is killed or crashes that heartbeat
+    stops, and once a job has gone stale_after_seconds without one, get()
+    and prune() mark it failed so pollers stop waiting and it can expire.
+    """
+
+    def __init__(self, path: Path, stale_after_seconds: float = 30):
+        self.path = Path(path)
+        self.stale_after_seconds = stale_after_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self) -> str:
+        """
+        Register a new queued job.
+
+        Returns:
+            The job id
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO crawl_jobs (id, status, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (job_id, QUEUED, now, now)
+            )
+        return job_id
+
+    def update(self, job_id: str, status: Optional[str] = None, total_urls: Optional[int] = None,
+               pages_done: Optional[int] = None, indexed_count: Optional[int] = None):
+        """Update a job's status and progress counters; fields left as None are unchanged."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE crawl_jobs SET status = COALESCE(?, status), total_urls = COALESCE(?, total_urls), "
+                "pages_done = COALESCE(?, pages_done), indexed_count = COALESCE(?, indexed_count), updated_at = ? "
+                "WHERE id = ?",
+                (status, total_urls, pages_done, indexed_count, time.time(), job_id)
+            )
+
+    def finish(self, job_id: str, result: Dict[str, Any]):
+        """Mark a job as succeeded with its final result."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE crawl_jobs SET status = ?, total_urls = ?, pages_done = ?, indexed_count = ?, "
+                "result = ?, updated_at = ? WHERE id = ?",
+                (SUCCEEDED, result["total_urls"], result["total_urls"], result["indexed_count"],
+                 json.dumps(result), time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str):
+        """Mark a job as failed."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE crawl_jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (FAILED, error, time.time(), job_id)
+            )
+
+    def _fail_stale(self, conn: sqlite3.Connection, job_id: Optional[str] = None):
+        # Jobs whose worker stopped sending heartbeats will never finish
+        query = (
+            "UPDATE crawl_jobs SET status = ?, error = ?, updated_at = ? "
+            "WHERE status IN (?, ?) AND updated_at < ?"
+        )
+        now = time.time()
+        params = [FAILED, "Worker stopped before the job finished", now, QUEUED, RUNNING, now - self.stale_after_seconds]
+        if job_id is not None:
+            query += " AND id = ?"
+            params.append(job_id)
+        conn.execute(query, params)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a job.
+
+        Args:
+            job_id: The job id
+
+        Returns:
+            The job's fields, with the result decoded, or None if unknown
+        """
+        with self._connect() as conn:
+            self._fail_stale(conn, job_id)
+            row = conn.execute("SELECT * FROM crawl_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["job_id"] = job.pop("id")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def prune(self, max_age_seconds: float) -> int:
+        """
+        Drop finished jobs that have not changed for max_age_seconds.
+
+        Stale queued or running jobs are marked failed first, so they expire too.
+
+        Returns:
+            Number of jobs removed
+        """
+        with self._connect() as conn:
+            self._fail_stale(conn)
+            cursor = conn.execute(
+                "DELETE FROM crawl_jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (SUCCEEDED, FAILED, time.time() - max_age_seconds)
+            )
+            return cursor.rowcount
+
+@lru_cache(maxsize=None)
+def get_crawl_job_store() -> CrawlJobStore:
+    """
+    Get the shared crawl job store.
+
+    Returns:
+        The process-wide CrawlJobStore instance
+    """
+    return CrawlJobStore(
+        Path(settings.CACHE_DIR) / "crawl_jobs.sqlite",
+        stale_after_seconds=settings.CRAWL_JOB_PROGRESS_INTERVAL * settings.CRAWL_JOB_STALE_INTERVALS
+    )
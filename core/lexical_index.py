@@ -0,0 +1,275 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from loguru import logger
+from config.settings import settings
+from utils.file_lock import file_lock
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+# Words joined by ".", ":", "/", "-" or "," stay together so prices ("12.99"),
+# times ("10:30") and phone numbers ("0522-2345678") can match exactly.
+TOKEN_PATTERN = re.compile(r"\w+(?:[.,:/'-]\w+)*", re.UNICODE)
+TOKEN_PART_PATTERN = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "for", "from",
+    "have", "how", "i", "in", "is", "it", "me", "of", "on", "or", "the", "there",
+    "this", "to", "what", "when", "where", "which", "who", "with", "you", "your"
+})
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokenize text for lexical search.
+
+    Compound tokens are kept whole and also split into their parts, so a
+    query for "2345678" still matches "0522-2345678".
+
+    Args:
+        text: The text to tokenize
+
+    Returns:
+        List of lowercase tokens without stopwords
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group(0)
+        if token not in STOPWORDS:
+            tokens.append(token)
+        parts = TOKEN_PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part not in STOPWORDS)
+    return tokens
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index persisted as an append-only JSON lines log.
+
+    Every worker process keeps its own in-memory postings and replays lines
+    appended by other workers before each search, so documents indexed by one
+    worker become searchable in all of them. Removals are appended as
+    tombstones; compact() rewrites the log without removed documents, and
+    workers that notice the log was replaced reload it from the start.
+    Appends and the rewrite hold a cross-process lock on a sidecar .lock
+    file, so no worker or script can append to a log that is being replaced.
+    """
+
+    def __init__(self, path: Path, k1: float = 1.5, b: float = 0.75):
+        self.path = Path(path)
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._offset = 0
+        self._file_id = None
+        self._lock = threading.RLock()
+        self._lock_path = self.path.with_suffix(self.path.suffix + ".lock")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._docs
+
+    def documents(self) -> List[Dict[str, Any]]:
+        """Snapshot of all indexed documents as {"id", "text", "metadata"} records."""
+        self.refresh()
+        with self._lock:
+            return [{"id": doc_id, **doc} for doc_id, doc in self._docs.items()]
+
+    def _add_to_memory(self, doc_id: str, text: str, metadata: Dict[str, Any]):
+        if doc_id in self._docs:
+            return
+        term_counts = Counter(tokenize(text))
+        self._docs[doc_id] = {"text": text, "metadata": metadata}
+        self._doc_lengths[doc_id] = sum(term_counts.values())
+        self._total_length += self._doc_lengths[doc_id]
+        for term, count in term_counts.items():
+            self._postings.setdefault(term, {})[doc_id] = count
+
+    def _remove_from_memory(self, doc_id: str):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in set(tokenize(doc["text"])):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def _reset(self):
+        self._docs.clear()
+        self._postings.clear()
+        self._doc_lengths.clear()
+        self._total_length = 0
+        self._offset = 0
+
+    def refresh(self):
+        """Load any log entries appended since the last refresh."""
+        with self._lock:
+            if not self.path.exists():
+                return
+            stat = self.path.stat()
+            file_id = (stat.st_dev, stat.st_ino)
+            if file_id != self._file_id or stat.st_size < self._offset:
+                # The log was compacted (replaced) by some worker; replay it from the start
+                if self._file_id is not None:
+                    logger.info(f"Lexical index log {self.path} was rewritten, reloading")
+                self._reset()
+                self._file_id = file_id
+            if stat.st_size == self._offset:
+                return
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                while True:
+                    line = f.readline()
+                    # Stop at a partially written trailing line and retry it next time
+                    if not line or not line.endswith(b"\n"):
+                        break
+                    self._offset = f.tell()
+                    try:
+                        entry = json.loads(line.decode("utf-8"))
+                    except (UnicodeDecodeError, json.JSONDecodeError):
+                        logger.warning(f"Skipping corrupt line in lexical index log {self.path}")
+                        continue
+                    if entry.get("deleted"):
+                        self._remove_from_memory(entry["id"])
+                    else:
+                        self._add_to_memory(entry["id"], entry["text"], entry.get("metadata") or {})
+
+    def add_documents(self, ids: List[str], texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> int:
+        """
+        Add documents to the index and persist them.
+
+        Args:
+            ids: Document ids, shared with the vector store
+            texts: Document texts
+            metadatas: Optional metadata dictionaries, one per text
+
+        Returns:
+            Number of documents that were not already indexed
+        """
+        metadatas = metadatas or [{} for _ in texts]
+        with self._lock, file_lock(self._lock_path):
+            self.refresh()
+            lines = [
+                json.dumps({"id": doc_id, "text": text, "metadata": metadata}, ensure_ascii=False) + "\n"
+                for doc_id, text, metadata in zip(ids, texts, metadatas)
+                if doc_id not in self._docs
+            ]
+            if lines:
+                # Opened under the file lock, so this is never a log compact() is replacing
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+                self.refresh()
+        logger.debug(f"Added {len(lines)} documents to lexical index ({len(self._docs)} total)")
+        return len(lines)
+
+    def remove_documents(self, ids: List[str]) -> int:
+        """
+        Remove documents by appending tombstones to the log.
+
+        Args:
+            ids: Ids of the documents to remove
+
+        Returns:
+            Number of documents that were present and are now removed
+        """
+        with self._lock, file_lock(self._lock_path):
+            self.refresh()
+            lines = [json.dumps({"id": doc_id, "deleted": True}) + "\n" for doc_id in ids if doc_id in self._docs]
+            if lines:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+                self.refresh()
+        logger.debug(f"Removed {len(lines)} documents from lexical index ({len(self._docs)} remaining)")
+        return len(lines)
+
+    def compact(self) -> Tuple[int, int]:
+        """
+        Rewrite the log with only live documents, dropping tombstones and removed entries.
+
+        Appends from every process wait on the file lock until the new log is
+        in place, so none of them is lost with the old one.
+
+        Returns:
+            Tuple of (log size in bytes before, after)
+        """
+        with self._lock, file_lock(self._lock_path):
+            self.refresh()
+            before = self.path.stat().st_size if self.path.exists() else 0
+            tmp_path = self.path.with_suffix(self.path.suffix + ".compact")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for doc_id, doc in self._docs.items():
+                    f.write(json.dumps({"id": doc_id, "text": doc["text"], "metadata": doc["metadata"]}, ensure_ascii=False) + "\n")
+            # Atomic swap; other workers see a new inode and reload
+            os.replace(tmp_path, self.path)
+            self._reset()
+            self._file_id = None
+            self.refresh()
+            after = self.path.stat().st_size
+        logger.info(f"Compacted lexical index log from {before} to {after} bytes")
+        return before, after
+
+    def search(self, query: str, k: int, namespaces: Optional[List[str]] = None) -> List[Tuple["Document", float]]:
+        """
+        Score documents against a query with BM25.
+
+        Args:
+            query: The search query
+            k: Maximum number of results
+            namespaces: Only return documents from these namespaces (all when None)
+
+        Returns:
+            List of (Document, score) tuples, best first
+        """
+        from langchain.schema import Document
+
+        self.refresh()
+        with self._lock:
+            doc_count = len(self._docs)
+            if doc_count == 0:
+                return []
+            avg_length = self._total_length / doc_count
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if namespaces is not None and self._docs[doc_id]["metadata"].get("namespace", "") not in namespaces:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [
+                (Document(page_content=self._docs[doc_id]["text"], metadata={**self._docs[doc_id]["metadata"], "id": doc_id}), score)
+                for doc_id, score in top
+            ]
+
+@lru_cache(maxsize=None)
+def get_lexical_index() -> BM25Index:
+    """
+    Get the shared BM25 index, loading it from disk on first use.
+
+    Returns:
+        The process-wide BM25Index instance
+    """
+    path = Path(settings.CACHE_DIR) / "lexical" / "bm25_docs.jsonl"
+    index = BM25Index(path, k1=settings.BM25_K1, b=settings.BM25_B)
+    logger.info(f"Loaded lexical index from {path} with {len(index)} documents")
+    return index
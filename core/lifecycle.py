@@ -0,0 +1,156 @@
+import asyncio
+import signal
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from loguru import logger
+
+class ServiceLifecycle:
+    """
+    Process-wide readiness state and tracker for in-flight work.
+
+    Requests and background jobs register themselves while they run so that
+    shutdown can stop taking new work and wait for the existing work to drain.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.draining = False
+        self.started_at: Optional[float] = None
+        self.warm_up_report: Dict[str, Any] = {}
+        self._in_flight: Counter = Counter()
+        self._tasks: Set[asyncio.Task] = set()
+        self._idle: Optional[asyncio.Event] = None
+
+    def _idle_event(self) -> asyncio.Event:
+        if self._idle is None:
+            self._idle = asyncio.Event()
+            self._idle.set()
+        return self._idle
+
+    def mark_ready(self, warm_up_report: Optional[Dict[str, Any]] = None):
+        """Mark the process as ready to accept traffic."""
+        self.ready = True
+        self.started_at = time.time()
+        self.warm_up_report = warm_up_report or {}
+        logger.info("Service marked as ready")
+
+    def begin_drain(self):
+        """Stop reporting readiness so load balancers route traffic elsewhere."""
+        if self.draining:
+            return
+        self.ready = False
+        self.draining = True
+        logger.info(f"Draining in-flight work: {dict(self._in_flight)}")
+
+    def drain_on_signal(self, grace_period: float) -> Callable[[], None]:
+        """
+        Start draining as soon as SIGTERM or SIGINT arrives, before the server stops listening.
+
+        The server's own handler (which closes the listening socket) is
+        called grace_period seconds later, so load balancers polling /ready
+        see the worker draining while it still accepts the requests already
+        routed to it. A second signal stops the server immediately. Only
+        possible from the main thread; elsewhere nothing is installed.
+
+        Args:
+            grace_period: Seconds between the readiness flip and the server's shutdown
+
+        Returns:
+            Function restoring the previous signal handlers
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return lambda: None
+        loop = asyncio.get_running_loop()
+        previous = {sig: signal.getsignal(sig) for sig in (signal.SIGTERM, signal.SIGINT)}
+
+        def forward(sig, frame):
+            handler = previous[sig]
+            if callable(handler):
+                handler(sig, frame)
+            else:
+                signal.signal(sig, handler)
+                signal.raise_signal(sig)
+
+        def on_signal(sig, frame):
+            if self.draining:
+                forward(sig, frame)
+                return
+            self.begin_drain()
+            loop.call_soon_threadsafe(loop.call_later, grace_period, forward, sig, frame)
+
+        for sig in previous:
+            signal.signal(sig, on_signal)
+
+        def restore():
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+        return restore
+
+    @property
+    def in_flight(self) -> Dict[str, int]:
+        """Number of in-flight units of work per kind."""
+        return {kind: count for kind, count in self._in_flight.items() if count > 0}
+
+    @asynccontextmanager
+    async def track(self, kind: str):
+        """
+        Register a unit of work (a crawl, a streamed response, ...) while it runs.
+
+        Args:
+            kind: Label used in readiness reports and drain logs
+        """
+        idle = self._idle_event()
+        self._in_flight[kind] += 1
+        idle.clear()
+        try:
+            yield
+        finally:
+            self._in_flight[kind] -= 1
+            if sum(self._in_flight.values()) == 0:
+                idle.set()
+
+    def spawn(self, coro: Awaitable, kind: str) -> asyncio.Task:
+        """
+        Run a coroutine as a tracked background task.
+
+        Args:
+            coro: The coroutine to run
+            kind: Label used in readiness reports and drain logs
+
+        Returns:
+            The created task
+        """
+        async def runner():
+            async with self.track(kind):
+                return await coro
+
+        task = asyncio.create_task(runner())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        Wait for all tracked work to finish.
+
+        Args:
+            timeout: Maximum number of seconds to wait
+
+        Returns:
+            True if everything finished, False if the timeout expired first
+        """
+        try:
+            await asyncio.wait_for(self._idle_event().wait(), timeout=timeout)
+            logger.info("All in-flight work drained")
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"Drain timed out after {timeout:.0f}s with work still running: {self.in_flight}")
+            for task in list(self._tasks):
+                task.cancel()
+            return False
+
+# Shared lifecycle state for this worker process
+lifecycle = ServiceLifecycle()
@@ -1,25 +1,325 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional
 from loguru import logger
 from config.settings import settings
 
-def get_llm():
+# Model profile used by each pipeline stage when nothing else is configured
+DEFAULT_STAGE = "default"
+
+def get_profile_models() -> Dict[str, str]:
+    """Map each model profile to its configured model name."""
+    return {
+        "fast": settings.LLM_FAST_MODEL,
+        "quality": settings.LLM_MODEL,
+    }
+
+def get_stage_profiles() -> Dict[str, str]:
+    """Map each pipeline stage to the model profile it uses."""
+    return {
+        DEFAULT_STAGE: "quality",
+        "intent": settings.LLM_PROFILE_INTENT,
+        "preprocess": settings.LLM_PROFILE_PREPROCESS,
+        "filter": settings.LLM_PROFILE_FILTER,
+        "rag": settings.LLM_PROFILE_RAG,
+        "summary": settings.LLM_PROFILE_SUMMARY,
+    }
+
+def get_fallback_profiles() -> Dict[str, str]:
+    """Map each model profile to the profile tried when it times out or fails."""
+    return {
+        "fast": settings.LLM_FAST_FALLBACK,
+        "quality": settings.LLM_QUALITY_FALLBACK,
+    }
+
+class FakeChatModel:
     """
-    Get a configured language model.
-    
+    Local stand-in for a chat model, selected with LLM_PROVIDER=fake.
+
+    Latency and error rate are configurable so hedging and fallback can be
+    exercised without network access. Intent prompts get a JSON answer and
+    every other prompt is echoed back.
+    """
+
+    def __init__(self, model: str, latency: float, error_rate: float):
+        self.model = model
+        self.latency = latency
+        self.error_rate = error_rate
+
+    def _respond(self, prompt: str) -> str:
+        if "JSON Response:" in prompt:
+            return json.dumps({"pipeline": "rag", "confidence": 0.5, "reasoning": f"fake model {self.model}"})
+        return f"[{self.model}] {prompt.strip()[-200:]}"
+
+    async def ainvoke(self, prompt: str):
+        from langchain_core.messages import AIMessage
+
+        await asyncio.sleep(self.latency)
+        if random.random() < self.error_rate:
+            raise RuntimeError(f"Fake model {self.model} failed")
+        return AIMessage(content=self._respond(prompt))
+
+    async def astream(self, prompt: str):
+        from langchain_core.messages import AIMessageChunk
+
+        await asyncio.sleep(self.latency)
+        if random.random() < self.error_rate:
+            raise RuntimeError(f"Fake model {self.model} failed")
+        for word in self._respond(prompt).split(" "):
+            yield AIMessageChunk(content=f"{word} ")
+            await asyncio.sleep(0)
+
+@lru_cache(maxsize=None)
+def get_chat_model(profile: str):
+    """
+    Get the underlying chat model client for a profile.
+
+    Args:
+        profile: Model profile name ("fast" or "quality")
+
     Returns:
-        A ChatGoogleGenerativeAI instance
-        
+        A ChatGoogleGenerativeAI instance, or a FakeChatModel when LLM_PROVIDER=fake
+
     Raises:
         Exception: If LLM initialization fails
     """
+    model_name = get_profile_models().get(profile)
+    if model_name is None:
+        raise Exception(f"Unknown LLM profile: {profile}")
+
     try:
-        llm = ChatGoogleGenerativeAI(
-            model=settings.LLM_MODEL, 
-            api_key=settings.GEMINI_API_KEY
-        )
-        
-        logger.info(f"Initialized LLM model: {settings.LLM_MODEL}")
+        if settings.LLM_PROVIDER == "fake":
+            llm = FakeChatModel(model_name, settings.FAKE_LLM_LATENCY_MS / 1000, settings.FAKE_LLM_ERROR_RATE)
+        else:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+            llm = ChatGoogleGenerativeAI(
+                model=model_name,
+                api_key=settings.GEMINI_API_KEY,
+                max_retries=settings.LLM_MAX_RETRIES,
+                timeout=settings.LLM_TIMEOUT
+            )
+
+        logger.info(f"Initialized LLM model for profile '{profile}': {model_name}")
         return llm
     except Exception as e:
         logger.error(f"Failed to initialize LLM: {str(e)}", exc_info=True)
-        raise Exception(f"LLM initialization failed: {str(e)}")
\ No newline at end of file
+        raise Exception(f"LLM initialization failed: {str(e)}")
+
+class LatencyTracker:
+    """Sliding window of call latencies used to pick the hedging delay."""
+
+    def __init__(self, window: int):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def hedge_delay(self) -> float:
+        """
+        Delay after which a backup request is fired.
+
+        Returns:
+            The configured latency percentile of recent calls, or the static
+            default delay until enough samples have been collected
+        """
+        if len(self._samples) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return settings.LLM_HEDGE_DEFAULT_DELAY
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * settings.LLM_HEDGE_PERCENTILE / 100))
+        return max(settings.LLM_HEDGE_MIN_DELAY, ordered[index])
+
+@lru_cache(maxsize=None)
+def get_latency_tracker(profile: str) -> LatencyTracker:
+    """Get the shared latency tracker for a profile."""
+    return LatencyTracker(settings.LLM_HEDGE_WINDOW)
+
+class RoutedLLM:
+    """
+    Stage-aware LLM client with hedged requests and profile fallback.
+
+    A call goes to the stage's profile. If it has not answered after the
+    profile's recent latency percentile, an identical backup request is fired
+    and whichever finishes first wins. If the profile times out or fails, the
+    call is retried once on the fallback profile. Every profile has its own
+    circuit breaker, so while a provider is down calls skip straight to the
+    fallback instead of waiting out LLM_TIMEOUT each time.
+    """
+
+    def __init__(self, stage: str, profile: str, fallback_profile: Optional[str]):
+        self.stage = stage
+        self.profile = profile
+        self.fallback_profile = fallback_profile if fallback_profile != profile else None
+
+    async def _timed_call(self, profile: str, prompt: Any):
+        from core.admission import get_llm_gate
+        from core.circuit_breaker import get_circuit_breaker
+
+        breaker = get_circuit_breaker(f"llm.{profile}")
+        # Fail fast before queueing for a slot when the profile is known to be down
+        if not breaker.available:
+            breaker.before_call()
+        # Batch work (crawl preprocessing) queues behind chat for a shared LLM slot
+        async with get_llm_gate().slot():
+            with breaker.guard():
+                start_time = time.perf_counter()
+                response = await get_chat_model(profile).ainvoke(prompt)
+                get_latency_tracker(profile).record(time.perf_counter() - start_time)
+        return response
+
+    async def _hedged_call(self, profile: str, prompt: Any):
+        primary = asyncio.create_task(self._timed_call(profile, prompt))
+        if not settings.LLM_HEDGE_ENABLED:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=get_latency_tracker(profile).hedge_delay())
+            if not done:
+                logger.debug(f"Hedging slow '{self.stage}' call on profile '{profile}'")
+                tasks.add(asyncio.create_task(self._timed_call(profile, prompt)))
+
+            first_error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    first_error = first_error or task.exception()
+            raise first_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def ainvoke(self, prompt: Any, timeout: Optional[float] = None):
+        """
+        Invoke the stage's model, hedging slow calls and falling back on failure.
+
+        Every attempt is bounded by LLM_TIMEOUT (or the given timeout) and by
+        the remaining budget of the current request's deadline.
+
+        Args:
+            prompt: The prompt passed to the chat model
+            timeout: Per-attempt timeout in seconds; defaults to LLM_TIMEOUT
+
+        Returns:
+            The chat model's response message
+
+        Raises:
+            CircuitOpenError: If the last profile tried is known to be down
+            Exception: If both the primary and the fallback profile fail
+        """
+        from core.deadline import DeadlineExceeded
+
+        timeout = timeout or settings.LLM_TIMEOUT
+        try:
+            return await self._attempt(self.profile, self._hedged_call(self.profile, prompt), timeout)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            if self.fallback_profile is None:
+                raise
+            reason = "timed out" if isinstance(e, asyncio.TimeoutError) else f"failed: {str(e)}"
+            logger.warning(f"LLM profile '{self.profile}' {reason} for stage '{self.stage}', falling back to '{self.fallback_profile}'")
+            return await self._attempt(self.fallback_profile, self._timed_call(self.fallback_profile, prompt), timeout)
+
+    async def astream(self, prompt: Any, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Stream the stage model's answer as it is generated.
+        
+        The wait for the first chunk is bounded like an ainvoke attempt; once
+        text is flowing the stream is not cut short. Streams are not hedged,
+        and fall back to the fallback profile only if the primary fails
+        before producing any text.
+        
+        Args:
+            prompt: The prompt passed to the chat model
+            timeout: Timeout for the first chunk in seconds; defaults to LLM_TIMEOUT
+            
+        Yields:
+            Pieces of the answer text
+            
+        Raises:
+            CircuitOpenError: If the last profile tried is known to be down
+            Exception: If both profiles fail, or a stream fails midway
+        """
+        from core.deadline import DeadlineExceeded
+
+        timeout = timeout or settings.LLM_TIMEOUT
+        profiles = [self.profile] + ([self.fallback_profile] if self.fallback_profile else [])
+        for profile in profiles:
+            started = False
+            try:
+                async for text in self._stream_profile(profile, prompt, timeout):
+                    started = True
+                    yield text
+                return
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                if started or profile == profiles[-1]:
+                    raise
+                reason = "timed out" if isinstance(e, asyncio.TimeoutError) else f"failed: {str(e)}"
+                logger.warning(f"LLM profile '{profile}' {reason} streaming for stage '{self.stage}', falling back to '{profiles[-1]}'")
+
+    @staticmethod
+    async def _stream_profile(profile: str, prompt: Any, timeout: float) -> AsyncIterator[str]:
+        from core.admission import get_llm_gate
+        from core.circuit_breaker import get_circuit_breaker
+        from core.deadline import within_deadline
+
+        breaker = get_circuit_breaker(f"llm.{profile}")
+        if not breaker.available:
+            breaker.before_call()
+        async with get_llm_gate().slot():
+            with breaker.guard():
+                stream = get_chat_model(profile).astream(prompt)
+                try:
+                    try:
+                        first = await within_deadline(stream.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        return
+                    yield first.content
+                    async for chunk in stream:
+                        yield chunk.content
+                finally:
+                    await stream.aclose()
+
+    @staticmethod
+    async def _attempt(profile: str, call: Awaitable, timeout: float):
+        from core.circuit_breaker import get_circuit_breaker
+        from core.deadline import DeadlineExceeded, within_deadline
+
+        try:
+            return await within_deadline(call, timeout)
+        except DeadlineExceeded:
+            raise
+        except asyncio.TimeoutError as e:
+            # The timeout cancels the call, which the breaker does not count by itself
+            get_circuit_breaker(f"llm.{profile}").record_failure(e)
+            raise
+
+@lru_cache(maxsize=None)
+def get_llm(stage: str = DEFAULT_STAGE) -> RoutedLLM:
+    """
+    Get the language model for a pipeline stage.
+
+    Args:
+        stage: Pipeline stage ("intent", "preprocess", "filter", "rag", "summary" or "default")
+
+    Returns:
+        A RoutedLLM bound to the stage's model profile and fallback
+
+    Raises:
+        Exception: If the stage or its profile is unknown
+    """
+    profile = get_stage_profiles().get(stage)
+    if profile is None:
+        raise Exception(f"Unknown LLM stage: {stage}")
+    if profile not in get_profile_models():
+        raise Exception(f"Unknown LLM profile '{profile}' for stage '{stage}'")
+    return RoutedLLM(stage, profile, get_fallback_profiles().get(profile))
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from loguru import logger
+
+# Marks the end of the stream on a stage's input queue
+_END = object()
+
+@dataclass
+class StageStats:
+    """Throughput counters for one pipeline stage."""
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    calls: int = 0
+    busy_seconds: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Items consumed per second of wall time while the stage was active."""
+        elapsed = self.elapsed_seconds
+        return self.items_in / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "calls": self.calls,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "items_per_second": round(self.throughput, 2),
+        }
+
+class Stage:
+    """
+    One step of a streaming pipeline.
+
+    func receives a list of up to batch_size items and returns the items to
+    pass downstream (any number, including none). With concurrency > 1 several
+    batches are processed at once and output order is not preserved.
+    """
+
+    def __init__(self, name: str, func: Callable[[List[Any]], Awaitable[List[Any]]],
+                 concurrency: int = 1, batch_size: int = 1, max_wait: float = 0.0):
+        self.name = name
+        self.func = func
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        # How long a worker lingers for more items before running a partial batch
+        self.max_wait = max_wait
+
+class StreamingPipeline:
+    """
+    Run stages concurrently, connected by bounded queues.
+
+    Every stage starts immediately and works on items as soon as the previous
+    stage emits them, so stages overlap in time. A full queue blocks the
+    producer, which bounds how many items are held in memory between stages.
+    An exception raised by a stage function cancels the whole pipeline;
+    stages are expected to handle recoverable errors themselves.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats = [StageStats(stage.name) for stage in stages]
+
+    async def _next_batch(self, stage: Stage, queue: asyncio.Queue) -> List[Any]:
+        first = await queue.get()
+        if first is _END:
+            return [_END]
+        batch = [first]
+        deadline = time.perf_counter() + stage.max_wait
+        while len(batch) < stage.batch_size:
+            try:
+                if queue.empty():
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    item = await asyncio.wait_for(queue.get(), timeout=remaining)
+                else:
+                    item = queue.get_nowait()
+            except asyncio.TimeoutError:
+                break
+            if item is _END:
+                # Leave the end marker for the next read so the batch still runs
+                queue.put_nowait(_END)
+                break
+            batch.append(item)
+        return batch
+
+    async def _worker(self, stage: Stage, stats: StageStats, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]):
+        while True:
+            batch = await self._next_batch(stage, inbox)
+            if batch[0] is _END:
+                # Let sibling workers see the end of the stream too
+                inbox.put_nowait(_END)
+                return
+            if stats.started_at is None:
+                stats.started_at = time.perf_counter()
+            stats.items_in += len(batch)
+            stats.calls += 1
+
+            start_time = time.perf_counter()
+            outputs = await stage.func(batch)
+            stats.busy_seconds += time.perf_counter() - start_time
+            stats.items_out += len(outputs)
+
+            if outbox is not None:
+                for output in outputs:
+                    await outbox.put(output)
+
+    async def _run_stage(self, index: int, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]):
+        stage, stats = self.stages[index], self.stats[index]
+        await asyncio.gather(*[
+            self._worker(stage, stats, inbox, outbox) for _ in range(stage.concurrency)
+        ])
+        stats.finished_at = time.perf_counter()
+        if outbox is not None:
+            await outbox.put(_END)
+
+    async def _feed(self, items: Iterable[Any], queue: asyncio.Queue):
+        for item in items:
+            await queue.put(item)
+        await queue.put(_END)
+
+    async def run(self, items: Iterable[Any]) -> List[StageStats]:
+        """
+        Push items through all stages and wait until the last stage drains.
+
+        Args:
+            items: Input items for the first stage
+
+        Returns:
+            Per-stage statistics, in stage order
+
+        Raises:
+            Exception: The first exception raised by any stage function
+        """
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        tasks = [asyncio.create_task(self._feed(items, queues[0]))]
+        for index in range(len(self.stages)):
+            outbox = queues[index + 1] if index + 1 < len(self.stages) else None
+            tasks.append(asyncio.create_task(self._run_stage(index, queues[index], outbox)))
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        for stats in self.stats:
+            logger.info(
+                f"Stage '{stats.name}': {stats.items_in} in, {stats.items_out} out, "
+                f"{stats.throughput:.1f} items/s, busy {stats.busy_seconds:.2f}s over {stats.elapsed_seconds:.2f}s"
+            )
+        return self.stats
@@ -0,0 +1,394 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from loguru import logger
+from config.settings import settings
+
+if TYPE_CHECKING:
+    import numpy as np
+    from langchain.schema import Document
+
+# Vectors are compared by inner product after L2 normalization (cosine similarity)
+
+def normalize_vectors(vectors: "np.ndarray") -> "np.ndarray":
+    """Scale each row to unit length so inner product equals cosine similarity."""
+    import numpy as np
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class ScalarQuantizer:
+    """
+    Per-dimension int8 quantization.
+
+    Each dimension is mapped linearly from its [min, max] range onto
+    [-128, 127]. Scoring decodes implicitly: q . (codes * scale + offset)
+    = codes . (q * scale) + q . offset, so a query costs one int8 x float
+    matrix-vector product. 1 byte per dimension, 4x smaller than float32.
+    """
+
+    name = "int8"
+
+    def __init__(self, offset: "np.ndarray", scale: "np.ndarray"):
+        self.offset = offset
+        self.scale = scale
+
+    @classmethod
+    def fit(cls, vectors: "np.ndarray") -> "ScalarQuantizer":
+        import numpy as np
+
+        low, high = vectors.min(axis=0), vectors.max(axis=0)
+        scale = np.maximum(high - low, 1e-12) / 255.0
+        # Code -128 maps to the dimension's minimum
+        offset = low + 128.0 * scale
+        return cls(offset.astype(np.float32), scale.astype(np.float32))
+
+    def encode(self, vectors: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+
+        codes = np.rint((vectors - self.offset) / self.scale)
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def decode(self, codes: "np.ndarray") -> "np.ndarray":
+        return codes.astype("float32") * self.scale + self.offset
+
+    def scores(self, query: "np.ndarray", codes: "np.ndarray") -> "np.ndarray":
+        """Approximate inner products between a float query and all codes."""
+        return codes.astype("float32") @ (query * self.scale) + float(query @ self.offset)
+
+    def scores_batch(self, queries: "np.ndarray", codes: "np.ndarray") -> "np.ndarray":
+        """Approximate inner products for several queries at once, shape (queries, codes)."""
+        return (queries * self.scale) @ codes.astype("float32").T + (queries @ self.offset)[:, None]
+
+    def state(self) -> Dict[str, "np.ndarray"]:
+        return {"offset": self.offset, "scale": self.scale}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, "np.ndarray"]) -> "ScalarQuantizer":
+        return cls(state["offset"], state["scale"])
+
+class ProductQuantizer:
+    """
+    Product quantization with asymmetric distance computation (ADC).
+
+    Vectors are split into `subspaces` equal slices and each slice is
+    replaced by the id of its nearest of up to 256 k-means centroids, so a
+    768-dim vector with 96 subspaces takes 96 bytes instead of 3072. At
+    query time the float query (not quantized, hence "asymmetric") is scored
+    once against every centroid, and a vector's score is the sum of table
+    lookups for its codes.
+    """
+
+    name = "pq"
+
+    def __init__(self, centroids: "np.ndarray"):
+        # Shape: (subspaces, centroids per subspace, slice dimension)
+        self.centroids = centroids
+
+    @property
+    def subspaces(self) -> int:
+        return self.centroids.shape[0]
+
+    @classmethod
+    def fit(cls, vectors: "np.ndarray", subspaces: int, iterations: int = 20, max_train: int = 20000,
+            seed: int = 0) -> "ProductQuantizer":
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        # Codebooks converge on a sample; training on millions of rows buys nothing
+        if len(vectors) > max_train:
+            vectors = vectors[rng.choice(len(vectors), size=max_train, replace=False)]
+        n, dim = vectors.shape
+        if dim % subspaces:
+            raise ValueError(f"Dimension {dim} is not divisible into {subspaces} subspaces")
+        k = min(256, n)
+        width = dim // subspaces
+        centroids = np.empty((subspaces, k, width), dtype=np.float32)
+
+        for j in range(subspaces):
+            data = vectors[:, j * width:(j + 1) * width]
+            centers = data[rng.choice(n, size=k, replace=False)].copy()
+            for _ in range(iterations):
+                assignment = cls._nearest(data, centers)
+                counts = np.bincount(assignment, minlength=k)
+                sums = np.stack([np.bincount(assignment, weights=data[:, w], minlength=k) for w in range(width)], axis=1)
+                empty = counts == 0
+                centers[~empty] = sums[~empty] / counts[~empty, None]
+                # Re-seed empty clusters from random points
+                if empty.any():
+                    centers[empty] = data[rng.choice(n, size=int(empty.sum()))]
+            centroids[j] = centers
+        return cls(centroids)
+
+    @staticmethod
+    def _nearest(data: "np.ndarray", centers: "np.ndarray") -> "np.ndarray":
+        distances = (centers ** 2).sum(axis=1)[None, :] - 2.0 * data @ centers.T
+        return distances.argmin(axis=1)
+
+    def encode(self, vectors: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+
+        width = self.centroids.shape[2]
+        codes = np.empty((vectors.shape[0], self.subspaces), dtype=np.uint8)
+        for j in range(self.subspaces):
+            codes[:, j] = self._nearest(vectors[:, j * width:(j + 1) * width], self.centroids[j])
+        return codes
+
+    def decode(self, codes: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+
+        return np.concatenate([self.centroids[j][codes[:, j]] for j in range(self.subspaces)], axis=1)
+
+    def scores(self, query: "np.ndarray", codes: "np.ndarray") -> "np.ndarray":
+        """Approximate inner products between a float query and all codes (ADC)."""
+        import numpy as np
+
+        width = self.centroids.shape[2]
+        # tables[j, c] = query slice j . centroid c of subspace j
+        tables = np.einsum("jkw,jw->jk", self.centroids, query.reshape(self.subspaces, width))
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for j in range(self.subspaces):
+            scores += tables[j][codes[:, j]]
+        return scores
+
+    def scores_batch(self, queries: "np.ndarray", codes: "np.ndarray") -> "np.ndarray":
+        """Approximate inner products for several queries at once, shape (queries, codes)."""
+        import numpy as np
+
+        width = self.centroids.shape[2]
+        # tables[j, c, q]: each code then selects one contiguous row of per-query scores
+        tables = np.einsum("jkw,qjw->jkq", self.centroids, queries.reshape(len(queries), self.subspaces, width))
+        tables = np.ascontiguousarray(tables, dtype=np.float32)
+        scores = np.zeros((len(codes), len(queries)), dtype=np.float32)
+        for j in range(self.subspaces):
+            scores += np.take(tables[j], codes[:, j].astype(np.intp), axis=0)
+        return scores.T
+
+    def state(self) -> Dict[str, "np.ndarray"]:
+        return {"centroids": self.centroids}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, "np.ndarray"]) -> "ProductQuantizer":
+        return cls(state["centroids"])
+
+# Rows scored per block, so a query never materializes a float copy of every code
+SCORE_BLOCK_ROWS = 8192
+# Queries scored together in a batch search, bounding the (queries x block) score matrix
+SCORE_BLOCK_QUERIES = 64
+
+QUANTIZERS = {ScalarQuantizer.name: ScalarQuantizer, ProductQuantizer.name: ProductQuantizer}
+
+def top_k(scores: "np.ndarray", k: int) -> "np.ndarray":
+    """Indices of the k highest scores, best first."""
+    import numpy as np
+
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+class LocalVectorIndex:
+    """
+    In-process ANN index over quantized vectors with exact re-scoring.
+
+    Quantized codes are held in RAM and scanned for every query. The best
+    `candidates` rows are then re-scored against the full float32 vectors,
+    which stay on disk in a memory-mapped file and are only paged in for
+    those rows.
+
+    On-disk layout of an index directory:
+        quantizer.npz   quantizer parameters
+        codes.npy       quantized vectors
+        vectors.f32     normalized float32 vectors (memory-mapped)
+        documents.jsonl one {"id", "text", "metadata"} record per row
+    """
+
+    def __init__(self, quantizer, codes: "np.ndarray", vectors: "np.ndarray", documents: List[Dict[str, Any]]):
+        self.quantizer = quantizer
+        self.codes = codes
+        self.vectors = vectors
+        self.documents = documents
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @classmethod
+    def build(cls, vectors: "np.ndarray", documents: List[Dict[str, Any]], method: str, subspaces: int) -> "LocalVectorIndex":
+        """
+        Train a quantizer on the vectors and encode them.
+
+        Args:
+            vectors: Float vectors, one row per document
+            documents: {"id", "text", "metadata"} record per row
+            method: "pq" or "int8"
+            subspaces: Number of PQ subspaces (ignored for int8)
+
+        Returns:
+            An in-memory LocalVectorIndex
+        """
+        if method not in QUANTIZERS:
+            raise ValueError(f"Unknown quantization method: {method}")
+        vectors = normalize_vectors(vectors)
+        if method == ProductQuantizer.name:
+            quantizer = ProductQuantizer.fit(vectors, subspaces)
+        else:
+            quantizer = ScalarQuantizer.fit(vectors)
+        return cls(quantizer, quantizer.encode(vectors), vectors, documents)
+
+    def save(self, path: Path):
+        import numpy as np
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.savez(path / "quantizer.npz", method=np.array(self.quantizer.name), **self.quantizer.state())
+        np.save(path / "codes.npy", self.codes)
+        np.asarray(self.vectors, dtype=np.float32).tofile(path / "vectors.f32")
+        with open(path / "documents.jsonl", "w", encoding="utf-8") as f:
+            for document in self.documents:
+                f.write(json.dumps(document, ensure_ascii=False) + "\n")
+
+    @classmethod
+    def load(cls, path: Path) -> "LocalVectorIndex":
+        import numpy as np
+
+        path = Path(path)
+        with np.load(path / "quantizer.npz") as data:
+            state = {key: data[key] for key in data.files if key != "method"}
+            quantizer = QUANTIZERS[str(data["method"])].from_state(state)
+        codes = np.load(path / "codes.npy")
+        with open(path / "documents.jsonl", "r", encoding="utf-8") as f:
+            documents = [json.loads(line) for line in f if line.strip()]
+        vectors = np.memmap(path / "vectors.f32", dtype=np.float32, mode="r").reshape(len(documents), -1)
+        return cls(quantizer, codes, vectors, documents)
+
+    def search(self, query: "np.ndarray", k: int, candidates: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Find the rows most similar to a query vector.
+
+        Args:
+            query: Query embedding
+            k: Number of results
+            candidates: Rows re-scored exactly; 0 returns the approximate ranking
+
+        Returns:
+            List of (row, cosine similarity) tuples, best first
+        """
+        import numpy as np
+
+        query = normalize_vectors(query)
+        approximate_scores = np.concatenate([
+            self.quantizer.scores(query, self.codes[start:start + SCORE_BLOCK_ROWS])
+            for start in range(0, max(1, len(self.codes)), SCORE_BLOCK_ROWS)
+        ])
+        approximate = top_k(approximate_scores, max(k, candidates or 0))
+        if not candidates:
+            return [(int(row), float(approximate_scores[row])) for row in approximate[:k]]
+        # Sorted rows keep memmap reads sequential
+        rows = np.sort(approximate)
+        exact = np.asarray(self.vectors[rows]) @ query
+        best = top_k(exact, k)
+        return [(int(rows[i]), float(exact[i])) for i in best]
+
+    def search_batch(self, queries: "np.ndarray", k: int, candidates: Optional[int] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Find the rows most similar to each of several query vectors.
+
+        Every block of codes is scored against a whole group of queries in
+        one matrix product, and only each query's best candidates are kept
+        between blocks.
+
+        Args:
+            queries: Query embeddings, one row per query
+            k: Number of results per query
+            candidates: Rows re-scored exactly per query; 0 returns the approximate ranking
+
+        Returns:
+            One list of (row, cosine similarity) tuples per query, best first
+        """
+        import numpy as np
+
+        queries = normalize_vectors(np.atleast_2d(queries))
+        keep = min(max(k, candidates or 0), len(self.codes))
+        results = []
+        for query_start in range(0, len(queries), SCORE_BLOCK_QUERIES):
+            group = queries[query_start:query_start + SCORE_BLOCK_QUERIES]
+            best_scores = np.empty((len(group), 0), dtype=np.float32)
+            best_rows = np.empty((len(group), 0), dtype=np.int64)
+            for start in range(0, len(self.codes), SCORE_BLOCK_ROWS):
+                block_scores = self.quantizer.scores_batch(group, self.codes[start:start + SCORE_BLOCK_ROWS])
+                block_rows = np.broadcast_to(np.arange(start, start + block_scores.shape[1]), block_scores.shape)
+                best_scores = np.concatenate([best_scores, block_scores], axis=1)
+                best_rows = np.concatenate([best_rows, block_rows], axis=1)
+                if best_scores.shape[1] > keep:
+                    partition = np.argpartition(-best_scores, keep - 1, axis=1)[:, :keep]
+                    best_scores = np.take_along_axis(best_scores, partition, axis=1)
+                    best_rows = np.take_along_axis(best_rows, partition, axis=1)
+
+            for query, scores, rows in zip(group, best_scores, best_rows):
+                if not candidates:
+                    order = top_k(scores, k)
+                    results.append([(int(rows[i]), float(scores[i])) for i in order])
+                    continue
+                # Sorted rows keep memmap reads sequential
+                rows = np.sort(rows)
+                exact = np.asarray(self.vectors[rows]) @ query
+                results.append([(int(rows[i]), float(exact[i])) for i in top_k(exact, k)])
+        return results
+
+    def _to_documents(self, hits: List[Tuple[int, float]], k: int, namespaces: Optional[List[str]]) -> List[Tuple["Document", float]]:
+        from langchain.schema import Document
+
+        results = []
+        for row, score in hits:
+            record = self.documents[row]
+            metadata = record.get("metadata", {})
+            if namespaces is not None and metadata.get("namespace", "") not in namespaces:
+                continue
+            results.append((Document(page_content=record["text"], metadata={**metadata, "id": record["id"]}), score))
+        return results[:k]
+
+    @staticmethod
+    def _fetch_sizes(k: int, candidates: int, namespaces: Optional[List[str]]) -> Tuple[int, int]:
+        # Over-fetch when scoped, since rows from other namespaces are filtered out afterwards
+        fetch = k if namespaces is None else max(k, candidates) * 4
+        return fetch, candidates and max(fetch, candidates)
+
+    def search_documents(self, query: List[float], k: int, candidates: int,
+                         namespaces: Optional[List[str]] = None) -> List[Tuple["Document", float]]:
+        """Search and return langchain Documents, like a vector store's scored search."""
+        import numpy as np
+
+        fetch, rescore = self._fetch_sizes(k, candidates, namespaces)
+        return self._to_documents(self.search(np.asarray(query, dtype=np.float32), fetch, rescore), k, namespaces)
+
+    def search_documents_batch(self, queries: List[List[float]], k: int, candidates: int,
+                               namespaces: Optional[List[str]] = None) -> List[List[Tuple["Document", float]]]:
+        """Batch version of search_documents; one result list per query, in order."""
+        import numpy as np
+
+        fetch, rescore = self._fetch_sizes(k, candidates, namespaces)
+        hits = self.search_batch(np.asarray(queries, dtype=np.float32), fetch, rescore)
+        return [self._to_documents(query_hits, k, namespaces) for query_hits in hits]
+
+@lru_cache(maxsize=None)
+def get_local_vector_index() -> LocalVectorIndex:
+    """
+    Get the local quantized vector index, loading it from LOCAL_INDEX_DIR on first use.
+
+    Build it with scripts/build_local_index.py.
+
+    Returns:
+        The process-wide LocalVectorIndex instance
+
+    Raises:
+        Exception: If no index has been built
+    """
+    path = Path(settings.LOCAL_INDEX_DIR)
+    if not (path / "codes.npy").exists():
+        raise Exception(f"No local vector index at {path}; run scripts/build_local_index.py first")
+    index = LocalVectorIndex.load(path)
+    logger.info(f"Loaded local {index.quantizer.name} vector index from {path} with {len(index)} vectors")
+    return index
@@ -0,0 +1,174 @@
+import asyncio
+import threading
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Awaitable, Callable, ContextManager, List, Optional, Set, Tuple
+from cachetools import LRUCache
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+if TYPE_CHECKING:
+    from core.circuit_breaker import CircuitBreaker
+
+class QueryEmbeddingBatcher:
+    """
+    Coalesces concurrent query embeddings into batched embed calls.
+
+    The first query to arrive opens a short window; every query submitted
+    before the window closes (or until the batch is full) is embedded in the
+    same call, and each caller receives its own vector.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]], window: float, max_batch_size: int):
+        self.embed_batch = embed_batch
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.batches_sent = 0
+        self.queries_embedded = 0
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed a query as part of the next batch.
+
+        Args:
+            text: The query text
+
+        Returns:
+            The query embedding
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        # Identical queries in the same window share one embedding
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = await self.embed_batch(texts)
+            self.batches_sent += 1
+            self.queries_embedded += len(texts)
+            logger.debug(f"Embedded {len(texts)} queries for {len(batch)} callers in one batch")
+            by_text = dict(zip(texts, vectors))
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(by_text[text])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+class QueryCachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper adding an in-memory LRU and micro-batching for queries.
+
+    Document embeddings are delegated to the file-backed cache unchanged.
+    Query embeddings, which CacheBackedEmbeddings does not cache, are served
+    from an LRU, and concurrent async lookups are coalesced by a batcher.
+    Calls that reach the embedding API go through the optional circuit
+    breaker; cache hits are served even while it is open.
+    """
+
+    def __init__(self, document_embeddings: Embeddings, query_model, cache_size: int, batch_window: float, max_batch_size: int,
+                 breaker: Optional["CircuitBreaker"] = None):
+        self.document_embeddings = document_embeddings
+        self.query_model = query_model
+        self.breaker = breaker
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._cache: LRUCache = LRUCache(maxsize=cache_size)
+        self._lock = threading.Lock()
+        self._batcher: Optional[QueryEmbeddingBatcher] = None
+        self._batcher_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return " ".join(text.split())
+
+    def _cached(self, text: str) -> Optional[List[float]]:
+        with self._lock:
+            return self._cache.get(self._key(text))
+
+    def _store(self, text: str, vector: List[float]):
+        with self._lock:
+            self._cache[self._key(text)] = vector
+
+    def _guard(self) -> ContextManager:
+        return self.breaker.guard() if self.breaker is not None else nullcontext()
+
+    def _embed_query_batch_sync(self, texts: List[str]) -> List[List[float]]:
+        with self._guard():
+            return self.query_model.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+
+    async def _embed_query_batch(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self._embed_query_batch_sync, texts)
+
+    def _get_batcher(self) -> QueryEmbeddingBatcher:
+        # Futures are bound to a loop, so each event loop gets its own batcher
+        loop = asyncio.get_running_loop()
+        if self._batcher is None or self._batcher_loop is not loop:
+            self._batcher = QueryEmbeddingBatcher(self._embed_query_batch, self.batch_window, self.max_batch_size)
+            self._batcher_loop = loop
+        return self._batcher
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._guard():
+            return self.document_embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._guard():
+            return await self.document_embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self._cached(text)
+        if vector is None:
+            with self._guard():
+                vector = self.query_model.embed_query(text)
+            self._store(text, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = self._cached(text)
+        if vector is None:
+            vector = await self._get_batcher().embed(text)
+            self._store(text, vector)
+        return vector
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed many queries at once.
+
+        Cached queries are served from the LRU and the remaining distinct
+        queries go out in a single embed call, bypassing the batcher's window.
+
+        Args:
+            texts: The query texts
+
+        Returns:
+            One embedding per text, in order
+        """
+        vectors = [self._cached(text) for text in texts]
+        missing = list(dict.fromkeys(self._key(text) for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            by_key = dict(zip(missing, await self._embed_query_batch(missing)))
+            for key, vector in by_key.items():
+                self._store(key, vector)
+            vectors = [vector if vector is not None else by_key[self._key(text)] for text, vector in zip(texts, vectors)]
+            logger.debug(f"Embedded {len(missing)} of {len(texts)} batch queries, {len(texts) - len(missing)} served from cache")
+        return vectors
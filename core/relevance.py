@@ -0,0 +1,176 @@
+import json
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from config.settings import settings
+from core.lexical_index import tokenize
+
+PRICE_PATTERN = re.compile(r"(?:[$₹£€]|\brs\.?|\binr)\s?\d+(?:[.,]\d{1,2})?|\b\d+(?:\.\d{2})?\s?(?:/-|rs\b|inr\b)", re.IGNORECASE)
+HOURS_PATTERN = re.compile(r"\b\d{1,2}(?::\d{2})?\s?(?:am|pm)\b|\b(?:mon|tues?|wed(?:nes)?|thu(?:rs)?|fri|sat(?:ur)?|sun)(?:day)?\b|\bopen(?:ing)?\s+(?:hours|time)\b|\bclosed\b", re.IGNORECASE)
+PHONE_PATTERN = re.compile(r"(?:\+\d{1,3}[\s-]?)?(?:\(?\d{2,5}\)?[\s-]?)?\d{3,5}[\s-]?\d{4,6}\b")
+ADDRESS_PATTERN = re.compile(r"\b(?:road|rd|street|st|lane|marg|nagar|sector|floor|near|opp|pincode|address|location|directions)\b|\b\d{6}\b", re.IGNORECASE)
+MENU_PATTERN = re.compile(r"\b(?:menu|starters?|appetizers?|main course|desserts?|beverages?|biryani|kebabs?|curry|paneer|chicken|mutton|thali|dish(?:es)?|cuisine|serves|spicy|vegan|vegetarian|veg|non-veg|gluten|restaurant|cafe|dining|chef)\b", re.IGNORECASE)
+BOILERPLATE_PATTERN = re.compile(r"\b(?:cookies?|privacy policy|terms (?:of|and) (?:use|service|conditions)|all rights reserved|copyright|subscribe|newsletter|sign in|log in|login|sign up|enable javascript|accept all)\b|©", re.IGNORECASE)
+MARKDOWN_LINK_PATTERN = re.compile(r"!?\[[^\]]*\]\([^)]*\)")
+
+@dataclass
+class RelevanceDecision:
+    """Pre-filter verdict for one chunk."""
+    score: float
+    action: str  # "skip", "llm" or "fast_track"
+
+def extract_features(text: str) -> Dict[str, float]:
+    """
+    Compute lexical relevance signals for a chunk.
+
+    Args:
+        text: The raw chunk text
+
+    Returns:
+        Mapping of feature name to a value in [0, 1]
+    """
+    link_chars = sum(len(match.group(0)) for match in MARKDOWN_LINK_PATTERN.finditer(text))
+    return {
+        "price": min(1.0, len(PRICE_PATTERN.findall(text)) / 3),
+        "hours": min(1.0, len(HOURS_PATTERN.findall(text)) / 2),
+        "phone": min(1.0, float(len(PHONE_PATTERN.findall(text)))),
+        "address": min(1.0, len(ADDRESS_PATTERN.findall(text)) / 2),
+        "menu": min(1.0, len(MENU_PATTERN.findall(text)) / 4),
+        "boilerplate": min(1.0, len(BOILERPLATE_PATTERN.findall(text)) / 3),
+        "link_density": link_chars / max(1, len(text)),
+    }
+
+def heuristic_score(features: Dict[str, float]) -> float:
+    """Combine lexical signals into a relevance score in [0, 1]."""
+    relevance = (
+        0.3 * features["price"]
+        + 0.2 * features["hours"]
+        + 0.15 * features["phone"]
+        + 0.15 * features["address"]
+        + 0.3 * features["menu"]
+    )
+    noise = 0.6 * features["link_density"] + 0.4 * features["boilerplate"]
+    return max(0.0, min(1.0, relevance - 0.5 * noise))
+
+class TinyRelevanceClassifier:
+    """
+    Logistic regression over lexical features and tokens.
+
+    Weights are trained offline with scripts/train_relevance_classifier.py and
+    stored as JSON: {"bias": float, "features": {...}, "tokens": {...}}.
+    """
+
+    def __init__(self, bias: float, feature_weights: Dict[str, float], token_weights: Dict[str, float]):
+        self.bias = bias
+        self.feature_weights = feature_weights
+        self.token_weights = token_weights
+
+    @classmethod
+    def load(cls, path: Path) -> "TinyRelevanceClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["bias"], data.get("features", {}), data.get("tokens", {}))
+
+    def predict(self, text: str, features: Dict[str, float]) -> float:
+        """Probability that the chunk holds relevant restaurant data."""
+        tokens = set(tokenize(text))
+        logit = self.bias
+        logit += sum(weight * features.get(name, 0.0) for name, weight in self.feature_weights.items())
+        logit += sum(self.token_weights.get(token, 0.0) for token in tokens)
+        return 1 / (1 + math.exp(-max(-30.0, min(30.0, logit))))
+
+class RelevancePrefilter:
+    """Fast local scorer deciding which chunks need LLM preprocessing."""
+
+    def __init__(self, skip_threshold: float, fast_track_threshold: float, fast_track_max_chars: int,
+                 classifier: Optional[TinyRelevanceClassifier] = None, classifier_weight: float = 0.5):
+        self.skip_threshold = skip_threshold
+        self.fast_track_threshold = fast_track_threshold
+        self.fast_track_max_chars = fast_track_max_chars
+        self.classifier = classifier
+        self.classifier_weight = classifier_weight
+
+    def score(self, text: str) -> float:
+        """
+        Score a chunk's likelihood of holding restaurant facts.
+
+        Args:
+            text: The raw chunk text
+
+        Returns:
+            Relevance score in [0, 1]
+        """
+        features = extract_features(text)
+        score = heuristic_score(features)
+        if self.classifier is not None:
+            score = (1 - self.classifier_weight) * score + self.classifier_weight * self.classifier.predict(text, features)
+        return score
+
+    def decide(self, text: str) -> RelevanceDecision:
+        """
+        Decide whether a chunk is skipped, sent to the LLM or fast-tracked.
+
+        Fast-tracking (indexing the raw chunk without LLM cleanup) is limited
+        to short chunks that score above the fast-track threshold.
+
+        Args:
+            text: The raw chunk text
+
+        Returns:
+            The decision with its score
+        """
+        score = self.score(text)
+        if score < self.skip_threshold:
+            return RelevanceDecision(score, "skip")
+        if score >= self.fast_track_threshold and len(text) <= self.fast_track_max_chars:
+            return RelevanceDecision(score, "fast_track")
+        return RelevanceDecision(score, "llm")
+
+    def partition(self, chunks: List[str]) -> Tuple[List[str], List[str], int]:
+        """
+        Split chunks into those needing the LLM, those fast-tracked, and a skip count.
+
+        Args:
+            chunks: Raw text chunks
+
+        Returns:
+            Tuple of (chunks for LLM preprocessing, fast-tracked chunks, number skipped)
+        """
+        to_llm, fast_tracked, skipped = [], [], 0
+        for chunk in chunks:
+            action = self.decide(chunk).action
+            if action == "skip":
+                skipped += 1
+            elif action == "fast_track":
+                fast_tracked.append(chunk)
+            else:
+                to_llm.append(chunk)
+        logger.info(f"Relevance pre-filter: {len(to_llm)} to LLM, {len(fast_tracked)} fast-tracked, {skipped} skipped")
+        return to_llm, fast_tracked, skipped
+
+@lru_cache(maxsize=None)
+def get_relevance_prefilter() -> RelevancePrefilter:
+    """
+    Get the shared relevance pre-filter, loading the optional classifier.
+
+    Returns:
+        The process-wide RelevancePrefilter instance
+    """
+    classifier = None
+    if settings.PREFILTER_MODEL_PATH:
+        try:
+            classifier = TinyRelevanceClassifier.load(Path(settings.PREFILTER_MODEL_PATH))
+            logger.info(f"Loaded relevance classifier from {settings.PREFILTER_MODEL_PATH}")
+        except Exception as e:
+            logger.warning(f"Could not load relevance classifier, using lexical signals only: {str(e)}")
+    return RelevancePrefilter(
+        skip_threshold=settings.PREFILTER_SKIP_THRESHOLD,
+        fast_track_threshold=settings.PREFILTER_FAST_TRACK_THRESHOLD,
+        fast_track_max_chars=settings.PREFILTER_FAST_TRACK_MAX_CHARS,
+        classifier=classifier,
+        classifier_weight=settings.PREFILTER_MODEL_WEIGHT
+    )
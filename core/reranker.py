@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Tuple
+from cachetools import LRUCache
+from loguru import logger
+from config.settings import settings
+from core.lexical_index import tokenize
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+class LexicalOverlapReranker:
+    """Cheap reranker scoring documents by query term and bigram overlap."""
+
+    name = "lexical"
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """
+        Score texts against a query.
+
+        Args:
+            query: The search query
+            texts: Candidate texts
+
+        Returns:
+            One relevance score per text, higher is better
+        """
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return [0.0 for _ in texts]
+        query_tokens = tokenize(query)
+        query_bigrams = set(zip(query_tokens, query_tokens[1:]))
+
+        scores = []
+        for text in texts:
+            tokens = tokenize(text)
+            term_overlap = len(query_terms.intersection(tokens)) / len(query_terms)
+            bigram_overlap = 0.0
+            if query_bigrams:
+                bigram_overlap = len(query_bigrams.intersection(zip(tokens, tokens[1:]))) / len(query_bigrams)
+            scores.append(term_overlap + 0.5 * bigram_overlap)
+        return scores
+
+class CrossEncoderReranker:
+    """Local cross-encoder reranker backed by sentence-transformers."""
+
+    name = "cross-encoder"
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name, device="cpu")
+        self._lock = threading.Lock()
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """
+        Score texts against a query with the cross-encoder.
+
+        Args:
+            query: The search query
+            texts: Candidate texts
+
+        Returns:
+            One relevance score per text, higher is better
+        """
+        with self._lock:
+            return [float(score) for score in self.model.predict([(query, text) for text in texts])]
+
+class CachedReranker:
+    """Reranker wrapper that caches (query, document) pair scores."""
+
+    def __init__(self, scorer, cache_size: int):
+        self.scorer = scorer
+        self._cache: LRUCache = LRUCache(maxsize=cache_size)
+        self._lock = threading.Lock()
+
+    def _key(self, query: str, text: str) -> Tuple[str, str, str]:
+        text_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        return (self.scorer.name, " ".join(query.lower().split()), text_hash)
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """
+        Score texts, computing only the pairs missing from the cache.
+
+        Args:
+            query: The search query
+            texts: Candidate texts
+
+        Returns:
+            One relevance score per text, higher is better
+        """
+        keys = [self._key(query, text) for text in texts]
+        with self._lock:
+            scores = [self._cache.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            fresh = self.scorer.score(query, [texts[i] for i in missing])
+            with self._lock:
+                for i, score in zip(missing, fresh):
+                    scores[i] = score
+                    self._cache[keys[i]] = score
+        logger.debug(f"Reranker scored {len(missing)} pairs, {len(texts) - len(missing)} served from cache")
+        return scores
+
+@lru_cache(maxsize=None)
+def get_reranker() -> CachedReranker:
+    """
+    Get the shared reranker configured by RERANK_BACKEND.
+
+    "cross-encoder" requires sentence-transformers, "lexical" uses term
+    overlap, and "auto" tries the cross-encoder and falls back to lexical
+    overlap when the model or the package is not available.
+
+    Returns:
+        The process-wide CachedReranker instance
+    """
+    scorer = None
+    if settings.RERANK_BACKEND in ("auto", "cross-encoder"):
+        try:
+            scorer = CrossEncoderReranker(settings.RERANK_MODEL)
+            logger.info(f"Loaded cross-encoder reranker {settings.RERANK_MODEL}")
+        except Exception as e:
+            if settings.RERANK_BACKEND == "cross-encoder":
+                raise Exception(f"Reranker initialization failed: {str(e)}")
+            logger.warning(f"Cross-encoder unavailable ({str(e)}), using lexical overlap reranker")
+    if scorer is None:
+        scorer = LexicalOverlapReranker()
+    return CachedReranker(scorer, cache_size=settings.RERANK_CACHE_SIZE)
+
+async def rerank(query: str, docs: List["Document"], top_n: int) -> List["Document"]:
+    """
+    Reorder candidate documents by reranker score and keep the best ones.
+
+    Args:
+        query: The search query
+        docs: Candidate documents, in retrieval order
+        top_n: Number of documents to keep
+
+    Returns:
+        The top_n documents, best first
+    """
+    if not docs:
+        return docs
+    scores = await asyncio.to_thread(get_reranker().score, query, [doc.page_content for doc in docs])
+    # Sort is stable, so ties keep their retrieval order
+    ranked = sorted(zip(docs, scores), key=lambda item: item[1], reverse=True)
+    return [doc for doc, _ in ranked[:top_n]]
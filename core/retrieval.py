@@ -0,0 +1,268 @@
+import asyncio
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from loguru import logger
+from config.settings import settings
+from core.circuit_breaker import CircuitOpenError
+from core.deadline import DeadlineExceeded, record_degradation, should_degrade, within_deadline
+from core.embeddings import get_embeddings
+from core.index_registry import DEFAULT_NAMESPACE, get_index_registry
+from core.lexical_index import get_lexical_index
+from core.reranker import rerank
+from core.vectorstore import get_vectorstore_breaker
+from utils.logging_utils import sampled_logger
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+    from langchain_pinecone import PineconeVectorStore
+
+def reciprocal_rank_fusion(result_lists: List[List["Document"]], k: int = 60) -> List[Tuple["Document", float]]:
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+    
+    Each document scores sum(1 / (k + rank)) over the lists it appears in.
+    Documents are identified by their content, so the same chunk returned by
+    both retrievers is merged into a single entry.
+    
+    Args:
+        result_lists: Ranked lists of documents, best first
+        k: Damping constant; higher values flatten the rank contribution
+        
+    Returns:
+        List of (Document, fused score) tuples, best first
+    """
+    fused: Dict[str, Tuple["Document", float]] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = doc.page_content
+            existing_doc, score = fused.get(key, (doc, 0.0))
+            fused[key] = (existing_doc, score + 1.0 / (k + rank))
+    return sorted(fused.values(), key=lambda item: item[1], reverse=True)
+
+async def search_namespaces(namespaces: Optional[List[str]]) -> List[str]:
+    """
+    Namespaces a dense search has to cover.
+    
+    Pinecone queries one namespace at a time, so an unscoped search fans out
+    to every namespace the index registry knows about. The registry's list
+    is kept in memory and re-read every NAMESPACE_CACHE_SECONDS, off the
+    event loop.
+    
+    Args:
+        namespaces: Namespaces requested by the caller, or None for all
+        
+    Returns:
+        List of namespace names
+    """
+    if namespaces is not None:
+        return list(dict.fromkeys(namespaces))
+    if settings.NAMESPACE_MODE != "site":
+        return [DEFAULT_NAMESPACE]
+    registry = get_index_registry()
+    known = registry.cached_namespaces(settings.NAMESPACE_CACHE_SECONDS)
+    if known is None:
+        known = await asyncio.to_thread(registry.namespaces)
+    return list(dict.fromkeys([DEFAULT_NAMESPACE, *known]))
+
+async def _search_pinecone(vector_store: "PineconeVectorStore", embedding: List[float], k: int,
+                           targets: List[str]) -> List[Tuple["Document", float]]:
+    # One search per namespace, at most NAMESPACE_SEARCH_CONCURRENCY at a time, merged by score
+    semaphore = asyncio.Semaphore(settings.NAMESPACE_SEARCH_CONCURRENCY)
+    
+    async def search_one(namespace: str) -> List[Tuple["Document", float]]:
+        async with semaphore:
+            return await asyncio.to_thread(vector_store.similarity_search_by_vector_with_score, embedding, k=k, namespace=namespace)
+    
+    with get_vectorstore_breaker().guard():
+        per_namespace = await asyncio.gather(*[search_one(namespace) for namespace in targets])
+    results = [result for results in per_namespace for result in results]
+    return sorted(results, key=lambda item: item[1], reverse=True)[:k]
+
+async def _search_pinecone_bounded(vector_store: "PineconeVectorStore", embedding: List[float], k: int,
+                                   targets: List[str]) -> List[Tuple["Document", float]]:
+    # _search_pinecone bounded by VECTOR_SEARCH_TIMEOUT and the request's deadline
+    try:
+        return await within_deadline(_search_pinecone(vector_store, embedding, k, targets), settings.VECTOR_SEARCH_TIMEOUT)
+    except DeadlineExceeded:
+        raise
+    except asyncio.TimeoutError as e:
+        # The timeout cancels the search, which the breaker does not count by itself
+        get_vectorstore_breaker().record_failure(e)
+        raise
+
+async def dense_search(vector_store: "PineconeVectorStore", query: str, k: int,
+                       namespaces: Optional[List[str]] = None) -> List["Document"]:
+    """
+    Run a dense similarity search without blocking the event loop.
+    
+    With VECTOR_SEARCH_BACKEND=local the search runs against the in-process
+    quantized index instead of Pinecone. The embedding and the search are
+    each bounded by their timeout and the request's deadline.
+    
+    Args:
+        vector_store: The vector store to search
+        query: The search query
+        k: Number of documents to return
+        namespaces: Only search these namespaces (all when None)
+        
+    Returns:
+        List of matching documents, best first
+        
+    Raises:
+        asyncio.TimeoutError: If embedding or searching takes too long
+        CircuitOpenError: If the embedding API or Pinecone is known to be down
+    """
+    # Embedding through the async path lets concurrent requests share one batched call
+    embedding = await within_deadline(get_embeddings().aembed_query(query), settings.EMBEDDING_TIMEOUT)
+    if settings.VECTOR_SEARCH_BACKEND == "local":
+        from core.quantization import get_local_vector_index
+        
+        results = await within_deadline(asyncio.to_thread(
+            get_local_vector_index().search_documents, embedding, k, settings.LOCAL_INDEX_RESCORE_CANDIDATES, namespaces
+        ), settings.VECTOR_SEARCH_TIMEOUT)
+        return [doc for doc, _ in results]
+    
+    results = await _search_pinecone_bounded(vector_store, embedding, k, await search_namespaces(namespaces))
+    return [doc for doc, _ in results]
+
+async def dense_search_batch(vector_store: "PineconeVectorStore", queries: List[str], k: int,
+                             namespaces: Optional[List[str]] = None) -> List[List[Tuple["Document", float]]]:
+    """
+    Run dense similarity searches for many queries at once.
+    
+    All queries are embedded in one batched call. The local quantized index
+    scores them together block by block; Pinecone searches run concurrently,
+    at most QUERY_BATCH_CONCURRENCY at a time. As in dense_search, the
+    embedding and each search are bounded by their timeout and the
+    request's deadline.
+    
+    Args:
+        vector_store: The vector store to search
+        queries: The search queries
+        k: Number of documents to return per query
+        namespaces: Only search these namespaces (all when None)
+        
+    Returns:
+        One list of (Document, similarity score) tuples per query, in order, best first
+        
+    Raises:
+        asyncio.TimeoutError: If embedding or a search takes too long
+        CircuitOpenError: If the embedding API or Pinecone is known to be down
+    """
+    embeddings = await within_deadline(get_embeddings().aembed_queries(queries), settings.EMBEDDING_TIMEOUT)
+    if settings.VECTOR_SEARCH_BACKEND == "local":
+        from core.quantization import get_local_vector_index
+        
+        return await within_deadline(asyncio.to_thread(
+            get_local_vector_index().search_documents_batch, embeddings, k, settings.LOCAL_INDEX_RESCORE_CANDIDATES, namespaces
+        ), settings.VECTOR_SEARCH_TIMEOUT)
+    
+    semaphore = asyncio.Semaphore(settings.QUERY_BATCH_CONCURRENCY)
+    targets = await search_namespaces(namespaces)
+    
+    async def search_one(embedding: List[float]) -> List[Tuple["Document", float]]:
+        async with semaphore:
+            return await _search_pinecone_bounded(vector_store, embedding, k, targets)
+    
+    return await asyncio.gather(*[search_one(embedding) for embedding in embeddings])
+
+def lexical_search(query: str, k: int, namespaces: Optional[List[str]] = None) -> List["Document"]:
+    """
+    Run a BM25 search against the local lexical index.
+    
+    Args:
+        query: The search query
+        k: Number of documents to return
+        namespaces: Only search these namespaces (all when None)
+        
+    Returns:
+        List of matching documents, best first
+    """
+    return [doc for doc, _ in get_lexical_index().search(query, k, namespaces)]
+
+async def hybrid_search(vector_store: "PineconeVectorStore", query: str, k: int,
+                        namespaces: Optional[List[str]] = None) -> List["Document"]:
+    """
+    Retrieve documents with dense and lexical search fused by reciprocal rank.
+    
+    Exact matches on dish names, prices and phone numbers come from the BM25
+    index, semantic matches from the vector store. Falls back to dense-only
+    search when hybrid search is disabled or the lexical index fails, and to
+    lexical-only results when dense search times out or its circuit is open.
+    
+    Args:
+        vector_store: The vector store to search
+        query: The search query
+        k: Number of fused documents to return
+        namespaces: Only search these namespaces (all when None)
+        
+    Returns:
+        List of documents, best first
+    """
+    if not settings.HYBRID_SEARCH_ENABLED:
+        return await dense_search(vector_store, query, k, namespaces)
+    
+    dense_k, lexical_k = settings.DENSE_TOP_K, settings.LEXICAL_TOP_K
+    if should_degrade("reduce_k", settings.DEGRADE_REDUCE_K_BELOW):
+        dense_k, lexical_k = max(1, dense_k // 2), max(1, lexical_k // 2)
+    
+    dense_task = asyncio.create_task(dense_search(vector_store, query, dense_k, namespaces))
+    try:
+        # Refreshing and scanning the index blocks, so it runs in a worker thread alongside the dense search
+        lexical_docs = await asyncio.to_thread(lexical_search, query, lexical_k, namespaces)
+    except asyncio.CancelledError:
+        dense_task.cancel()
+        raise
+    except Exception as e:
+        logger.error(f"Lexical search failed, using dense results only: {str(e)}")
+        lexical_docs = []
+    try:
+        dense_docs = await dense_task
+    except asyncio.TimeoutError:
+        if not lexical_docs:
+            raise
+        logger.warning("Dense search timed out, using lexical results only")
+        record_degradation("lexical_only")
+        dense_docs = []
+    except CircuitOpenError as e:
+        if not lexical_docs:
+            raise
+        logger.warning(f"Dense search skipped, using lexical results only: {str(e)}")
+        record_degradation("vectorstore_unavailable")
+        dense_docs = []
+    
+    fused = reciprocal_rank_fusion([dense_docs, lexical_docs], k=settings.RRF_K)
+    sampled_logger.debug(f"Hybrid search fused {len(dense_docs)} dense and {len(lexical_docs)} lexical results into {len(fused)}")
+    return [doc for doc, _ in fused[:k]]
+
+async def retrieve(vector_store: "PineconeVectorStore", query: str, namespaces: Optional[List[str]] = None) -> List["Document"]:
+    """
+    Retrieve the documents that go into the RAG prompt.
+    
+    With reranking enabled, RERANK_CANDIDATES documents are over-fetched and
+    only the RERANK_TOP_N best-scoring ones are kept; otherwise the top
+    RAG_TOP_K hybrid results are returned as-is. When the request's deadline
+    runs short, fewer documents are fetched and reranking is skipped.
+    
+    Args:
+        vector_store: The vector store to search
+        query: The search query
+        namespaces: Only search these namespaces (all when None)
+        
+    Returns:
+        List of documents, best first
+    """
+    top_k, top_n, candidate_k = settings.RAG_TOP_K, settings.RERANK_TOP_N, settings.RERANK_CANDIDATES
+    if should_degrade("reduce_k", settings.DEGRADE_REDUCE_K_BELOW):
+        top_k, top_n, candidate_k = max(1, top_k // 2), max(1, top_n // 2), max(1, candidate_k // 2)
+    
+    if not settings.RERANK_ENABLED or should_degrade("skip_rerank", settings.DEGRADE_SKIP_RERANK_BELOW):
+        return await hybrid_search(vector_store, query, k=top_k, namespaces=namespaces)
+    
+    candidates = await hybrid_search(vector_store, query, k=candidate_k, namespaces=namespaces)
+    try:
+        return await within_deadline(rerank(query, candidates, top_n=top_n), settings.RERANK_TIMEOUT)
+    except Exception as e:
+        if isinstance(e, asyncio.TimeoutError):
+            record_degradation("rerank_timeout")
+        logger.error(f"Reranking failed, using retrieval order: {str(e)}")
+        return candidates[:top_k]
@@ -0,0 +1,183 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+from config.settings import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL DEFAULT '',
+    summarized_upto INTEGER NOT NULL DEFAULT 0,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_age ON sessions (updated_at);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, seq)
+);
+"""
+
+class ChatSessionStore:
+    """
+    Server-side conversation history, keyed by the client's session id.
+
+    Clients send only their session id and the new message; the chat
+    pipeline reads a window of recent messages plus a rolling summary of
+    everything older, so the cost of a turn no longer grows with the
+    length of the conversation. Messages are numbered per session (seq
+    starts at 1) and the summary covers messages up to summarized_upto.
+
+    SQLite in WAL mode, one connection per call, so any worker process can
+    serve any session.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def append(self, session_id: str, messages: List[Tuple[str, str]]) -> int:
+        """
+        Append messages to a session, creating it if needed.
+
+        Args:
+            session_id: The session id
+            messages: (role, content) pairs in order
+
+        Returns:
+            Number of messages in the session afterwards
+        """
+        now = time.time()
+        with self._connect() as conn:
+            # Bumping the count first takes the write lock, so concurrent appends get distinct seqs
+            conn.execute(
+                "INSERT INTO sessions (id, message_count, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET message_count = message_count + excluded.message_count, updated_at = excluded.updated_at",
+                (session_id, len(messages), now)
+            )
+            (count,) = conn.execute("SELECT message_count FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            first = count - len(messages)
+            conn.executemany(
+                "INSERT INTO messages (session_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(session_id, first + i, role, content[:settings.SESSION_MAX_MESSAGE_CHARS], now)
+                 for i, (role, content) in enumerate(messages, start=1)]
+            )
+        return count
+
+    def context(self, session_id: str, window: int) -> Tuple[List[Tuple[str, str]], str, int]:
+        """
+        What the chat pipeline needs of a session.
+
+        Args:
+            session_id: The session id
+            window: Number of most recent messages to return
+
+        Returns:
+            Tuple of (recent (role, content) messages in order, summary of
+            earlier messages, total number of messages)
+        """
+        with self._connect() as conn:
+            session = conn.execute("SELECT summary, message_count FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if session is None:
+                return [], "", 0
+            summary, count = session
+            rows = conn.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? AND seq > ? ORDER BY seq",
+                (session_id, count - window)
+            ).fetchall()
+        return [(role, content) for role, content in rows], summary, count
+
+    def pending_summary(self, session_id: str, window: int) -> Tuple[str, int, List[Tuple[str, str]]]:
+        """
+        Messages that have left the window but are not in the summary yet.
+
+        Returns:
+            Tuple of (current summary, seq of the last pending message,
+            pending (role, content) messages in order)
+        """
+        with self._connect() as conn:
+            session = conn.execute(
+                "SELECT summary, summarized_upto, message_count FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if session is None:
+                return "", 0, []
+            summary, upto, count = session
+            rows = conn.execute(
+                "SELECT seq, role, content FROM messages WHERE session_id = ? AND seq > ? AND seq <= ? ORDER BY seq",
+                (session_id, upto, count - window)
+            ).fetchall()
+        return summary, rows[-1][0] if rows else upto, [(role, content) for _, role, content in rows]
+
+    def set_summary(self, session_id: str, summary: str, upto: int):
+        """Store a new summary covering messages up to seq `upto`, unless a newer one is already stored."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE sessions SET summary = ?, summarized_upto = ? WHERE id = ? AND summarized_upto < ?",
+                (summary, upto, session_id, upto)
+            )
+
+    def page(self, session_id: str, offset: int, limit: int) -> Tuple[int, str, List[Dict[str, str]]]:
+        """
+        A page of a session's messages, oldest first.
+
+        Args:
+            session_id: The session id
+            offset: Number of messages to skip
+            limit: Maximum number of messages to return
+
+        Returns:
+            Tuple of (total number of messages, summary, messages as role/content dicts)
+        """
+        with self._connect() as conn:
+            session = conn.execute("SELECT summary, message_count FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if session is None:
+                return 0, "", []
+            summary, count = session
+            rows = conn.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (session_id, offset, limit)
+            ).fetchall()
+        return count, summary, [{"role": role, "content": content} for role, content in rows]
+
+    def prune(self, max_age_seconds: float) -> int:
+        """
+        Drop sessions that have been idle for max_age_seconds.
+
+        Returns:
+            Number of sessions removed
+        """
+        cutoff = time.time() - max_age_seconds
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM messages WHERE session_id IN (SELECT id FROM sessions WHERE updated_at < ?)", (cutoff,)
+            )
+            return conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+
+@lru_cache(maxsize=None)
+def get_session_store() -> ChatSessionStore:
+    """
+    Get the shared chat session store.
+
+    Returns:
+        The process-wide ChatSessionStore instance
+    """
+    return ChatSessionStore(Path(settings.CACHE_DIR) / "chat_sessions.sqlite")
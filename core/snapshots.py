@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from config.settings import settings
+from utils.file_lock import file_lock
+from utils.singleflight import normalize_url
+
+@dataclass
+class SnapshotRecord:
+    """Index entry pointing a URL at a stored page snapshot."""
+    url: str
+    content_hash: str
+    content_type: str
+    size: int
+    fetched_at: str
+
+class SnapshotStore:
+    """
+    Content-addressed, zstd-compressed store of fetched pages.
+
+    Page bodies live under objects/<hash[:2]>/<hash>.zst, so identical
+    content is stored once no matter how many URLs or fetches produce it.
+    An append-only index.jsonl maps each URL to its snapshots; the latest
+    entry for a URL wins. Like the lexical index, other workers pick up new
+    entries by reading the log from where they last stopped, and reload it
+    when prune() has replaced it; appends and that rewrite share a
+    cross-process lock on index.jsonl.lock.
+    """
+
+    def __init__(self, root: Path, compression_level: int = 3):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.index_path = self.root / "index.jsonl"
+        self._lock_path = self.root / "index.jsonl.lock"
+        self.compression_level = compression_level
+        self._latest: Dict[str, SnapshotRecord] = {}
+        self._offset = 0
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._lock = threading.RLock()
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def _object_path(self, content_hash: str) -> Path:
+        return self.objects_dir / content_hash[:2] / f"{content_hash}.zst"
+
+    def refresh(self):
+        """Load any index entries appended since the last refresh."""
+        with self._lock:
+            if not self.index_path.exists():
+                return
+            stat = self.index_path.stat()
+            file_id = (stat.st_dev, stat.st_ino)
+            if file_id != self._file_id or stat.st_size < self._offset:
+                # The index was pruned (replaced) by some worker; replay it from the start
+                self._latest.clear()
+                self._offset = 0
+                self._file_id = file_id
+            if stat.st_size == self._offset:
+                return
+            with open(self.index_path, "rb") as f:
+                f.seek(self._offset)
+                while True:
+                    line = f.readline()
+                    # Stop at a partially written trailing line and retry it next time
+                    if not line or not line.endswith(b"\n"):
+                        break
+                    self._offset = f.tell()
+                    try:
+                        record = SnapshotRecord(**json.loads(line.decode("utf-8")))
+                    except (UnicodeDecodeError, json.JSONDecodeError, TypeError):
+                        logger.warning(f"Skipping corrupt line in snapshot index {self.index_path}")
+                        continue
+                    self._latest[normalize_url(record.url)] = record
+
+    def save(self, url: str, content: str, content_type: str = "markdown") -> SnapshotRecord:
+        """
+        Store a fetched page and point the URL at it.
+
+        Args:
+            url: The URL the content was fetched from
+            content: Page body (markdown or HTML)
+            content_type: "markdown" or "html"
+
+        Returns:
+            The index record written for this snapshot
+        """
+        import zstandard
+
+        data = content.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self._object_path(content_hash)
+        if path.exists():
+            # A fresh mtime keeps a concurrent prune from deleting the object before it is indexed again
+            os.utime(path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(zstandard.ZstdCompressor(level=self.compression_level).compress(data))
+            # Rename last so readers never see a partially written object
+            os.replace(tmp_path, path)
+
+        record = SnapshotRecord(
+            url=url,
+            content_hash=content_hash,
+            content_type=content_type,
+            size=len(data),
+            fetched_at=datetime.now(timezone.utc).isoformat()
+        )
+        with self._lock, file_lock(self._lock_path):
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+            self.refresh()
+        logger.debug(f"Saved snapshot of {url} ({len(data)} bytes, {content_hash[:12]})")
+        return record
+
+    def load(self, content_hash: str) -> str:
+        """
+        Read a snapshot body by its content hash.
+
+        Args:
+            content_hash: The sha256 hex digest of the content
+
+        Returns:
+            The decompressed page body
+
+        Raises:
+            FileNotFoundError: If no snapshot with that hash exists
+        """
+        import zstandard
+
+        with open(self._object_path(content_hash), "rb") as f:
+            return zstandard.ZstdDecompressor().decompress(f.read()).decode("utf-8")
+
+    def latest(self, url: str) -> Optional[SnapshotRecord]:
+        """Get the most recent snapshot record for a URL, if any."""
+        self.refresh()
+        with self._lock:
+            return self._latest.get(normalize_url(url))
+
+    def prune(self, keep_versions: int) -> Tuple[int, int]:
+        """
+        Drop all but the newest keep_versions snapshots of each URL.
+
+        The index is rewritten without the older entries while holding the
+        index lock, so no save() can append to the old file, then objects no
+        remaining entry points at are deleted. Objects written after the
+        prune started are kept, since a concurrent save may not be in the
+        index yet.
+
+        Args:
+            keep_versions: Snapshots to keep per URL (at least 1)
+
+        Returns:
+            Tuple of (index entries dropped, objects deleted)
+        """
+        keep_versions = max(1, keep_versions)
+        started_at = time.time()
+        with self._lock, file_lock(self._lock_path):
+            if not self.index_path.exists():
+                return 0, 0
+            versions: Dict[str, List[str]] = {}
+            with open(self.index_path, "rb") as f:
+                lines = [line for line in f if line.endswith(b"\n")]
+            for line in lines:
+                try:
+                    url = normalize_url(json.loads(line.decode("utf-8"))["url"])
+                except (UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError):
+                    continue
+                versions.setdefault(url, []).append(line)
+            kept = [line for url_lines in versions.values() for line in url_lines[-keep_versions:]]
+            dropped = len(lines) - len(kept)
+
+            tmp_path = self.index_path.with_suffix(self.index_path.suffix + ".prune")
+            with open(tmp_path, "wb") as f:
+                f.writelines(kept)
+            # Atomic swap; other workers see a new inode and reload
+            os.replace(tmp_path, self.index_path)
+            self._file_id = None
+            self.refresh()
+
+        referenced = {json.loads(line.decode("utf-8"))["content_hash"] for line in kept}
+        deleted = 0
+        for path in self.objects_dir.glob("*/*.zst"):
+            if path.stem not in referenced and path.stat().st_mtime < started_at:
+                path.unlink(missing_ok=True)
+                deleted += 1
+        logger.info(f"Pruned {dropped} old snapshot versions and {deleted} unreferenced objects")
+        return dropped, deleted
+
+    def urls(self) -> List[str]:
+        """List every URL with at least one snapshot, oldest first."""
+        self.refresh()
+        with self._lock:
+            return [record.url for record in self._latest.values()]
+
+@lru_cache(maxsize=None)
+def get_snapshot_store() -> SnapshotStore:
+    """
+    Get the shared snapshot store, loading its index on first use.
+
+    Returns:
+        The process-wide SnapshotStore instance
+    """
+    store = SnapshotStore(Path(settings.CACHE_DIR) / "snapshots", compression_level=settings.SNAPSHOT_COMPRESSION_LEVEL)
+    logger.info(f"Loaded snapshot store from {store.root} with {len(store)} URLs")
+    return store
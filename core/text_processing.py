@@ -1,22 +1,60 @@
 # core/text_processing.py
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
-from typing import List, Optional, Dict, Any
+import asyncio
+import re
+from typing import TYPE_CHECKING, List, Optional, Dict, Any
 from loguru import logger
 from config.settings import settings
 from core.llm import get_llm
+from utils.logging_utils import sampled_logger
+
+if TYPE_CHECKING:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain.schema import Document
+
+NO_RELEVANT_DATA = "NO_RELEVANT_DATA"
+
+PREPROCESS_INSTRUCTIONS = """You are a preprocessing assistant for a RAG pipeline. Below is a CHUNK of raw restaurant data. Your task is to:
+1. Identify and RETAIN only facts about:
+   - Restaurant name and location
+   - Menu items (names, descriptions, prices)
+   - Special features (vegetarian options, spice levels, allergens)
+   - Operating hours and contact info
+2. REMOVE any irrelevant or noisy content, including:
+   - Navigation menus, boilerplate text, ads, or unrelated commentary
+   - Repetitions, promotional slogans, or HTML tags
+   - Any text not directly tied to the required facts above
+3. CONDENSE the retained text by:
+   - Summarizing long sentences into concise statements
+   - Using bullet points for lists (e.g., menu items)
+   - Merging similar data points where possible
+4. ENSURE the processed output:
+   - Does not exceed 500 tokens
+   - Maintains semantic completeness (no half facts)
+   - Uses a consistent structure with labeled sections
+   - Special focus on: "name", "location", "menu", "features", "hours", "contact\""""
+
+BATCH_RESULT_PATTERN = re.compile(r"<<<RESULT (\d+)>>>(.*?)<<<END RESULT \1>>>", re.DOTALL)
+
+# Rough characters-per-token ratio used to budget batched prompts
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens in a text."""
+    return len(text) // CHARS_PER_TOKEN + 1
 
 class TextProcessor:
     """Text processing utilities for RAG."""
    
     @staticmethod
-    def get_text_splitter() -> RecursiveCharacterTextSplitter:
+    def get_text_splitter() -> "RecursiveCharacterTextSplitter":
         """
         Get a configured text splitter.
        
         Returns:
             A RecursiveCharacterTextSplitter instance
         """
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
         return RecursiveCharacterTextSplitter(
             chunk_size=settings.CHUNK_SIZE,
             chunk_overlap=settings.CHUNK_OVERLAP,
@@ -24,7 +62,7 @@ class TextProcessor:
         )
    
     @staticmethod
-    def split_text(text: str) -> List[Document]:
+    def split_text(text: str) -> List["Document"]:
         """
         Split text into chunks suitable for embedding.
        
@@ -41,7 +79,7 @@ class TextProcessor:
         return docs
    
     @staticmethod
-    def extract_texts_from_documents(docs: List[Document]) -> List[str]:
+    def extract_texts_from_documents(docs: List["Document"]) -> List[str]:
         """
         Extract raw text from Document objects.
        
@@ -62,63 +100,179 @@ class TextProcessor:
             chunks: List of raw text chunks to preprocess
             
         Returns:
-            List of cleaned and structured text chunks
+            List of cleaned and structured text chunks, in input order
         """
-        logger.info(f"Preprocessing {len(chunks)} chunks")
+        results = await TextProcessor.preprocess_chunk_results(chunks)
+        
+        # Only keep chunks with relevant data
+        processed_chunks = [result for result in results if result is not None]
+        logger.info(f"Preprocessing complete. {len(processed_chunks)} chunks retained")
+        return processed_chunks
+    
+    @staticmethod
+    async def preprocess_chunk_results(chunks: List[str]) -> List[Optional[str]]:
+        """
+        Preprocess text chunks, keeping one result per input chunk.
         
-        processed_chunks = []
-        llm = get_llm()
+        With PREPROCESS_BATCH_ENABLED, several chunks are packed into each LLM
+        call (within PREPROCESS_BATCH_TOKEN_BUDGET) so the instruction prompt
+        and request overhead are paid once per batch instead of once per chunk.
+        A batch whose output cannot be parsed is reprocessed one chunk at a time.
         
-        for i, chunk in enumerate(chunks):
-            logger.debug(f"Processing chunk {i+1}/{len(chunks)}")
+        Args:
+            chunks: List of raw text chunks to preprocess
             
-            # Construct preprocessing prompt
-            prompt = f"""You are a preprocessing assistant for a RAG pipeline. Below is a CHUNK of raw restaurant data. Your task is to:
-1. Identify and RETAIN only facts about:
-   - Restaurant name and location
-   - Menu items (names, descriptions, prices)
-   - Special features (vegetarian options, spice levels, allergens)
-   - Operating hours and contact info
-2. REMOVE any irrelevant or noisy content, including:
-   - Navigation menus, boilerplate text, ads, or unrelated commentary
-   - Repetitions, promotional slogans, or HTML tags
-   - Any text not directly tied to the required facts above
-3. CONDENSE the retained text by:
-   - Summarizing long sentences into concise statements
-   - Using bullet points for lists (e.g., menu items)
-   - Merging similar data points where possible
-4. ENSURE the processed output:
-   - Does not exceed 500 tokens
-   - Maintains semantic completeness (no half facts)
-   - Uses a consistent structure with labeled sections
-   - Special focus on: "name", "location", "menu", "features", "hours", "contact"
+        Returns:
+            The processed text for each chunk, or None where a chunk holds no
+            relevant data
+        """
+        logger.info(f"Preprocessing {len(chunks)} chunks")
+        
+        llm = get_llm("preprocess")
+        semaphore = asyncio.Semaphore(settings.PREPROCESS_CONCURRENCY)
+        results: List[Optional[str]] = [None] * len(chunks)
+        
+        async def run_single(i: int):
+            async with semaphore:
+                results[i] = await TextProcessor._preprocess_single(llm, chunks[i], i)
+        
+        async def run_batch(indices: List[int]):
+            async with semaphore:
+                batch_results = await TextProcessor._preprocess_batch(llm, [chunks[i] for i in indices])
+            if batch_results is None:
+                logger.warning(f"Could not parse batched output for chunks {[i + 1 for i in indices]}, reprocessing individually")
+                for i in indices:
+                    await run_single(i)
+                return
+            for i, result in zip(indices, batch_results):
+                results[i] = result
+        
+        if settings.PREPROCESS_BATCH_ENABLED:
+            batches = TextProcessor.pack_batches(
+                chunks,
+                token_budget=settings.PREPROCESS_BATCH_TOKEN_BUDGET,
+                max_chunks=settings.PREPROCESS_BATCH_MAX_CHUNKS
+            )
+            logger.debug(f"Packed {len(chunks)} chunks into {len(batches)} preprocessing batches")
+            await asyncio.gather(*[
+                run_batch(indices) if len(indices) > 1 else run_single(indices[0])
+                for indices in batches
+            ])
+        else:
+            await asyncio.gather(*[run_single(i) for i in range(len(chunks))])
+        
+        return results
+    
+    @staticmethod
+    async def _preprocess_single(llm, chunk: str, index: int) -> Optional[str]:
+        """Preprocess one chunk; None means it holds no relevant data."""
+        sampled_logger.debug(f"Processing chunk {index+1}")
+        prompt = f"""{PREPROCESS_INSTRUCTIONS}
 
-Format all extracted information in clear sections. If the chunk contains no relevant restaurant information, respond with "NO_RELEVANT_DATA".
+Format all extracted information in clear sections. If the chunk contains no relevant restaurant information, respond with "{NO_RELEVANT_DATA}".
 
 Raw chunk:
 {chunk}
 
 Processed output:"""
+        
+        try:
+            # Process with LLM
+            response = await llm.ainvoke(prompt)
+            processed_text = response.content.strip()
+            return None if processed_text == NO_RELEVANT_DATA else processed_text
+        except Exception as e:
+            logger.error(f"Error preprocessing chunk {index+1}: {str(e)}")
+            # Fall back to original chunk if preprocessing fails
+            return chunk
+    
+    @staticmethod
+    async def _preprocess_batch(llm, chunks: List[str]) -> Optional[List[Optional[str]]]:
+        """
+        Preprocess several chunks in one LLM call with delimited inputs and outputs.
+        
+        Returns:
+            One result per chunk (None for chunks without relevant data; the
+            original chunks if the call failed), or None if the output could
+            not be parsed
+        """
+        delimited = "\n\n".join(
+            f"<<<CHUNK {n}>>>\n{chunk}\n<<<END CHUNK {n}>>>" for n, chunk in enumerate(chunks, start=1)
+        )
+        prompt = f"""{PREPROCESS_INSTRUCTIONS}
+
+You will receive {len(chunks)} chunks, each wrapped in <<<CHUNK n>>> and <<<END CHUNK n>>> markers. Process every chunk independently using the rules above and format the extracted information of each in clear sections.
+Return exactly one result per chunk, in order, wrapped in <<<RESULT n>>> and <<<END RESULT n>>> markers with the same n. If a chunk contains no relevant restaurant information, its result must be "{NO_RELEVANT_DATA}".
+
+Raw chunks:
+{delimited}
+
+Processed output:"""
+        
+        try:
+            response = await llm.ainvoke(prompt)
+        except Exception as e:
+            logger.error(f"Error preprocessing batch of {len(chunks)} chunks: {str(e)}")
+            # Fall back to the original chunks; retrying them one by one would
+            # multiply the calls against a model that is failing or down
+            return list(chunks)
+        
+        parsed = TextProcessor.parse_batch_output(response.content, len(chunks))
+        if parsed is None:
+            return None
+        return [None if result == NO_RELEVANT_DATA else result for result in parsed]
+    
+    @staticmethod
+    def parse_batch_output(output: str, expected: int) -> Optional[List[str]]:
+        """
+        Split a batched preprocessing response back into per-chunk results.
+        
+        Args:
+            output: Raw LLM output containing <<<RESULT n>>> blocks
+            expected: Number of chunks sent in the batch
             
-            try:
-                # Process with LLM
-                response = await llm.ainvoke(prompt)
-                processed_text = response.content.strip()
-                
-                # Only keep chunks with relevant data
-                if processed_text != "NO_RELEVANT_DATA":
-                    processed_chunks.append(processed_text)
-                    
-            except Exception as e:
-                logger.error(f"Error preprocessing chunk {i+1}: {str(e)}")
-                # Fall back to original chunk if preprocessing fails
-                processed_chunks.append(chunk)
-                
-        logger.info(f"Preprocessing complete. {len(processed_chunks)} chunks retained")
-        return processed_chunks
+        Returns:
+            The results in chunk order, or None unless every chunk has exactly one non-empty result
+        """
+        found: Dict[int, str] = {}
+        for match in BATCH_RESULT_PATTERN.finditer(output):
+            number = int(match.group(1))
+            if number in found:
+                return None
+            found[number] = match.group(2).strip()
+        if sorted(found) != list(range(1, expected + 1)) or not all(found.values()):
+            return None
+        return [found[n] for n in range(1, expected + 1)]
+    
+    @staticmethod
+    def pack_batches(chunks: List[str], token_budget: int, max_chunks: int) -> List[List[int]]:
+        """
+        Group consecutive chunks into batches that fit a token budget.
+        
+        Args:
+            chunks: Chunks to pack
+            token_budget: Maximum estimated input tokens per batch
+            max_chunks: Maximum number of chunks per batch
+            
+        Returns:
+            Lists of chunk indices; a chunk larger than the budget gets its own batch
+        """
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for i, chunk in enumerate(chunks):
+            tokens = estimate_tokens(chunk)
+            if current and (current_tokens + tokens > token_budget or len(current) >= max_chunks):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
 
     @staticmethod
-    def add_metadata_to_documents(docs: List[Document]) -> List[Document]:
+    def add_metadata_to_documents(docs: List["Document"]) -> List["Document"]:
         """
         Add metadata to Document objects based on their content.
         
@@ -128,6 +282,8 @@ Processed output:"""
         Returns:
             List of Document objects with enriched metadata
         """
+        from langchain.schema import Document
+
         enriched_docs = []
         
         for doc in docs:
@@ -1,36 +1,85 @@
 # This should be in core/vectorstore.py
-from pinecone import Pinecone
-from langchain_pinecone import PineconeVectorStore
+import hashlib
+from datetime import datetime
+from functools import lru_cache
 from typing import List, Optional, Dict, Any
 from loguru import logger
 from config.settings import settings
+from core.circuit_breaker import get_circuit_breaker
 from core.embeddings import get_embeddings
+from core.index_registry import DEFAULT_NAMESPACE, get_index_registry
+from core.lexical_index import get_lexical_index
 
-# Initialize Pinecone client
-try:
-    pc = Pinecone(
-        api_key=settings.PINECONE_API_KEY,
-        environment=settings.PINECONE_ENVIRONMENT
+# Vectors per Pinecone upsert request
+PINECONE_UPSERT_BATCH_SIZE = 100
+# Ids per Pinecone delete request (API limit)
+PINECONE_DELETE_BATCH_SIZE = 1000
+
+@lru_cache(maxsize=None)
+def get_pinecone_client():
+    """
+    Get the shared Pinecone client, creating it on first use.
+    
+    Returns:
+        A Pinecone client instance
+        
+    Raises:
+        RuntimeError: If the client cannot be initialized
+    """
+    from pinecone import Pinecone
+
+    try:
+        pc = Pinecone(
+            api_key=settings.PINECONE_API_KEY,
+            environment=settings.PINECONE_ENVIRONMENT
+        )
+        logger.info("Pinecone client initialized")
+        return pc
+    except Exception as e:
+        logger.error(f"Failed to initialize Pinecone client: {str(e)}", exc_info=True)
+        raise RuntimeError(f"Pinecone initialization failed: {str(e)}")
+
+@lru_cache(maxsize=None)
+def get_pinecone_index():
+    """
+    Get the shared handle to the configured Pinecone index.
+    
+    The handle owns the HTTP connection pool that every Pinecone call of the
+    process reuses; it is sized for concurrent searches and parallel upserts.
+    
+    Returns:
+        A Pinecone Index instance
+    """
+    return get_pinecone_client().Index(
+        settings.PINECONE_INDEX_NAME,
+        pool_threads=settings.PINECONE_POOL_THREADS,
+        connection_pool_maxsize=settings.PINECONE_CONNECTION_POOL_SIZE
     )
-    logger.info("Pinecone client initialized")
-except Exception as e:
-    logger.error(f"Failed to initialize Pinecone client: {str(e)}", exc_info=True)
-    raise RuntimeError(f"Pinecone initialization failed: {str(e)}")
 
+def get_vectorstore_breaker():
+    """Get the circuit breaker shared by all Pinecone calls."""
+    return get_circuit_breaker("vectorstore")
+
+@lru_cache(maxsize=None)
 def get_vector_store():
     """
     Get an initialized vector store instance.
     
+    The store is created once per process and shared by all requests.
+    
     Returns:
         A PineconeVectorStore instance connected to the configured index
         
     Raises:
         Exception: If the vector store initialization fails
     """
+    from langchain_pinecone import PineconeVectorStore
+
     try:
         embeddings = get_embeddings()
-        vector_store = PineconeVectorStore.from_existing_index(
-            index_name=settings.PINECONE_INDEX_NAME,
+        index = get_pinecone_index()
+        vector_store = PineconeVectorStore(
+            index=index,
             embedding=embeddings
         )
         
@@ -40,13 +89,138 @@ def get_vector_store():
         logger.error(f"Failed to connect to vector store: {str(e)}", exc_info=True)
         raise Exception(f"Vector store initialization failed: {str(e)}")
 
-def index_texts(texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None):
+def make_document_id(text: str) -> str:
+    """
+    Derive a stable document id from the chunk content.
+    
+    Content-derived ids make re-indexing the same chunk an overwrite instead of
+    a duplicate, and let the vector store and lexical index share ids.
+    
+    Args:
+        text: The chunk text
+        
+    Returns:
+        A hex digest identifying the chunk
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def lexical_id(namespace: str, doc_id: str) -> str:
+    """Id of a chunk in the lexical index, which holds every namespace in one log."""
+    return doc_id if namespace == DEFAULT_NAMESPACE else f"{namespace}/{doc_id}"
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """
+    Embed chunk texts for indexing, using the shared embedding cache.
+    
+    Args:
+        texts: List of text strings to embed
+        
+    Returns:
+        One embedding vector per text, in input order
+        
+    Raises:
+        Exception: If embedding fails
+    """
+    try:
+        return get_embeddings().embed_documents(texts)
+    except Exception as e:
+        logger.error(f"Failed to embed {len(texts)} texts: {str(e)}", exc_info=True)
+        raise Exception(f"Embedding failed: {str(e)}")
+
+def upsert_vectors(texts: List[str], vectors: List[List[float]], metadatas: Optional[List[Dict[str, Any]]] = None,
+                   namespace: str = DEFAULT_NAMESPACE) -> int:
+    """
+    Write pre-computed embeddings to Pinecone and the chunks to the lexical index.
+    
+    Records use the same layout as PineconeVectorStore (chunk text under the
+    "text" metadata key), so they are searchable through get_vector_store().
+    Chunks whose metadata carries source_url and crawled_at are recorded in
+    the index registry so maintenance can expire them later.
+    
+    Args:
+        texts: Chunk texts
+        vectors: Embedding for each text
+        metadatas: Optional metadata dictionary for each text
+        namespace: Pinecone namespace to write to
+        
+    Returns:
+        Number of vectors upserted
+        
+    Raises:
+        Exception: If the Pinecone upsert fails
+    """
+    metadatas = [{**(metadatas[i] if metadatas else {}), "namespace": namespace} for i in range(len(texts))]
+    ids = [make_document_id(text) for text in texts]
+    try:
+        records = [
+            {"id": doc_id, "values": vector, "metadata": {**metadata, "text": text}}
+            for doc_id, text, vector, metadata in zip(ids, texts, vectors, metadatas)
+        ]
+        with get_vectorstore_breaker().guard():
+            get_pinecone_index().upsert(vectors=records, namespace=namespace, batch_size=PINECONE_UPSERT_BATCH_SIZE, show_progress=False)
+        logger.info(f"Upserted {len(records)} vectors into Pinecone namespace '{namespace}'")
+    except Exception as e:
+        logger.error(f"Failed to upsert vectors: {str(e)}", exc_info=True)
+        raise Exception(f"Upsert failed: {str(e)}")
+    
+    try:
+        added = get_lexical_index().add_documents([lexical_id(namespace, doc_id) for doc_id in ids], texts, metadatas)
+        logger.info(f"Added {added} new texts to the lexical index")
+    except Exception as e:
+        # Dense retrieval still works without the lexical index
+        logger.error(f"Failed to update lexical index: {str(e)}", exc_info=True)
+    
+    rows = [
+        (doc_id, metadata["source_url"], datetime.fromisoformat(metadata["crawled_at"]).timestamp())
+        for doc_id, metadata in zip(ids, metadatas)
+        if metadata.get("source_url") and metadata.get("crawled_at")
+    ]
+    if rows:
+        try:
+            get_index_registry().record_chunks(namespace, rows)
+        except Exception as e:
+            # Unregistered chunks stay searchable; they just never expire
+            logger.error(f"Failed to record chunks in index registry: {str(e)}", exc_info=True)
+    
+    return len(records)
+
+def delete_vectors(namespace: str, ids: List[str]) -> int:
+    """
+    Delete chunks from Pinecone and the lexical index.
+    
+    Args:
+        namespace: Namespace the chunks live in
+        ids: Chunk ids
+        
+    Returns:
+        Number of ids deleted
+        
+    Raises:
+        Exception: If the Pinecone delete fails
+    """
+    try:
+        index = get_pinecone_index()
+        with get_vectorstore_breaker().guard():
+            for start in range(0, len(ids), PINECONE_DELETE_BATCH_SIZE):
+                index.delete(ids=ids[start:start + PINECONE_DELETE_BATCH_SIZE], namespace=namespace)
+    except Exception as e:
+        logger.error(f"Failed to delete vectors from namespace '{namespace}': {str(e)}", exc_info=True)
+        raise Exception(f"Delete failed: {str(e)}")
+    
+    get_lexical_index().remove_documents([lexical_id(namespace, doc_id) for doc_id in ids])
+    logger.info(f"Deleted {len(ids)} chunks from namespace '{namespace}'")
+    return len(ids)
+
+def index_texts(texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None, namespace: str = DEFAULT_NAMESPACE):
     """
     Index a list of texts into the vector store with optional metadata.
     
+    The same chunks are added to the local BM25 index used for hybrid search.
+    
     Args:
         texts: List of text strings to index
         metadatas: Optional list of metadata dictionaries corresponding to each text
+        namespace: Pinecone namespace to write to
         
     Returns:
         Number of texts successfully indexed
@@ -55,27 +229,8 @@ def index_texts(texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = No
         Exception: If indexing fails
     """
     try:
-        embeddings = get_embeddings()
-        
-        # Different approach based on whether metadata is provided
-        if metadatas:
-            logger.info(f"Indexing {len(texts)} texts with metadata into Pinecone")
-            vector_store = PineconeVectorStore.from_texts(
-                texts,
-                embedding=embeddings,
-                metadatas=metadatas,  # Pass the metadata
-                index_name=settings.PINECONE_INDEX_NAME
-            )
-        else:
-            logger.info(f"Indexing {len(texts)} texts without metadata into Pinecone")
-            vector_store = PineconeVectorStore.from_texts(
-                texts,
-                embedding=embeddings,
-                index_name=settings.PINECONE_INDEX_NAME
-            )
-        
-        logger.info(f"Successfully indexed {len(texts)} texts into Pinecone")
-        return len(texts)
+        logger.info(f"Indexing {len(texts)} texts into Pinecone")
+        return upsert_vectors(texts, embed_texts(texts), metadatas, namespace=namespace)
     except Exception as e:
         logger.error(f"Failed to index texts: {str(e)}", exc_info=True)
-        raise Exception(f"Indexing failed: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Indexing failed: {str(e)}")
@@ -1,20 +1,57 @@
+import asyncio
 import uvicorn
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from api.routes import api_router
 from config.settings import settings
-from utils.logging_utils import setup_logging
+from core.admission import admission_stats
+from core.circuit_breaker import circuit_states
+from core.lifecycle import lifecycle
+from utils.logging_utils import RequestIdMiddleware, setup_logging
 
 # Setup logging
 logger = setup_logging()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up dependencies before serving and drain in-flight work on shutdown."""
+    # Blocking SDK calls (Pinecone, embeddings, crawling) run in the default
+    # executor, whose stock size is too small for concurrent fan-out searches
+    executor = ThreadPoolExecutor(max_workers=settings.OUTBOUND_THREAD_POOL_SIZE, thread_name_prefix="outbound")
+    asyncio.get_running_loop().set_default_executor(executor)
+    
+    report = {}
+    if settings.WARM_UP_ON_STARTUP:
+        from services.warmup import warm_up
+        report = await warm_up()
+    lifecycle.mark_ready(report)
+    # Readiness flips on SIGTERM, while the server still listens; without a signal it flips here
+    restore_signals = lifecycle.drain_on_signal(settings.SHUTDOWN_READINESS_GRACE)
+    
+    yield
+    
+    restore_signals()
+    lifecycle.begin_drain()
+    await lifecycle.drain(settings.SHUTDOWN_DRAIN_TIMEOUT)
+    
+    from core.crawler import WebCrawlerManager
+    await WebCrawlerManager.close()
+    executor.shutdown(wait=False)
+    await logger.complete()
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.APP_TITLE,
     description=settings.APP_DESCRIPTION,
-    version=settings.APP_VERSION
+    version=settings.APP_VERSION,
+    lifespan=lifespan
 )
 
+# Tag every request's log records with its id
+app.add_middleware(RequestIdMiddleware)
+
 # Include API routes
 app.include_router(api_router)
 
@@ -24,6 +61,19 @@ async def root():
     logger.info("Root endpoint accessed")
     return {"message": "Welcome to the RAG API with web crawling capabilities and conversation memory"}
 
+@app.get("/ready")
+async def readiness():
+    """Readiness endpoint: 200 once warm-up has finished, 503 before that and while draining."""
+    content = {
+        "ready": lifecycle.ready,
+        "draining": lifecycle.draining,
+        "in_flight": lifecycle.in_flight,
+        "admission": admission_stats(),
+        "circuits": circuit_states(),
+        "warm_up": lifecycle.warm_up_report
+    }
+    return JSONResponse(status_code=200 if lifecycle.ready else 503, content=content)
+
 # Global exception handler - this needs to be on the app, not router
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
@@ -39,5 +89,16 @@ async def general_exception_handler(request: Request, exc: Exception):
     )
 
 if __name__ == "__main__":
-    logger.info(f"Starting {settings.APP_TITLE} on port {settings.PORT}")
-    uvicorn.run("main:app", host=settings.HOST, port=settings.PORT, reload=settings.DEBUG)
\ No newline at end of file
+    if settings.ENVIRONMENT == "production":
+        # Each worker warms up in its lifespan before it starts accepting connections
+        logger.info(f"Starting {settings.APP_TITLE} on port {settings.PORT} with {settings.WORKERS} workers")
+        uvicorn.run(
+            "main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            workers=settings.WORKERS,
+            timeout_graceful_shutdown=int(settings.SHUTDOWN_DRAIN_TIMEOUT)
+        )
+    else:
+        logger.info(f"Starting {settings.APP_TITLE} on port {settings.PORT}")
+        uvicorn.run("main:app", host=settings.HOST, port=settings.PORT, reload=settings.DEBUG)
\ No newline at end of file
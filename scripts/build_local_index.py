@@ -0,0 +1,55 @@
+"""
+Build the local quantized vector index used when VECTOR_SEARCH_BACKEND=local.
+
+Every chunk in the lexical index (which mirrors what was upserted to
+Pinecone) is embedded through the shared embedding cache, so chunks that
+were indexed before cost no API calls. The vectors are then quantized and
+written to LOCAL_INDEX_DIR. Re-run after crawling to pick up new chunks;
+running API workers load the index once at first use, so restart them
+afterwards.
+
+Usage:
+    python scripts/build_local_index.py --method pq --subspaces 96
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.settings import settings  # noqa: E402
+from core.lexical_index import get_lexical_index  # noqa: E402
+from core.quantization import LocalVectorIndex  # noqa: E402
+from core.vectorstore import embed_texts  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local quantized vector index")
+    parser.add_argument("--method", choices=["pq", "int8"], default=settings.LOCAL_INDEX_QUANTIZATION)
+    parser.add_argument("--subspaces", type=int, default=settings.LOCAL_INDEX_PQ_SUBSPACES, help="PQ subspaces (bytes per vector)")
+    parser.add_argument("--output", type=Path, default=Path(settings.LOCAL_INDEX_DIR))
+    parser.add_argument("--batch-size", type=int, default=settings.INDEX_BATCH_SIZE, help="Texts per embedding call")
+    args = parser.parse_args()
+
+    documents = get_lexical_index().documents()
+    if not documents:
+        raise SystemExit("The lexical index is empty; crawl or ingest some pages first")
+
+    start_time = time.perf_counter()
+    vectors = []
+    for start in range(0, len(documents), args.batch_size):
+        vectors.extend(embed_texts([document["text"] for document in documents[start:start + args.batch_size]]))
+    print(f"Embedded {len(documents)} chunks in {time.perf_counter() - start_time:.1f}s")
+
+    start_time = time.perf_counter()
+    index = LocalVectorIndex.build(np.asarray(vectors, dtype=np.float32), documents, args.method, args.subspaces)
+    index.save(args.output)
+    print(f"Built {args.method} index of {len(index)} vectors ({index.codes.nbytes / len(index):.0f} bytes/vector in RAM) "
+          f"in {time.perf_counter() - start_time:.1f}s at {args.output}")
+
+
+if __name__ == "__main__":
+    main()
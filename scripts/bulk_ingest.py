@@ -0,0 +1,311 @@
+"""
+Bulk-ingest documents already on disk into the vector store and lexical index.
+
+Accepted inputs:
+    - a directory, walked recursively for .html/.htm/.md/.markdown/.txt files
+    - a JSON lines dump with one page per line: {"url": ..., "html": ...}
+      or {"url": ..., "text"/"markdown"/"content": ...}
+    - a WARC file (.warc or .warc.gz); HTML response records are ingested
+
+Documents are converted, split and tagged with the same TextProcessor stages
+as /api/crawl, in a pool of worker processes. LLM preprocessing is not run;
+pass --prefilter to drop irrelevant chunks with the local relevance scorer.
+Chunks are indexed in batches and the ids of fully indexed documents are
+appended to a checkpoint log, so re-running the same command after an
+interruption skips everything that was already done. Like crawled pages,
+chunks carry their source URL, ingest time and content hash, go into the
+namespace of their site and are registered for expiry; --namespace puts
+everything into one namespace instead. Local files are recorded under their
+file:// URL.
+
+Usage:
+    python scripts/bulk_ingest.py dumps/site.warc.gz --workers 8
+    python scripts/bulk_ingest.py exports/ --batch-size 512 --prefilter
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.settings import settings  # noqa: E402
+
+# The checkpoint log is folded into the snapshot once it holds more ids than this and half the snapshot
+CHECKPOINT_LOG_MIN_COMPACT = 10000
+
+FILE_KINDS = {".html": "html", ".htm": "html", ".md": "markdown", ".markdown": "markdown", ".txt": "markdown"}
+
+# (doc_id, source, kind, content); content is None when the worker reads the file itself
+SourceDocument = Tuple[str, str, str, Optional[str]]
+# (doc_id, source URL, ingest time as epoch seconds, chunk texts, chunk metadatas)
+PreparedDocument = Tuple[str, str, float, List[str], List[Dict]]
+
+
+def make_doc_id(source: str) -> str:
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def source_url(source: str) -> str:
+    """URL a document is registered under: its own URL, or a file:// URL for local files."""
+    if "://" in source:
+        return source
+    return Path(source).resolve().as_uri()
+
+
+def iter_directory(root: Path) -> Iterator[SourceDocument]:
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            kind = FILE_KINDS.get(path.suffix.lower())
+            if kind:
+                yield make_doc_id(str(path.resolve())), str(path), kind, None
+
+
+def iter_jsonl(path: Path) -> Iterator[SourceDocument]:
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            source = record.get("url") or f"{path}#{line_number}"
+            if record.get("html"):
+                yield make_doc_id(source), source, "html", record["html"]
+            else:
+                content = record.get("markdown") or record.get("text") or record.get("content")
+                if content:
+                    yield make_doc_id(source), source, "markdown", content
+
+
+def iter_warc(path: Path) -> Iterator[SourceDocument]:
+    """Yield HTML responses from a WARC file without a third-party WARC reader."""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            if not line.startswith(b"WARC/"):
+                continue
+
+            headers = {}
+            for header_line in iter(f.readline, b"\r\n"):
+                if not header_line:
+                    break
+                name, _, value = header_line.decode("utf-8", "replace").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            block = f.read(int(headers.get("content-length", "0")))
+
+            if headers.get("warc-type") != "response":
+                continue
+            http_headers, _, payload = block.partition(b"\r\n\r\n")
+            if b"text/html" not in http_headers.lower():
+                continue
+            source = headers.get("warc-target-uri", "")
+            yield make_doc_id(source), source, "html", payload.decode("utf-8", "replace")
+
+
+def iter_sources(path: Path) -> Iterator[SourceDocument]:
+    if path.is_dir():
+        return iter_directory(path)
+    name = path.name.lower()
+    if name.endswith((".warc", ".warc.gz")):
+        return iter_warc(path)
+    if name.endswith((".jsonl", ".jsonl.gz")):
+        return iter_jsonl(path)
+    raise SystemExit(f"Unsupported input: {path} (expected a directory, .jsonl or .warc file)")
+
+
+def prepare_document(item: SourceDocument, use_prefilter: bool) -> PreparedDocument:
+    """Convert, split and tag one document. Runs in a worker process."""
+    from core.html_conversion import html_to_markdown
+    from core.relevance import get_relevance_prefilter
+    from core.text_processing import TextProcessor
+    from core.vectorstore import make_document_id
+
+    doc_id, source, kind, content = item
+    if content is None:
+        with open(source, "r", encoding="utf-8", errors="replace") as f:
+            content = f.read()
+    if kind == "html":
+        content = html_to_markdown(content)
+
+    docs = TextProcessor.split_text(content)
+    if use_prefilter:
+        texts = TextProcessor.extract_texts_from_documents(docs)
+        to_llm, fast_tracked, _ = get_relevance_prefilter().partition(texts)
+        keep = set(to_llm) | set(fast_tracked)
+        docs = [doc for doc in docs if doc.page_content in keep]
+
+    url = source_url(source)
+    ingested_at = datetime.now(timezone.utc)
+    for doc in docs:
+        doc.metadata["source"] = source
+    enriched_docs = TextProcessor.add_metadata_to_documents(docs)
+    texts = TextProcessor.extract_texts_from_documents(enriched_docs)
+    metadatas = [
+        {**doc.metadata, "source_url": url, "crawled_at": ingested_at.isoformat(), "content_hash": make_document_id(text)}
+        for doc, text in zip(enriched_docs, texts)
+    ]
+    return doc_id, url, ingested_at.timestamp(), texts, metadatas
+
+
+def _prepare_worker(args: Tuple[SourceDocument, bool]) -> PreparedDocument:
+    return prepare_document(*args)
+
+
+class Checkpoint:
+    """
+    Ids of fully indexed documents: a JSON snapshot plus a log of ids completed since.
+
+    Each flush only appends its ids to the log. The log is folded into the
+    snapshot once it outgrows it, so the total checkpoint I/O stays linear
+    in the number of documents.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.log_path = path.with_suffix(path.suffix + ".log")
+        self.completed: Set[str] = set()
+        self.logged = 0
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                self.completed.update(json.load(f).get("completed", []))
+        if self.log_path.exists():
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                log = f.read()
+            logged = log.split()
+            self.completed.update(logged)
+            self.logged = len(logged)
+            if not log.endswith("\n"):
+                # A line cut short by a crash matches no document (which is then simply ingested
+                # again); folding the log away keeps the next append off that line
+                self.compact()
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.completed
+
+    def __len__(self) -> int:
+        return len(self.completed)
+
+    def add(self, doc_ids: List[str]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write("".join(f"{doc_id}\n" for doc_id in doc_ids))
+        self.completed.update(doc_ids)
+        self.logged += len(doc_ids)
+        if self.logged > max(CHECKPOINT_LOG_MIN_COMPACT, len(self.completed) // 2):
+            self.compact()
+
+    def compact(self):
+        if not self.logged:
+            return
+        # Write then rename so an interruption never leaves a truncated snapshot; the log is
+        # dropped only after that, so a crash in between merely leaves ids recorded twice
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"completed": sorted(self.completed)}, f)
+        os.replace(tmp_path, self.path)
+        self.log_path.unlink(missing_ok=True)
+        self.logged = 0
+
+
+class BatchedIndexer:
+    """
+    Buffer whole documents and index them together once a batch is full.
+
+    Chunks are grouped by namespace, and each document is recorded as
+    crawled in the index registry once its chunks are in, so re-ingesting
+    a changed document makes its old chunks stale for maintenance.
+    """
+
+    def __init__(self, batch_size: int, checkpoint: Checkpoint, namespace: Optional[str]):
+        from core.index_registry import get_index_registry, site_namespace
+        from core.vectorstore import index_texts
+
+        self.index_texts = index_texts
+        self.registry = get_index_registry()
+        self.site_namespace = site_namespace
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.texts: Dict[str, List[str]] = defaultdict(list)
+        self.metadatas: Dict[str, List[Dict]] = defaultdict(list)
+        self.buffered = 0
+        self.pending: List[Tuple[str, str, str, float]] = []
+        self.indexed_chunks = 0
+
+    def add(self, doc_id: str, url: str, ingested_at: float, texts: List[str], metadatas: List[Dict]):
+        namespace = self.namespace if self.namespace is not None else self.site_namespace(url)
+        self.texts[namespace].extend(texts)
+        self.metadatas[namespace].extend(metadatas)
+        self.buffered += len(texts)
+        self.pending.append((doc_id, url, namespace, ingested_at))
+        if self.buffered >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for namespace, texts in self.texts.items():
+            # Chunk ids are content hashes, so re-indexing after a crash is idempotent
+            self.indexed_chunks += self.index_texts(texts=texts, metadatas=self.metadatas[namespace], namespace=namespace)
+        for _, url, namespace, ingested_at in self.pending:
+            self.registry.mark_crawled(url, namespace, ingested_at)
+        if self.pending:
+            self.checkpoint.add([doc_id for doc_id, _, _, _ in self.pending])
+        self.texts.clear()
+        self.metadatas.clear()
+        self.buffered = 0
+        self.pending = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest local HTML/markdown dumps into the index")
+    parser.add_argument("input", type=Path, help="Directory, .jsonl(.gz) dump or .warc(.gz) file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes for conversion and splitting")
+    parser.add_argument("--batch-size", type=int, default=settings.INDEX_BATCH_SIZE, help="Chunks per embedding/upsert batch")
+    parser.add_argument("--window", type=int, default=256, help="Documents read ahead into the worker pool at a time")
+    parser.add_argument("--checkpoint", type=Path, default=None, help="Checkpoint file (default: under CACHE_DIR/ingest)")
+    parser.add_argument("--prefilter", action="store_true", help="Drop chunks rejected by the local relevance pre-filter")
+    parser.add_argument("--namespace", default=None, help="Index everything into this namespace instead of one per site")
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or Path(settings.CACHE_DIR) / "ingest" / f"{args.input.resolve().name}.checkpoint.json"
+    completed = Checkpoint(checkpoint_path)
+    if len(completed):
+        print(f"Resuming: {len(completed)} documents already ingested according to {checkpoint_path}")
+
+    indexer = BatchedIndexer(args.batch_size, completed, args.namespace)
+    pending = ((item, args.prefilter) for item in iter_sources(args.input) if item[0] not in completed)
+
+    start_time = time.perf_counter()
+    documents = 0
+    with multiprocessing.Pool(args.workers) as pool:
+        # Feed the pool one window at a time so huge dumps are never read into memory at once
+        while True:
+            window = list(islice(pending, args.window))
+            if not window:
+                break
+            for doc_id, url, ingested_at, texts, metadatas in pool.imap(_prepare_worker, window, chunksize=4):
+                indexer.add(doc_id, url, ingested_at, texts, metadatas)
+                documents += 1
+            elapsed = time.perf_counter() - start_time
+            print(f"{documents} documents, {indexer.indexed_chunks} chunks indexed ({documents / elapsed:.1f} docs/s)")
+    indexer.flush()
+    completed.compact()
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Done: {documents} documents, {indexer.indexed_chunks} chunks indexed in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Import-time profiling report for the API process.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter and
+summarises where the import time goes, both per module and per top-level
+package. Use it to check that heavy dependencies (langchain, Pinecone,
+crawl4ai, Google clients) stay out of the import graph of ``main``.
+
+Usage:
+    python scripts/profile_imports.py
+    python scripts/profile_imports.py --module main --top 30
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def run_importtime(module: str) -> str:
+    """
+    Import a module in a subprocess with ``-X importtime`` enabled.
+
+    Args:
+        module: Dotted name of the module to import
+
+    Returns:
+        The raw importtime output written to stderr
+
+    Raises:
+        RuntimeError: If the import fails
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        tail = "\n".join(completed.stderr.splitlines()[-10:])
+        raise RuntimeError(f"Importing {module} failed:\n{tail}")
+    return completed.stderr
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+    """
+    Parse importtime output into (module, self_us, cumulative_us) tuples.
+
+    Args:
+        output: Raw stderr of a ``-X importtime`` run
+
+    Returns:
+        One tuple per imported module
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line.split(":", 1)[1].split("|")
+        if len(fields) != 3:
+            continue
+        self_us, cumulative_us, name = fields
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def summarise_packages(entries: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """
+    Sum self time per top-level package.
+
+    Args:
+        entries: Parsed importtime entries
+
+    Returns:
+        Mapping of top-level package name to total self time in microseconds
+    """
+    totals: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in entries:
+        totals[name.split(".")[0]] += self_us
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time of the API process")
+    parser.add_argument("--module", default="main", help="Module to import (default: main)")
+    parser.add_argument("--top", type=int, default=20, help="Number of rows to show per table")
+    args = parser.parse_args()
+
+    entries = parse_importtime(run_importtime(args.module))
+    if not entries:
+        print("No importtime data collected")
+        return
+
+    total_us = sum(self_us for _, self_us, _ in entries)
+    print(f"Imported {len(entries)} modules in {total_us / 1000:.1f} ms while importing '{args.module}'\n")
+
+    print(f"Top {args.top} modules by cumulative time")
+    print(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for name, self_us, cumulative_us in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f}  {self_us / 1000:>8.1f}  {name}")
+
+    print(f"\nTop {args.top} packages by self time")
+    print(f"{'self ms':>14}  {'share':>8}  package")
+    packages = summarise_packages(entries)
+    for package, self_us in sorted(packages.items(), key=lambda p: p[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>14.1f}  {self_us / total_us:>8.1%}  {package}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compare quantized vector search against exact float32 search.
+
+Loads embedding vectors from the embedding cache (CACHE_DIR/models, one
+JSON float list per file) or from a .npy file, builds int8 and PQ indexes,
+and reports memory per vector, query latency and recall@k against brute
+force, with and without exact re-scoring of the top candidates.
+
+Queries are held-out vectors from the same set, perturbed with a little
+noise, so no API calls are needed.
+
+Usage:
+    python scripts/quantization_report.py
+    python scripts/quantization_report.py --vectors corpus.npy --queries 500 --k 10
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.quantization import LocalVectorIndex, normalize_vectors, top_k  # noqa: E402
+
+
+def load_cached_vectors(path: Path) -> np.ndarray:
+    if path.suffix == ".npy":
+        return np.load(path).astype(np.float32)
+    vectors = []
+    for file in sorted(path.rglob("*")):
+        if file.is_file():
+            try:
+                vectors.append(json.loads(file.read_bytes()))
+            except (ValueError, UnicodeDecodeError):
+                continue
+    dims = {len(vector) for vector in vectors}
+    if len(dims) != 1:
+        raise SystemExit(f"Expected vectors of a single dimension in {path}, found {sorted(dims)}")
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy vs speed report for quantized vector search")
+    parser.add_argument("--vectors", type=Path, default=Path("cache/models"), help="Embedding cache directory or .npy file")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, default=100, help="Rows re-scored exactly")
+    parser.add_argument("--subspaces", type=int, nargs="+", default=[48, 96, 192])
+    parser.add_argument("--noise", type=float, default=0.05, help="Relative noise added to query vectors")
+    args = parser.parse_args()
+
+    vectors = normalize_vectors(load_cached_vectors(args.vectors))
+    rng = np.random.default_rng(0)
+    query_rows = rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)
+    queries = normalize_vectors(vectors[query_rows] + args.noise * rng.standard_normal(vectors[query_rows].shape).astype(np.float32) / np.sqrt(vectors.shape[1]))
+    documents = [{"id": str(i), "text": "", "metadata": {}} for i in range(len(vectors))]
+    print(f"{len(vectors)} vectors of dimension {vectors.shape[1]}, {len(queries)} queries, recall@{args.k}\n")
+
+    start_time = time.perf_counter()
+    truth = [set(top_k(vectors @ query, args.k).tolist()) for query in queries]
+    exact_ms = (time.perf_counter() - start_time) * 1000 / len(queries)
+
+    print(f"{'index':<18}{'bytes/vec':>10}{'build s':>9}{'rescore':>9}{'ms/query':>10}{'recall':>8}")
+    print(f"{'float32 exact':<18}{vectors.shape[1] * 4:>10}{'-':>9}{'-':>9}{exact_ms:>10.3f}{1.0:>8.3f}")
+
+    configs = [("int8", None)] + [("pq", m) for m in args.subspaces if vectors.shape[1] % m == 0]
+    for method, subspaces in configs:
+        start_time = time.perf_counter()
+        index = LocalVectorIndex.build(vectors, documents, method, subspaces or 0)
+        build_seconds = time.perf_counter() - start_time
+        label = method if subspaces is None else f"pq m={subspaces}"
+        bytes_per_vector = index.codes.nbytes // len(vectors)
+        for candidates in (0, args.candidates):
+            start_time = time.perf_counter()
+            results = [index.search(query, args.k, candidates) for query in queries]
+            ms_per_query = (time.perf_counter() - start_time) * 1000 / len(queries)
+            recall = np.mean([len(truth[i] & {row for row, _ in result}) / args.k for i, result in enumerate(results)])
+            print(f"{label:<18}{bytes_per_vector:>10}{build_seconds:>9.2f}{candidates or 'no':>9}{ms_per_query:>10.3f}{recall:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
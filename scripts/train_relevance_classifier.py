@@ -0,0 +1,97 @@
+"""
+Train the tiny relevance classifier used by the chunk pre-filter.
+
+Input is a JSON lines file of labelled chunks:
+    {"text": "...", "label": 1}   # holds menu/price/hours/address facts
+    {"text": "...", "label": 0}   # navigation, cookie banners, legal text, ...
+
+The model is a logistic regression over the lexical features of
+core.relevance plus a bag of the most frequent tokens, trained with NumPy.
+Point PREFILTER_MODEL_PATH at the output file to enable it.
+
+Usage:
+    python scripts/train_relevance_classifier.py labelled_chunks.jsonl cache/relevance_model.json
+"""
+import argparse
+import json
+import sys
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.lexical_index import tokenize  # noqa: E402
+from core.relevance import extract_features  # noqa: E402
+
+
+def load_examples(path: Path):
+    texts, labels = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                texts.append(record["text"])
+                labels.append(int(record["label"]))
+    return texts, np.array(labels, dtype=np.float64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the chunk relevance classifier")
+    parser.add_argument("input", type=Path, help="JSONL file with text/label records")
+    parser.add_argument("output", type=Path, help="Where to write the model JSON")
+    parser.add_argument("--vocab-size", type=int, default=500, help="Number of token features")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--l2", type=float, default=0.001)
+    args = parser.parse_args()
+
+    texts, labels = load_examples(args.input)
+    if len(set(labels.tolist())) < 2:
+        raise SystemExit("Training data needs both relevant (1) and irrelevant (0) examples")
+
+    token_sets = [set(tokenize(text)) for text in texts]
+    doc_freq = Counter(token for tokens in token_sets for token in tokens)
+    vocab = [token for token, count in doc_freq.most_common(args.vocab_size) if count >= 2]
+    feature_names = sorted(extract_features("").keys())
+
+    columns = feature_names + vocab
+    x = np.zeros((len(texts), len(columns)))
+    for row, (text, tokens) in enumerate(zip(texts, token_sets)):
+        features = extract_features(text)
+        x[row, :len(feature_names)] = [features[name] for name in feature_names]
+        for col, token in enumerate(vocab, start=len(feature_names)):
+            x[row, col] = 1.0 if token in tokens else 0.0
+
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(texts))
+    split = max(1, int(len(texts) * 0.8))
+    train, test = order[:split], order[split:]
+
+    weights = np.zeros(len(columns))
+    bias = 0.0
+    for _ in range(args.epochs):
+        logits = x[train] @ weights + bias
+        predictions = 1 / (1 + np.exp(-logits))
+        error = predictions - labels[train]
+        weights -= args.learning_rate * (x[train].T @ error / len(train) + args.l2 * weights)
+        bias -= args.learning_rate * error.mean()
+
+    if len(test):
+        accuracy = (((x[test] @ weights + bias) > 0) == (labels[test] > 0.5)).mean()
+        print(f"Held-out accuracy on {len(test)} examples: {accuracy:.1%}")
+
+    model = {
+        "bias": float(bias),
+        "features": {name: float(weights[i]) for i, name in enumerate(feature_names)},
+        "tokens": {token: float(weights[i]) for i, token in enumerate(vocab, start=len(feature_names)) if abs(weights[i]) > 1e-4},
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(model, f, ensure_ascii=False, indent=2)
+    print(f"Wrote model with {len(model['tokens'])} token weights to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
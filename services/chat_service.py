@@ -1,30 +1,104 @@
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Any, Hashable, Set, Tuple
+from cachetools import LRUCache
 from loguru import logger
-from langchain_pinecone import PineconeVectorStore
 from config.settings import settings
-from core.llm import get_llm
-from api.schemas import ChatRequest, ChatResponse
-from typing import Dict, Any
+from api.schemas import ChatRequest, ChatResponse, ChatStreamEvent
+from core.deadline import degradations
 from services.intent_detection_service import IntentDetectionService
+from services.session_service import load_session, record_turn
+from utils.logging_utils import preview
+from utils.singleflight import SingleFlight, normalize_text
 
-# Initialize the intent detection service
-intent_service = IntentDetectionService()
+if TYPE_CHECKING:
+    from langchain_pinecone import PineconeVectorStore
 
-async def process_chat(request: ChatRequest, vector_store: PineconeVectorStore) -> ChatResponse:
+@lru_cache(maxsize=None)
+def get_intent_service() -> IntentDetectionService:
+    """
+    Get the shared intent detection service, creating it on first use.
+    
+    Building the service creates an LLM client and loads the hotel data, so it
+    is deferred until the first chat request (or the startup warm-up).
+    
+    Returns:
+        The process-wide IntentDetectionService instance
+    """
+    return IntentDetectionService()
+
+# Identical chats (same message and same history) arriving together share one answer
+_inflight_chats = SingleFlight("chat")
+
+def _chat_key(request: ChatRequest) -> Hashable:
+    """Coalescing key covering the message, the conversation history and summary, and the search scope."""
+    history = tuple(
+        (item.role, item.content) for item in (request.conversation_history or [])
+    )
+    summary = (request.memory_data or {}).get("summary")
+    scope = None if request.namespaces is None else tuple(sorted(set(request.namespaces)))
+    return (normalize_text(request.message), history, summary, scope)
+
+# Last complete answer per chat key, served when a request runs out of time
+_answer_cache: LRUCache = LRUCache(maxsize=settings.ANSWER_CACHE_SIZE)
+_answer_cache_lock = threading.Lock()
+
+async def _answer(request: ChatRequest, vector_store: "PineconeVectorStore") -> Tuple[ChatResponse, Set[str]]:
+    response = await get_intent_service().process_query(request, vector_store)
+    # Runs inside the coalesced call, so it reports the degradations of the request that did the work.
+    # The set, shared by every caller of this run, holds the sessions the turn has been stored in
+    return response.model_copy(update={"metadata": {**(response.metadata or {}), "degradations": degradations()}}), set()
+
+def _with_cached_fallback(key: Hashable, response: ChatResponse) -> ChatResponse:
+    """Remember complete answers; replace a partial answer with a remembered one when there is one."""
+    metadata = response.metadata or {}
+    if "error" in metadata:
+        return response
+    with _answer_cache_lock:
+        if not metadata.get("partial"):
+            _answer_cache[key] = response
+            return response
+        cached = _answer_cache.get(key)
+    if cached is None:
+        return response
+    logger.info("Serving a previously generated answer instead of a partial one")
+    return cached.model_copy(update={"metadata": {
+        **(cached.metadata or {}),
+        "cached": True,
+        "degradations": [*metadata.get("degradations", []), "cached_answer"]
+    }})
+
+async def process_chat(request: ChatRequest, vector_store: "PineconeVectorStore") -> ChatResponse:
     """
     Process incoming chat requests using intent detection to route to appropriate pipeline.
     
+    Concurrent requests with the same message and conversation history are
+    coalesced into one pipeline run. When the request's deadline forces a
+    partial answer, the last complete answer to the same chat is returned
+    instead if there is one; response metadata lists the degradations.
+    Requests with a session id get their history from the session store,
+    and the turn is stored there afterwards, once per session and
+    coalesced run.
+    
     Args:
-        request: The chat request containing user message and history
+        request: The chat request containing user message and history or session id
         vector_store: Vector store for RAG retrieval
         
     Returns:
         Chat response with answer to user's query
     """
     try:
-        logger.info(f"Processing chat request: '{request.message}'")
+        logger.debug(f"Processing chat request: '{preview(request.message)}'")
+        request = await load_session(request)
         
         # Use intent detection service to process the query
-        response = await intent_service.process_query(request, vector_store)
+        key = _chat_key(request)
+        response, recorded_sessions = await _inflight_chats.do(key, lambda: _answer(request, vector_store))
+        response = _with_cached_fallback(key, response)
+        # The same message sent twice at once in one session is one turn; other sessions get their own
+        if request.session_id not in recorded_sessions:
+            recorded_sessions.add(request.session_id)
+            await record_turn(request, response)
         
         logger.info(f"Chat response generated successfully with {len(response.response)} characters")
         return response
@@ -35,3 +109,47 @@ async def process_chat(request: ChatRequest, vector_store: PineconeVectorStore)
             response="I'm sorry, I encountered an error while processing your request. Please try again or contact support if the issue persists.",
             metadata={"error": str(e)}
         )
+
+
+async def process_chat_stream(request: ChatRequest, vector_store: "PineconeVectorStore") -> AsyncIterator[ChatStreamEvent]:
+    """
+    Process a chat request, streaming the answer as it is generated.
+    
+    Streams are not coalesced, since every client consumes its own stream.
+    Complete streamed answers are remembered like those of process_chat, and
+    a partial answer is replaced by the remembered one when there is one.
+    Session turns are stored once the answer is complete.
+    
+    Args:
+        request: The chat request containing user message and history or session id
+        vector_store: Vector store for RAG retrieval
+        
+    Yields:
+        Delta events with pieces of the answer, then a done event with the metadata
+    """
+    parts = []
+    try:
+        logger.debug(f"Processing streamed chat request: '{preview(request.message)}'")
+        request = await load_session(request)
+        key = _chat_key(request)
+        async for event in get_intent_service().stream_query(request, vector_store):
+            if event.type != "done":
+                parts.append(event.content)
+                yield event
+                continue
+            streamed = "".join(parts)
+            # Partial answers arrive whole in the done event, so a remembered answer can replace them outright
+            answer = _with_cached_fallback(key, ChatResponse(
+                response=streamed + event.content,
+                metadata={**(event.metadata or {}), "degradations": degradations()}
+            ))
+            await record_turn(request, answer)
+            logger.info(f"Chat response streamed successfully with {len(answer.response)} characters")
+            yield ChatStreamEvent(type="done", content=answer.response[len(streamed):], metadata=answer.metadata)
+    except Exception as e:
+        logger.error(f"Streamed chat processing failed: {str(e)}", exc_info=True)
+        yield ChatStreamEvent(
+            type="done",
+            content="I'm sorry, I encountered an error while processing your request. Please try again or contact support if the issue persists.",
+            metadata={"error": str(e)}
+        )
@@ -1,16 +1,282 @@
 # services/crawl_service.py
 
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from loguru import logger
+from config.settings import settings
+from core.content_extraction import get_content_extractor
 from core.crawler import WebCrawlerManager
+from core.deadline import start_deadline
+from core.html_conversion import html_to_markdown
+from core.index_registry import get_index_registry, site_namespace
+from core.job_store import RUNNING, get_crawl_job_store
+from core.lifecycle import lifecycle
+from core.pipeline import Stage, StageStats, StreamingPipeline
+from core.relevance import get_relevance_prefilter
+from core.snapshots import get_snapshot_store
 from core.text_processing import TextProcessor
-from core.vectorstore import index_texts
-from api.schemas import CrawlResponse
-from langchain.schema import Document
+from core.vectorstore import embed_texts, make_document_id, upsert_vectors
+from api.schemas import CrawlResponse, CrawlBatchItem, CrawlBatchResponse, CrawlJobResponse
+from utils.singleflight import SingleFlight, normalize_url
+
+# Concurrent crawls of the same URL share one crawl and indexing run
+_inflight_crawls = SingleFlight("crawl")
+
+# Called with (pages fetched, chunks indexed) as a crawl progresses
+ProgressCallback = Callable[[int, int], None]
+
+@dataclass
+class ChunkItem:
+    """A chunk travelling through the ingest pipeline, tagged with its page."""
+    url: str
+    text: str
+    fast_tracked: bool = False
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    vector: Optional[List[float]] = None
+
+class CrawlIngestion:
+    """
+    Crawl pages and stream their chunks into the vector store.
+    
+    Stages: fetch -> extract -> split -> prefilter -> preprocess -> tag -> embed -> upsert.
+    Each stage runs as soon as its input arrives, connected by queues of
+    PIPELINE_QUEUE_SIZE items, so a page is never held in memory once per
+    stage. Embedding and upserts batch chunks across pages. Failures are
+    recorded against the page they belong to instead of aborting the run.
+    
+    Fetched pages are saved to the snapshot store; with from_snapshots=True
+    the fetch stage reads those snapshots instead of crawling.
+    
+    Chunks are tagged with their source URL, the crawl time and a content
+    hash, and written to their site's namespace. Pages that were fully
+    indexed are marked as crawled in the index registry, which makes chunks
+    left over from their previous crawls eligible for expiry.
+    
+    on_progress, if given, is called whenever a page has been fetched or a
+    batch of chunks upserted.
+    """
+    
+    def __init__(self, urls: List[str], from_snapshots: bool = False, on_progress: Optional[ProgressCallback] = None):
+        self.urls = urls
+        self.from_snapshots = from_snapshots
+        self.on_progress = on_progress
+        self.crawled_at = datetime.now(timezone.utc)
+        self.reports = {url: CrawlBatchItem(url=url, success=True) for url in urls}
+        self.prefilter = get_relevance_prefilter() if settings.PREFILTER_ENABLED else None
+        self.pages_fetched = 0
+        self.indexed_count = 0
+    
+    def _progress(self):
+        if self.on_progress is not None:
+            self.on_progress(self.pages_fetched, self.indexed_count)
+    
+    def _fail(self, urls, error: str):
+        for url in set(urls):
+            self.reports[url].success = False
+            self.reports[url].error = error
+    
+    async def fetch(self, urls: List[str]) -> List[Tuple[str, str]]:
+        pages = []
+        for url in urls:
+            try:
+                if self.from_snapshots:
+                    markdown_text = await asyncio.to_thread(load_snapshot, url)
+                else:
+                    page = await WebCrawlerManager.fetch_page(url)
+                    markdown_text = page.markdown
+                    # Raw HTML, when there is one, lets a reindex replay changes to conversion and extraction
+                    if page.html is not None:
+                        await save_snapshot(url, page.html, "html")
+                    else:
+                        await save_snapshot(url, markdown_text)
+                pages.append((url, markdown_text))
+            except Exception as e:
+                logger.warning(f"Fetch failed for {url}: {str(e)}")
+                self._fail([url], str(e))
+            self.pages_fetched += 1
+            self._progress()
+        return pages
+    
+    async def extract(self, pages: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        # Strip navigation, footers and other site boilerplate before it becomes chunks
+        if not settings.CONTENT_EXTRACTION_ENABLED:
+            return pages
+        extracted = []
+        extractor = get_content_extractor()
+        for url, markdown_text in pages:
+            result = extractor.extract(url, markdown_text)
+            self.reports[url].bytes_removed += result.bytes_removed
+            logger.info(f"Removed {result.blocks_removed}/{result.blocks_total} boilerplate blocks ({result.bytes_removed} bytes) from {url}")
+            extracted.append((url, result.text))
+        return extracted
+    
+    async def split(self, pages: List[Tuple[str, str]]) -> List[ChunkItem]:
+        chunks = []
+        for url, markdown_text in pages:
+            texts = TextProcessor.extract_texts_from_documents(TextProcessor.split_text(markdown_text))
+            self.reports[url].chunk_count += len(texts)
+            logger.info(f"Generated {len(texts)} raw text chunks from {url}")
+            chunks.extend(ChunkItem(url=url, text=text) for text in texts)
+        return chunks
+    
+    async def apply_prefilter(self, chunks: List[ChunkItem]) -> List[ChunkItem]:
+        # Drop obviously irrelevant chunks locally before paying for LLM calls
+        if self.prefilter is None:
+            return chunks
+        kept = []
+        for chunk in chunks:
+            action = self.prefilter.decide(chunk.text).action
+            if action == "skip":
+                self.reports[chunk.url].skipped_count += 1
+                continue
+            if action == "fast_track":
+                chunk.fast_tracked = True
+                self.reports[chunk.url].fast_tracked_count += 1
+            kept.append(chunk)
+        return kept
+    
+    async def preprocess(self, chunks: List[ChunkItem]) -> List[ChunkItem]:
+        to_llm = [chunk for chunk in chunks if not chunk.fast_tracked]
+        results = await TextProcessor.preprocess_chunk_results([chunk.text for chunk in to_llm]) if to_llm else []
+        for chunk, result in zip(to_llm, results):
+            chunk.text = result
+        return [chunk for chunk in chunks if chunk.text is not None]
+    
+    async def tag(self, chunks: List[ChunkItem]) -> List[ChunkItem]:
+        from langchain.schema import Document
+        
+        enriched_docs = TextProcessor.add_metadata_to_documents([Document(page_content=chunk.text) for chunk in chunks])
+        for chunk, doc in zip(chunks, enriched_docs):
+            chunk.metadata = {
+                **doc.metadata,
+                "source_url": chunk.url,
+                "crawled_at": self.crawled_at.isoformat(),
+                "content_hash": make_document_id(chunk.text)
+            }
+            self.reports[chunk.url].processed_count += 1
+        return chunks
+    
+    async def embed(self, chunks: List[ChunkItem]) -> List[ChunkItem]:
+        try:
+            vectors = await asyncio.to_thread(embed_texts, [chunk.text for chunk in chunks])
+        except Exception as e:
+            self._fail([chunk.url for chunk in chunks], str(e))
+            return []
+        for chunk, vector in zip(chunks, vectors):
+            chunk.vector = vector
+        return chunks
+    
+    async def upsert(self, chunks: List[ChunkItem]) -> List[ChunkItem]:
+        by_namespace = defaultdict(list)
+        for chunk in chunks:
+            by_namespace[site_namespace(chunk.url)].append(chunk)
+        for namespace, group in by_namespace.items():
+            try:
+                await asyncio.to_thread(
+                    upsert_vectors,
+                    [chunk.text for chunk in group],
+                    [chunk.vector for chunk in group],
+                    [chunk.metadata for chunk in group],
+                    namespace
+                )
+            except Exception as e:
+                self._fail([chunk.url for chunk in group], str(e))
+                continue
+            for chunk in group:
+                self.reports[chunk.url].indexed_count += 1
+            self.indexed_count += len(group)
+            self._progress()
+        return []
+    
+    def build_pipeline(self) -> StreamingPipeline:
+        index_wait = settings.INDEX_BATCH_WAIT_MS / 1000
+        return StreamingPipeline([
+            Stage("fetch", self.fetch, concurrency=settings.CRAWL_BATCH_PAGE_CONCURRENCY),
+            Stage("extract", self.extract),
+            Stage("split", self.split),
+            Stage("prefilter", self.apply_prefilter, batch_size=32),
+            Stage("preprocess", self.preprocess, concurrency=settings.PREPROCESS_CONCURRENCY,
+                  batch_size=settings.PREPROCESS_BATCH_MAX_CHUNKS),
+            Stage("tag", self.tag, batch_size=32),
+            Stage("embed", self.embed, concurrency=settings.INDEX_CONCURRENCY,
+                  batch_size=settings.INDEX_BATCH_SIZE, max_wait=index_wait),
+            Stage("upsert", self.upsert, concurrency=settings.INDEX_CONCURRENCY,
+                  batch_size=settings.INDEX_BATCH_SIZE, max_wait=index_wait),
+        ], queue_size=settings.PIPELINE_QUEUE_SIZE)
+    
+    async def run(self) -> Tuple[List[CrawlBatchItem], List[StageStats]]:
+        """
+        Run the pipeline over all URLs.
+        
+        Returns:
+            Tuple of (per-URL results in input order, per-stage statistics)
+        """
+        stats = await self.build_pipeline().run(self.urls)
+        
+        registry = get_index_registry()
+        for url, report in self.reports.items():
+            if report.success:
+                try:
+                    await asyncio.to_thread(registry.mark_crawled, url, site_namespace(url), self.crawled_at.timestamp())
+                except Exception as e:
+                    logger.error(f"Failed to record crawl of {url} in index registry: {str(e)}", exc_info=True)
+        return [self.reports[url] for url in self.urls], stats
+
+async def save_snapshot(url: str, content: str, content_type: str = "markdown"):
+    """Keep the fetched page so it can be reindexed later without crawling; failures are only logged."""
+    if not settings.SNAPSHOTS_ENABLED:
+        return
+    try:
+        await asyncio.to_thread(get_snapshot_store().save, url, content, content_type)
+    except Exception as e:
+        logger.error(f"Failed to save snapshot of {url}: {str(e)}", exc_info=True)
+
+def load_snapshot(url: str) -> str:
+    """
+    Read the latest snapshot of a URL as markdown.
+    
+    HTML snapshots are converted again, so conversion changes apply on reindex.
+    
+    Args:
+        url: The page URL
+        
+    Returns:
+        The page content as markdown
+        
+    Raises:
+        Exception: If the URL has no snapshot
+    """
+    store = get_snapshot_store()
+    record = store.latest(url)
+    if record is None:
+        raise Exception(f"No snapshot stored for {url}")
+    content = store.load(record.content_hash)
+    if record.content_type == "html":
+        return html_to_markdown(content)
+    return content
+
+def _stats_dict(stats: List[StageStats]) -> Dict[str, Dict[str, float]]:
+    return {stage.name: stage.as_dict() for stage in stats}
 
 async def process_crawl(url: str) -> CrawlResponse:
-    # Add these debug statements at the beginning of process_crawl in crawl_service.py
-    print(f"TextProcessor class: {TextProcessor}")
-    print(f"TextProcessor.split_text: {getattr(TextProcessor, 'split_text', 'NOT FOUND')}")
+    """
+    Process a crawl request for a URL, coalescing concurrent requests for the same URL.
+    
+    Args:
+        url: The URL to crawl
+        
+    Returns:
+        CrawlResponse object with information about the crawl operation
+        
+    Raises:
+        Exception: If any step in the crawl process fails
+    """
+    return await _inflight_crawls.do(normalize_url(url), lambda: _process_crawl(url))
+
+async def _process_crawl(url: str) -> CrawlResponse:
     """
     Process a crawl request for a URL with enhanced preprocessing and metadata.
     
@@ -24,51 +290,211 @@ async def process_crawl(url: str) -> CrawlResponse:
         Exception: If any step in the crawl process fails
     """
     try:
-        # Step 1: Crawl the URL
         logger.info(f"Starting enhanced crawl process for URL: {url}")
-        markdown_text = await WebCrawlerManager.crawl_url(url)
-        
-        # Step 2: Split the text into chunks
-        docs = TextProcessor.split_text(markdown_text)
-        texts = TextProcessor.extract_texts_from_documents(docs)
-        raw_chunk_count = len(texts)
-        logger.info(f"Generated {raw_chunk_count} raw text chunks from crawled content")
-        
-        # Step 3: Preprocess chunks with LLM
-        processed_texts = await TextProcessor.preprocess_chunks(texts)
-        processed_count = len(processed_texts)
-        logger.info(f"After preprocessing: {processed_count} relevant chunks")
-        
-        # Step 4: Create new Document objects with processed text
-        processed_docs = [Document(page_content=text) for text in processed_texts]
-        
-        # Step 5: Add metadata to documents
-        enriched_docs = TextProcessor.add_metadata_to_documents(processed_docs)
-        logger.info(f"Added metadata to {len(enriched_docs)} documents")
-        
-        # Step 6: Extract texts and metadata for indexing
-        final_texts = TextProcessor.extract_texts_from_documents(enriched_docs)
-        metadatas = [doc.metadata for doc in enriched_docs]
-        
-        # Step 7: Index the processed chunks with metadata into the vector store
-        if processed_count > 0:
-            # Pass both text and metadata to indexing function
-            indexed_count = index_texts(
-                texts=final_texts,
-                metadatas=metadatas
-            )
-            logger.info(f"Successfully indexed {indexed_count} processed chunks into vector store")
-        else:
-            indexed_count = 0
+        (report,), stats = await CrawlIngestion([url]).run()
+        if not report.success:
+            raise Exception(report.error)
+        
+        if report.processed_count == 0:
             logger.warning("No relevant content chunks were found from the crawled URL")
+        else:
+            logger.info(f"Successfully indexed {report.indexed_count} processed chunks into vector store")
         
-        # Return the result
         return CrawlResponse(
             url=url,
-            chunk_count=raw_chunk_count,
-            processed_count=processed_count,
-            indexed_count=indexed_count
+            chunk_count=report.chunk_count,
+            processed_count=report.processed_count,
+            indexed_count=report.indexed_count,
+            skipped_count=report.skipped_count,
+            fast_tracked_count=report.fast_tracked_count,
+            bytes_removed=report.bytes_removed,
+            stage_stats=_stats_dict(stats)
         )
     except Exception as e:
         logger.error(f"Enhanced crawl process failed for URL {url}: {str(e)}", exc_info=True)
-        raise Exception(f"Enhanced crawl processing failed: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Enhanced crawl processing failed: {str(e)}")
+
+async def resolve_batch_urls(urls: Optional[List[str]], sitemap_url: Optional[str], max_pages: Optional[int]) -> List[str]:
+    """
+    Build the deduplicated list of page URLs for a batch crawl.
+    
+    Args:
+        urls: Explicit URLs to crawl
+        sitemap_url: Optional sitemap whose pages are appended after the explicit URLs
+        max_pages: Requested page limit, capped by CRAWL_BATCH_MAX_PAGES
+        
+    Returns:
+        Page URLs in request order, without duplicates
+        
+    Raises:
+        Exception: If the sitemap cannot be read
+    """
+    limit = min(max_pages or settings.CRAWL_BATCH_MAX_PAGES, settings.CRAWL_BATCH_MAX_PAGES)
+    candidates = list(urls or [])
+    if sitemap_url:
+        candidates += await WebCrawlerManager.fetch_sitemap_urls(sitemap_url, limit)
+
+    resolved, seen = [], set()
+    for url in candidates:
+        key = normalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            resolved.append(url)
+    return resolved[:limit]
+
+async def process_crawl_batch(urls: Optional[List[str]] = None, sitemap_url: Optional[str] = None,
+                              max_pages: Optional[int] = None, on_progress: Optional[ProgressCallback] = None,
+                              on_resolved: Optional[Callable[[int], None]] = None) -> CrawlBatchResponse:
+    """
+    Crawl many URLs and index their content in shared embedding/upsert batches.
+    
+    All pages go through one ingest pipeline: pages are crawled concurrently
+    through the shared browser and their chunks are embedded and upserted in
+    batches of up to INDEX_BATCH_SIZE regardless of which page they came from.
+    A failing page does not fail the batch; its error is reported in its result.
+    
+    Args:
+        urls: URLs to crawl
+        sitemap_url: Optional sitemap.xml to take page URLs from
+        max_pages: Optional upper bound on the number of pages crawled
+        on_progress: Optional callback receiving (pages fetched, chunks indexed)
+        on_resolved: Optional callback receiving the number of pages to crawl
+        
+    Returns:
+        CrawlBatchResponse with per-URL results and totals
+        
+    Raises:
+        Exception: If the URL list cannot be resolved
+    """
+    page_urls = await resolve_batch_urls(urls, sitemap_url, max_pages)
+    logger.info(f"Starting batch crawl of {len(page_urls)} URLs")
+    if on_resolved is not None:
+        on_resolved(len(page_urls))
+    
+    results, stats = await CrawlIngestion(page_urls, on_progress=on_progress).run()
+    
+    succeeded = sum(1 for result in results if result.success)
+    indexed_count = sum(result.indexed_count for result in results)
+    logger.info(f"Batch crawl finished: {succeeded}/{len(results)} URLs succeeded, {indexed_count} chunks indexed")
+    return CrawlBatchResponse(
+        results=results,
+        total_urls=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        indexed_count=indexed_count,
+        stage_stats=_stats_dict(stats)
+    )
+
+async def reindex_from_snapshots(urls: Optional[List[str]] = None) -> CrawlBatchResponse:
+    """
+    Re-run the ingest pipeline over stored snapshots instead of crawling.
+    
+    Use after changing the chunker, the preprocessing prompt or the metadata
+    tagger. Chunk ids are content hashes, so unchanged chunks overwrite
+    themselves instead of creating duplicates.
+    
+    Args:
+        urls: URLs to reindex; all snapshotted URLs when omitted
+        
+    Returns:
+        CrawlBatchResponse with per-URL results and totals
+    """
+    page_urls = urls if urls else get_snapshot_store().urls()
+    logger.info(f"Reindexing {len(page_urls)} URLs from snapshots")
+    
+    results, stats = await CrawlIngestion(page_urls, from_snapshots=True).run()
+    
+    succeeded = sum(1 for result in results if result.success)
+    indexed_count = sum(result.indexed_count for result in results)
+    logger.info(f"Reindex finished: {succeeded}/{len(results)} URLs succeeded, {indexed_count} chunks indexed")
+    return CrawlBatchResponse(
+        results=results,
+        total_urls=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        indexed_count=indexed_count,
+        stage_stats=_stats_dict(stats)
+    )
+
+# Crawl jobs running at once in this worker; further jobs stay queued
+_job_slots: Optional[asyncio.Semaphore] = None
+
+def _get_job_slots() -> asyncio.Semaphore:
+    global _job_slots
+    if _job_slots is None:
+        _job_slots = asyncio.Semaphore(settings.CRAWL_JOB_MAX_CONCURRENCY)
+    return _job_slots
+
+async def submit_crawl_job(urls: Optional[List[str]] = None, sitemap_url: Optional[str] = None,
+                           max_pages: Optional[int] = None) -> CrawlJobResponse:
+    """
+    Start a batch crawl in the background and return immediately.
+    
+    The job's status and progress can be polled with get_crawl_job. Jobs run
+    as tracked background tasks, so graceful shutdown waits for them.
+    
+    Args:
+        urls: URLs to crawl
+        sitemap_url: Optional sitemap.xml to take page URLs from
+        max_pages: Optional upper bound on the number of pages crawled
+        
+    Returns:
+        CrawlJobResponse of the queued job
+    """
+    store = get_crawl_job_store()
+    await asyncio.to_thread(store.prune, settings.CRAWL_JOB_RETENTION_HOURS * 3600)
+    job_id = await asyncio.to_thread(store.create)
+    lifecycle.spawn(_run_crawl_job(job_id, urls, sitemap_url, max_pages), "crawl_job")
+    logger.info(f"Queued crawl job {job_id}")
+    return await get_crawl_job(job_id)
+
+async def get_crawl_job(job_id: str) -> Optional[CrawlJobResponse]:
+    """
+    Look up a crawl job's status and progress.
+    
+    Args:
+        job_id: The job id
+        
+    Returns:
+        CrawlJobResponse, or None if the job is unknown or has been pruned
+    """
+    job = await asyncio.to_thread(get_crawl_job_store().get, job_id)
+    return CrawlJobResponse(**job) if job is not None else None
+
+async def _run_crawl_job(job_id: str, urls: Optional[List[str]], sitemap_url: Optional[str], max_pages: Optional[int]):
+    store = get_crawl_job_store()
+    # The job outlives the request that submitted it, and with it that request's deadline
+    start_deadline(0)
+    progress = {"pages_done": 0, "indexed_count": 0}
+    
+    def on_progress(pages_done: int, indexed_count: int):
+        progress.update(pages_done=pages_done, indexed_count=indexed_count)
+    
+    async def flush_progress():
+        # Written on an interval rather than per callback to keep SQLite writes off the hot path.
+        # Each write also refreshes updated_at, the heartbeat that tells pollers this worker is alive.
+        while True:
+            await asyncio.sleep(settings.CRAWL_JOB_PROGRESS_INTERVAL)
+            await asyncio.to_thread(store.update, job_id, **progress)
+    
+    try:
+        # Started before waiting for a slot, so queued jobs keep their heartbeat too
+        flusher = asyncio.create_task(flush_progress())
+        try:
+            async with _get_job_slots():
+                await asyncio.to_thread(store.update, job_id, status=RUNNING)
+                result = await process_crawl_batch(
+                    urls, sitemap_url, max_pages,
+                    on_progress=on_progress,
+                    on_resolved=lambda total: progress.update(total_urls=total)
+                )
+        finally:
+            flusher.cancel()
+        await asyncio.to_thread(store.finish, job_id, result.model_dump())
+        logger.info(f"Crawl job {job_id} finished: {result.succeeded}/{result.total_urls} URLs, {result.indexed_count} chunks indexed")
+    except asyncio.CancelledError:
+        await asyncio.to_thread(store.fail, job_id, "Interrupted by shutdown")
+        raise
+    except Exception as e:
+        logger.error(f"Crawl job {job_id} failed: {str(e)}", exc_info=True)
+        await asyncio.to_thread(store.fail, job_id, str(e))
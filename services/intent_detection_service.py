@@ -1,20 +1,33 @@
 from loguru import logger
-from typing import Dict, Any, List, Tuple, Optional
-from langchain_pinecone import PineconeVectorStore
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, Any, List, Tuple, Optional
+from core.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from core.deadline import record_degradation, should_degrade
 from core.llm import get_llm
-from api.schemas import ChatRequest, ChatResponse
+from core.retrieval import retrieve
+from config.settings import settings
+from api.schemas import ChatRequest, ChatResponse, ChatStreamEvent
+from utils.logging_utils import preview, sampled_logger
+import asyncio
 import json
 import os
 from enum import Enum
 
+if TYPE_CHECKING:
+    from langchain.schema import Document
+    from langchain_pinecone import PineconeVectorStore
+
 class IntentPipeline(str, Enum):
     FILTER = "filter"
     RAG = "rag"
 
 class IntentDetectionService:
     def __init__(self, hotel_data_path: str = "cache/lucknowi_thaath.json"):
-        self.llm = get_llm()
+        self.intent_llm = get_llm("intent")
+        self.filter_llm = get_llm("filter")
+        self.rag_llm = get_llm("rag")
         self.hotel_data = self._load_hotel_data(hotel_data_path)
+        # Serialized once so the filter pipeline is ready as soon as the intent is known
+        self.hotel_data_context = json.dumps(self.hotel_data, indent=2)
         logger.info(f"Intent Detection Service initialized with {len(self.hotel_data) if self.hotel_data else 0} hotel records")
     
     def _load_hotel_data(self, file_path: str) -> List[Dict[str, Any]]:
@@ -55,7 +68,7 @@ class IntentDetectionService:
         """
         
         try:
-            response = await self.llm.ainvoke(prompt)
+            response = await self.intent_llm.ainvoke(prompt, timeout=settings.INTENT_TIMEOUT)
             response_text = response.content
             
             # Extract JSON from response
@@ -68,34 +81,135 @@ class IntentDetectionService:
             
             return pipeline, confidence
         except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                record_degradation("intent_timeout")
+            elif isinstance(e, CircuitOpenError):
+                record_degradation("intent_unavailable")
             logger.error(f"Error in intent detection: {str(e)}")
             # Default to RAG pipeline as fallback
             return IntentPipeline.RAG, 0.5
     
-    async def process_query(self, request: ChatRequest, vector_store: PineconeVectorStore) -> ChatResponse:
-        query = request.message
-        logger.info(f"Processing query: '{query}'")
+    @staticmethod
+    def _retrieval_available() -> bool:
+        """Whether retrieval can return anything while the embedding API or Pinecone is down."""
+        if settings.HYBRID_SEARCH_ENABLED:
+            # Hybrid search falls back to the local lexical index
+            return True
+        dependencies = ["embeddings"] if settings.VECTOR_SEARCH_BACKEND == "local" else ["embeddings", "vectorstore"]
+        return all(get_circuit_breaker(name).available for name in dependencies)
+    
+    async def _choose_pipeline(self, request: ChatRequest, vector_store: "PineconeVectorStore") -> Tuple[IntentPipeline, Optional[asyncio.Task]]:
+        """
+        Pick the pipeline for a request.
+        
+        Returns:
+            The pipeline, and the speculative retrieval task when one was
+            started for the RAG pipeline; the caller must discard the task
+        """
+        # Retrieval would fail fast anyway: answer from the structured hotel data
+        if not self._retrieval_available():
+            logger.warning("Retrieval dependencies unavailable, using FILTER pipeline")
+            record_degradation("filter_only")
+            return IntentPipeline.FILTER, None
+        
+        # Short on time (e.g. after queueing): go straight to RAG without classifying
+        if should_degrade("skip_intent", settings.DEGRADE_SKIP_INTENT_BELOW):
+            return IntentPipeline.RAG, None
         
-        # Detect intent to determine which pipeline to use
-        pipeline, confidence = await self.detect_intent(query)
+        if not settings.SPECULATIVE_RETRIEVAL:
+            # Detect intent to determine which pipeline to use
+            pipeline, confidence = await self.detect_intent(request.message)
+            logger.info(f"Using {pipeline.name} pipeline for query (confidence: {confidence:.2f})")
+            return pipeline, None
         
+        # Start retrieval while the intent is still being classified, so a RAG
+        # answer costs max(intent, retrieval) + generation instead of the sum
+        retrieval_task = asyncio.create_task(retrieve(vector_store, request.message, request.namespaces))
+        try:
+            pipeline, confidence = await self.detect_intent(request.message)
+        except BaseException:
+            self._discard_task(retrieval_task)
+            raise
         if pipeline == IntentPipeline.FILTER:
-            logger.info(f"Using FILTER pipeline for query (confidence: {confidence:.2f})")
-            return await self._process_filter_pipeline(request)
-        else:
-            logger.info(f"Using RAG pipeline for query (confidence: {confidence:.2f})")
-            return await self._process_rag_pipeline(request, vector_store)
+            logger.info(f"Using FILTER pipeline for query (confidence: {confidence:.2f}), dropping speculative retrieval")
+            self._discard_task(retrieval_task)
+            return pipeline, None
+        logger.info(f"Using RAG pipeline for query (confidence: {confidence:.2f}) with speculative retrieval")
+        return pipeline, retrieval_task
     
-    async def _process_filter_pipeline(self, request: ChatRequest) -> ChatResponse:
+    async def process_query(self, request: ChatRequest, vector_store: "PineconeVectorStore") -> ChatResponse:
+        logger.debug(f"Processing query: '{preview(request.message)}'")
+        pipeline, retrieval_task = await self._choose_pipeline(request, vector_store)
+        try:
+            if pipeline == IntentPipeline.FILTER:
+                return await self._process_filter_pipeline(request)
+            return await self._process_rag_pipeline(request, vector_store, prefetched_docs=retrieval_task)
+        finally:
+            if retrieval_task is not None:
+                self._discard_task(retrieval_task)
+    
+    async def stream_query(self, request: ChatRequest, vector_store: "PineconeVectorStore") -> AsyncIterator[ChatStreamEvent]:
+        """
+        Answer a request like process_query, streaming the generated text.
+        
+        Yields delta events with pieces of the answer, then one done event
+        with the pipeline metadata. Answers that are not generated (partial
+        answers, errors) arrive whole in the done event.
+        """
+        logger.debug(f"Processing streamed query: '{preview(request.message)}'")
+        pipeline, retrieval_task = await self._choose_pipeline(request, vector_store)
+        try:
+            if pipeline == IntentPipeline.FILTER:
+                events = self._stream_answer(self.filter_llm, self._filter_prompt(request), self._filter_metadata(), self._filter_failed)
+            else:
+                events = self._stream_rag_pipeline(request, vector_store, prefetched_docs=retrieval_task)
+            async for event in events:
+                yield event
+        finally:
+            if retrieval_task is not None:
+                self._discard_task(retrieval_task)
+    
+    @staticmethod
+    def _discard_task(task: asyncio.Task):
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            # Retrieve the exception so a failed, unused retrieval is not reported as unhandled
+            task.exception()
+    
+    @staticmethod
+    def _response_events(response: ChatResponse) -> List[ChatStreamEvent]:
+        """A complete response as stream events."""
+        return [ChatStreamEvent(type="done", content=response.response, metadata=response.metadata)]
+    
+    async def _stream_answer(self, llm, prompt: str, metadata: Dict[str, Any],
+                             on_failure: Callable[[Exception], ChatResponse]) -> AsyncIterator[ChatStreamEvent]:
+        """Stream a generated answer; a failure before the first piece is answered by on_failure, a later one ends the stream with an error."""
+        started = False
+        try:
+            async for text in llm.astream(prompt):
+                started = True
+                yield ChatStreamEvent(type="delta", content=text)
+        except Exception as e:
+            if not started:
+                for event in self._response_events(on_failure(e)):
+                    yield event
+                return
+            logger.error(f"Answer stream failed midway: {str(e)}")
+            yield ChatStreamEvent(type="done", metadata={**metadata, "error": str(e)})
+            return
+        yield ChatStreamEvent(type="done", metadata=metadata)
+    
+    def _filter_prompt(self, request: ChatRequest) -> str:
         query = request.message
         
         # Extract conversation context
         conversation_context = self._extract_conversation_context(request)
         
         # Prepare hotel data context
-        hotel_data_context = json.dumps(self.hotel_data, indent=2)
+        hotel_data_context = self.hotel_data_context
         
-        prompt = f"""
+        return f"""
         Based on the following hotel data, conversation history, and user query, provide a helpful response.
         
         Hotel Data:
@@ -109,42 +223,73 @@ class IntentDetectionService:
         If the specific information isn't available in the data, clearly state that
         and provide the closest relevant information if possible.
         """
-        
+    
+    @staticmethod
+    def _filter_metadata() -> Dict[str, Any]:
+        return {
+            "pipeline": "filter",
+            "confidence": 1.0,
+            "data_source": "hotel_json"
+        }
+    
+    @staticmethod
+    def _filter_failed(e: Exception) -> ChatResponse:
+        logger.error(f"Error in filter pipeline: {str(e)}")
+        return ChatResponse(
+            response="I'm sorry, I encountered an error while processing your request about hotel information. Please try again or rephrase your question.",
+            metadata={"error": str(e)}
+        )
+    
+    async def _process_filter_pipeline(self, request: ChatRequest) -> ChatResponse:
+        prompt = self._filter_prompt(request)
         try:
             logger.debug("Sending query to filtering pipeline LLM")
-            response = await self.llm.ainvoke(prompt)
-            response_text = response.content
-            
-            return ChatResponse(
-                response=response_text,
-                metadata={
-                    "pipeline": "filter",
-                    "confidence": 1.0,
-                    "data_source": "hotel_json"
-                }
-            )
+            response = await self.filter_llm.ainvoke(prompt)
+            return ChatResponse(response=response.content, metadata=self._filter_metadata())
         except Exception as e:
-            logger.error(f"Error in filter pipeline: {str(e)}")
-            return ChatResponse(
-                response="I'm sorry, I encountered an error while processing your request about hotel information. Please try again or rephrase your question.",
-                metadata={"error": str(e)}
-            )
+            return self._filter_failed(e)
     
-    async def _process_rag_pipeline(self, request: ChatRequest, vector_store: PineconeVectorStore) -> ChatResponse:
+    async def _prepare_rag(self, request: ChatRequest, vector_store: "PineconeVectorStore",
+                           prefetched_docs: Optional[asyncio.Task]) -> Tuple[List["Document"], Optional[str]]:
+        """
+        Retrieve the documents for a RAG answer and build its prompt.
+        
+        Returns:
+            The retrieved documents and the prompt; the prompt is None when
+            there is no time left to generate
+        """
         query = request.message
         
+        # Retrieve relevant documents from vector store, unless already in flight
         try:
-            # Retrieve relevant documents from vector store
-            logger.info(f"Retrieving relevant documents for: '{query}'")
-            docs = vector_store.similarity_search(query, k=10)
-            context = "\n\n".join([f"Document {i+1}:\n{doc.page_content}" for i, doc in enumerate(docs)])
-            logger.debug(f"Retrieved {len(docs)} relevant documents")
-            
-            # Extract conversation context
-            conversation_context = self._extract_conversation_context(request)
-            
-            # Construct prompt with context and conversation history
-            prompt = f"""
+            if prefetched_docs is not None:
+                docs = await prefetched_docs
+            else:
+                logger.debug(f"Retrieving relevant documents for: '{preview(query)}'")
+                docs = await retrieve(vector_store, query, request.namespaces)
+        except asyncio.TimeoutError:
+            logger.warning("Retrieval timed out, answering without retrieved context")
+            record_degradation("retrieval_timeout")
+            docs = []
+        except CircuitOpenError as e:
+            logger.warning(f"Retrieval unavailable, answering without retrieved context: {str(e)}")
+            record_degradation("retrieval_unavailable")
+            docs = []
+        sampled_logger.debug(f"Retrieved {len(docs)} relevant documents")
+        
+        if should_degrade("fallback_answer", settings.DEGRADE_FALLBACK_ANSWER_BELOW):
+            return docs, None
+        
+        context_docs = docs
+        if should_degrade("shorten_context", settings.DEGRADE_SHORTEN_CONTEXT_BELOW):
+            context_docs = self._fit_context(docs, settings.DEGRADED_CONTEXT_CHARS)
+        context = "\n\n".join([f"Document {i+1}:\n{doc.page_content}" for i, doc in enumerate(context_docs)])
+        
+        # Extract conversation context
+        conversation_context = self._extract_conversation_context(request)
+        
+        # Construct prompt with context and conversation history
+        prompt = f"""
             Based on the following retrieved information and conversation history, answer the user's question.
             
             {conversation_context}
@@ -157,27 +302,96 @@ class IntentDetectionService:
             Please provide a helpful response based on the context information and previous conversation.
             If the answer cannot be found in the context, say so clearly but try to provide related information if possible.
             """
+        return docs, prompt
+    
+    @staticmethod
+    def _rag_metadata(docs: List["Document"]) -> Dict[str, Any]:
+        return {
+            "pipeline": "rag",
+            "sources": len(docs),
+            "top_document_id": docs[0].metadata.get("id", "unknown") if docs else "none"
+        }
+    
+    def _rag_failed(self, e: Exception, docs: Optional[List["Document"]] = None) -> ChatResponse:
+        """Answer for a RAG request whose retrieval or generation failed."""
+        if isinstance(e, asyncio.TimeoutError):
+            logger.warning("RAG generation timed out, returning a partial answer")
+            record_degradation("generation_timeout")
+            return self._partial_answer(docs or [])
+        if isinstance(e, CircuitOpenError):
+            logger.warning(f"RAG generation unavailable, returning a partial answer: {str(e)}")
+            record_degradation("generation_unavailable")
+            return self._partial_answer(docs or [], unavailable=True)
+        logger.error(f"RAG pipeline processing failed: {str(e)}", exc_info=True)
+        return ChatResponse(
+            response="I'm sorry, I encountered an error while retrieving and processing information for your query. Please try again or rephrase your question.",
+            metadata={"error": str(e)}
+        )
+    
+    async def _process_rag_pipeline(self, request: ChatRequest, vector_store: "PineconeVectorStore", prefetched_docs: Optional[asyncio.Task] = None) -> ChatResponse:
+        docs = None
+        try:
+            docs, prompt = await self._prepare_rag(request, vector_store, prefetched_docs)
+            if prompt is None:
+                return self._partial_answer(docs)
             
             # Get response from LLM
             logger.info("Generating response from LLM using RAG pipeline")
-            response = await self.llm.ainvoke(prompt)
+            response = await self.rag_llm.ainvoke(prompt)
             response_text = response.content
             
             logger.debug(f"Generated RAG response of {len(response_text)} characters")
-            return ChatResponse(
-                response=response_text,
-                metadata={
-                    "pipeline": "rag",
-                    "sources": len(docs),
-                    "top_document_id": docs[0].metadata.get("id", "unknown") if docs else "none"
-                }
-            )
+            return ChatResponse(response=response_text, metadata=self._rag_metadata(docs))
         except Exception as e:
-            logger.error(f"RAG pipeline processing failed: {str(e)}", exc_info=True)
-            return ChatResponse(
-                response="I'm sorry, I encountered an error while retrieving and processing information for your query. Please try again or rephrase your question.",
-                metadata={"error": str(e)}
-            )
+            return self._rag_failed(e, docs)
+    
+    async def _stream_rag_pipeline(self, request: ChatRequest, vector_store: "PineconeVectorStore",
+                                   prefetched_docs: Optional[asyncio.Task] = None) -> AsyncIterator[ChatStreamEvent]:
+        try:
+            docs, prompt = await self._prepare_rag(request, vector_store, prefetched_docs)
+        except Exception as e:
+            for event in self._response_events(self._rag_failed(e)):
+                yield event
+            return
+        if prompt is None:
+            for event in self._response_events(self._partial_answer(docs)):
+                yield event
+            return
+        
+        logger.info("Streaming response from LLM using RAG pipeline")
+        async for event in self._stream_answer(self.rag_llm, prompt, self._rag_metadata(docs), lambda e: self._rag_failed(e, docs)):
+            yield event
+    
+    @staticmethod
+    def _fit_context(docs: List["Document"], max_chars: int) -> List["Document"]:
+        """Keep the best documents that fit in max_chars, truncating the first one if needed."""
+        fitted, used = [], 0
+        for doc in docs:
+            if used + len(doc.page_content) > max_chars:
+                if not fitted:
+                    fitted.append(doc.model_copy(update={"page_content": doc.page_content[:max_chars]}))
+                break
+            fitted.append(doc)
+            used += len(doc.page_content)
+        return fitted
+    
+    @staticmethod
+    def _partial_answer(docs: List["Document"], unavailable: bool = False) -> ChatResponse:
+        """Answer from the retrieved documents alone when there is no time left to generate, or no model to generate with."""
+        reason = "right now" if unavailable else "in time"
+        if not docs:
+            response_text = f"I'm sorry, I couldn't put together an answer {reason}. Please try again in a moment."
+        else:
+            excerpts = "\n\n".join(doc.page_content[:500].strip() for doc in docs[:2])
+            response_text = f"I couldn't finish a complete answer {reason}, but this is the most relevant information I found:\n\n{excerpts}"
+        return ChatResponse(
+            response=response_text,
+            metadata={
+                "pipeline": "rag",
+                "partial": True,
+                "sources": len(docs)
+            }
+        )
     
     def _extract_conversation_context(self, request: ChatRequest) -> str:
         conversation_context = ""
@@ -187,7 +401,7 @@ class IntentDetectionService:
             
             # Extract recent conversation
             recent_messages = []
-            for item in request.conversation_history[-5:]:  # Last 5 messages
+            for item in request.conversation_history[-settings.SESSION_HISTORY_WINDOW:]:
                 recent_messages.append(f"{item.role}: {item.content}")
             
             conversation_context = "Recent conversation:\n" + "\n".join(recent_messages) + "\n\n"
@@ -0,0 +1,81 @@
+import asyncio
+from collections import defaultdict
+from loguru import logger
+from config.settings import settings
+from api.schemas import MaintenanceResponse
+from core.index_registry import get_index_registry
+from core.lexical_index import get_lexical_index
+from core.session_store import get_session_store
+from core.snapshots import get_snapshot_store
+from core.vectorstore import delete_vectors
+
+async def run_maintenance() -> MaintenanceResponse:
+    """
+    Expire stale chunks and compact the indexes.
+    
+    A chunk reference is stale when its page has been crawled again since
+    (the page no longer produced that chunk) or when it is older than
+    INDEX_TTL_DAYS. Chunks left without any reference are deleted from
+    Pinecone and the lexical index; the lexical log and the registry are
+    then compacted. Page snapshots beyond the newest SNAPSHOT_KEEP_VERSIONS
+    per URL and chat sessions idle for SESSION_RETENTION_DAYS are dropped
+    as well. References of a namespace whose delete fails are kept,
+    so the next run retries them. Rebuild the local vector index afterwards
+    when VECTOR_SEARCH_BACKEND=local.
+    
+    Returns:
+        MaintenanceResponse with what was expired, deleted and compacted
+        
+    Raises:
+        Exception: If maintenance fails
+    """
+    try:
+        registry = get_index_registry()
+        ttl_seconds = settings.INDEX_TTL_DAYS * 86400 if settings.INDEX_TTL_DAYS > 0 else None
+        references = await asyncio.to_thread(registry.stale_references, ttl_seconds)
+        orphans = await asyncio.to_thread(registry.orphaned, references)
+        logger.info(f"Maintenance found {len(references)} stale chunk references, {sum(len(ids) for ids in orphans.values())} unreferenced chunks")
+        
+        references_by_namespace = defaultdict(list)
+        for reference in references:
+            references_by_namespace[reference[0]].append(reference)
+        
+        deleted_by_namespace = {}
+        failed_namespaces = []
+        expired_references = 0
+        for namespace, namespace_references in references_by_namespace.items():
+            ids = orphans.get(namespace, [])
+            try:
+                if ids:
+                    deleted_by_namespace[namespace] = await asyncio.to_thread(delete_vectors, namespace, ids)
+            except Exception as e:
+                logger.error(f"Failed to delete expired chunks from namespace '{namespace}': {str(e)}")
+                failed_namespaces.append(namespace)
+                continue
+            await asyncio.to_thread(registry.forget, namespace_references)
+            expired_references += len(namespace_references)
+        
+        lexical_before, lexical_after = await asyncio.to_thread(get_lexical_index().compact)
+        await asyncio.to_thread(registry.vacuum)
+        pruned_snapshots = 0
+        if settings.SNAPSHOTS_ENABLED:
+            pruned_snapshots, _ = await asyncio.to_thread(get_snapshot_store().prune, settings.SNAPSHOT_KEEP_VERSIONS)
+        expired_sessions = 0
+        if settings.SESSION_RETENTION_DAYS > 0:
+            expired_sessions = await asyncio.to_thread(get_session_store().prune, settings.SESSION_RETENTION_DAYS * 86400)
+        
+        deleted_chunks = sum(deleted_by_namespace.values())
+        logger.info(f"Maintenance deleted {deleted_chunks} chunks across {len(deleted_by_namespace)} namespaces")
+        return MaintenanceResponse(
+            expired_references=expired_references,
+            deleted_chunks=deleted_chunks,
+            deleted_by_namespace=deleted_by_namespace,
+            failed_namespaces=failed_namespaces,
+            lexical_bytes_before=lexical_before,
+            lexical_bytes_after=lexical_after,
+            pruned_snapshots=pruned_snapshots,
+            expired_sessions=expired_sessions
+        )
+    except Exception as e:
+        logger.error(f"Index maintenance failed: {str(e)}", exc_info=True)
+        raise Exception(f"Index maintenance failed: {str(e)}")
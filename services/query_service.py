@@ -1,15 +1,28 @@
+from typing import TYPE_CHECKING, List, Optional
 from loguru import logger
-from langchain_pinecone import PineconeVectorStore
 from config.settings import settings
-from api.schemas import QueryResponse
+from api.schemas import QueryBatchItem, QueryBatchResponse, QueryResponse
+from core.retrieval import dense_search, dense_search_batch
+from utils.logging_utils import preview
+from utils.singleflight import SingleFlight, normalize_text
 
-async def process_query(query: str, vector_store: PineconeVectorStore) -> QueryResponse:
+if TYPE_CHECKING:
+    from langchain_pinecone import PineconeVectorStore
+
+# Identical queries arriving together share one search
+_inflight_queries = SingleFlight("query")
+
+async def process_query(query: str, vector_store: "PineconeVectorStore", namespaces: Optional[List[str]] = None) -> QueryResponse:
     """
     Process a query against the vector store.
     
+    Concurrent requests for the same normalized query are coalesced into a
+    single search whose result every caller receives.
+    
     Args:
         query: The search query string
         vector_store: The vector store to search in
+        namespaces: Only search these namespaces (all when None)
         
     Returns:
         QueryResponse object with search results
@@ -17,12 +30,20 @@ async def process_query(query: str, vector_store: PineconeVectorStore) -> QueryR
     Raises:
         Exception: If the query process fails
     """
+    scope = None if namespaces is None else tuple(sorted(set(namespaces)))
+    key = (normalize_text(query), settings.SIMILARITY_TOP_K, scope)
+    response = await _inflight_queries.do(key, lambda: _process_query(query, vector_store, namespaces))
+    return response.model_copy(update={"query": query})
+
+async def _process_query(query: str, vector_store: "PineconeVectorStore", namespaces: Optional[List[str]]) -> QueryResponse:
     try:
         # Search for similar documents
-        logger.info(f"Performing similarity search for query: '{query}'")
-        results = vector_store.similarity_search(
+        logger.info(f"Performing similarity search for query: '{preview(query)}'")
+        results = await dense_search(
+            vector_store,
             query, 
-            k=settings.SIMILARITY_TOP_K
+            k=settings.SIMILARITY_TOP_K,
+            namespaces=namespaces
         )
         
         # Extract and return results
@@ -35,4 +56,42 @@ async def process_query(query: str, vector_store: PineconeVectorStore) -> QueryR
         )
     except Exception as e:
         logger.error(f"Query processing failed: {str(e)}", exc_info=True)
-        raise Exception(f"Query processing failed: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Query processing failed: {str(e)}")
+
+async def process_query_batch(queries: List[str], vector_store: "PineconeVectorStore",
+                              namespaces: Optional[List[str]] = None) -> QueryBatchResponse:
+    """
+    Process many queries against the vector store in one pass.
+    
+    All queries are embedded in a single batched call and searched
+    together, so bulk lookups pay one request instead of one per query.
+    
+    Args:
+        queries: The search query strings
+        vector_store: The vector store to search in
+        namespaces: Only search these namespaces (all when None)
+        
+    Returns:
+        QueryBatchResponse with results and scores per query, in order
+        
+    Raises:
+        Exception: If the batch query fails
+    """
+    try:
+        logger.info(f"Performing batch similarity search for {len(queries)} queries")
+        # Duplicate queries in a batch are searched once
+        distinct = list(dict.fromkeys(queries))
+        results = await dense_search_batch(vector_store, distinct, k=settings.SIMILARITY_TOP_K, namespaces=namespaces)
+        by_query = dict(zip(distinct, results))
+        
+        return QueryBatchResponse(results=[
+            QueryBatchItem(
+                query=query,
+                results=[doc.page_content for doc, _ in by_query[query]],
+                scores=[float(score) for _, score in by_query[query]]
+            )
+            for query in queries
+        ])
+    except Exception as e:
+        logger.error(f"Batch query processing failed: {str(e)}", exc_info=True)
+        raise Exception(f"Batch query processing failed: {str(e)}")
@@ -0,0 +1,105 @@
+import asyncio
+from loguru import logger
+from config.settings import settings
+from api.schemas import ChatRequest, ChatResponse, ConversationItem, SessionMessagesResponse
+from core.lifecycle import lifecycle
+from core.llm import get_llm
+from core.session_store import get_session_store
+
+async def load_session(request: ChatRequest) -> ChatRequest:
+    """
+    Fill a chat request's history from its server-side session.
+
+    The last SESSION_HISTORY_WINDOW messages become the conversation history
+    and the rolling summary of older messages goes into memory_data.
+    Requests without a session id, or that carry their own history, are
+    returned unchanged.
+
+    Args:
+        request: The incoming chat request
+
+    Returns:
+        The request with history and summary from the session
+    """
+    if not request.session_id or request.conversation_history is not None:
+        return request
+    recent, summary, _ = await asyncio.to_thread(
+        get_session_store().context, request.session_id, settings.SESSION_HISTORY_WINDOW
+    )
+    update = {"conversation_history": [ConversationItem(role=role, content=content) for role, content in recent]}
+    if summary:
+        update["memory_data"] = {**(request.memory_data or {}), "summary": summary}
+    return request.model_copy(update=update)
+
+async def record_turn(request: ChatRequest, response: ChatResponse):
+    """
+    Store a completed turn in the request's session; failed turns are not stored.
+
+    Once enough messages have left the history window, they are folded into
+    the session summary in the background.
+
+    Args:
+        request: The chat request
+        response: The answer given
+    """
+    if not request.session_id or "error" in (response.metadata or {}):
+        return
+    try:
+        count = await asyncio.to_thread(
+            get_session_store().append, request.session_id, [("user", request.message), ("assistant", response.response)]
+        )
+    except Exception as e:
+        logger.error(f"Failed to store chat turn in session {request.session_id}: {str(e)}", exc_info=True)
+        return
+
+    outside_window = count - settings.SESSION_HISTORY_WINDOW
+    if settings.SESSION_SUMMARY_ENABLED and outside_window > 0 and (outside_window - 2) // settings.SESSION_SUMMARIZE_EVERY < outside_window // settings.SESSION_SUMMARIZE_EVERY:
+        lifecycle.spawn(summarize_session(request.session_id), "session_summary")
+
+async def summarize_session(session_id: str):
+    """Fold the messages that have left the history window into the session's rolling summary."""
+    store = get_session_store()
+    try:
+        summary, upto, pending = await asyncio.to_thread(store.pending_summary, session_id, settings.SESSION_HISTORY_WINDOW)
+        if len(pending) < settings.SESSION_SUMMARIZE_EVERY:
+            return
+        transcript = "\n".join(f"{role}: {content}" for role, content in pending)
+        prompt = f"""
+        Update the summary of a conversation between a user and a hotel and restaurant assistant.
+
+        Current summary:
+        {summary or "(none yet)"}
+
+        New messages:
+        {transcript}
+
+        Write the updated summary in at most 150 words. Keep the user's preferences, constraints,
+        open questions and any facts the assistant gave. Return only the summary.
+        """
+        response = await get_llm("summary").ainvoke(prompt)
+        await asyncio.to_thread(store.set_summary, session_id, response.content.strip(), upto)
+        logger.debug(f"Summarized {len(pending)} messages of session {session_id}")
+    except Exception as e:
+        # The window still works without a fresh summary; the next turn retries
+        logger.warning(f"Failed to summarize session {session_id}: {str(e)}")
+
+async def get_session_messages(session_id: str, offset: int, limit: int) -> SessionMessagesResponse:
+    """
+    Get a page of a session's messages.
+
+    Args:
+        session_id: The session id
+        offset: Number of messages to skip
+        limit: Maximum number of messages to return
+
+    Returns:
+        SessionMessagesResponse with the page, the total and the summary
+    """
+    total, summary, messages = await asyncio.to_thread(get_session_store().page, session_id, offset, limit)
+    return SessionMessagesResponse(
+        session_id=session_id,
+        total=total,
+        offset=offset,
+        summary=summary,
+        messages=[ConversationItem(**message) for message in messages]
+    )
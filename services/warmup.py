@@ -0,0 +1,73 @@
+import asyncio
+import time
+from typing import Any, Dict
+from loguru import logger
+from config.settings import settings
+
+async def _timed(report: Dict[str, Any], name: str, func, *args):
+    """
+    Run one warm-up step, recording its duration or error in the report.
+
+    Every step is bounded by WARM_UP_TIMEOUT. Synchronous steps (client
+    factories that call out to the network) run in a worker thread so a
+    hung dependency cannot block the event loop; a timed-out thread is left
+    to finish in the background.
+    """
+    start_time = time.time()
+    try:
+        if asyncio.iscoroutinefunction(func):
+            await asyncio.wait_for(func(*args), timeout=settings.WARM_UP_TIMEOUT)
+        else:
+            await asyncio.wait_for(asyncio.to_thread(func, *args), timeout=settings.WARM_UP_TIMEOUT)
+        report[name] = {"ok": True, "seconds": round(time.time() - start_time, 3)}
+    except asyncio.TimeoutError:
+        logger.warning(f"Warm-up step '{name}' timed out after {settings.WARM_UP_TIMEOUT}s")
+        report[name] = {"ok": False, "error": f"Timed out after {settings.WARM_UP_TIMEOUT}s"}
+    except Exception as e:
+        logger.warning(f"Warm-up step '{name}' failed: {str(e)}")
+        report[name] = {"ok": False, "error": str(e)}
+
+async def _open_llm_connection():
+    from core.llm import get_chat_model, get_profile_models
+
+    # A minimal round trip per model profile establishes the channel and auth before real traffic
+    await asyncio.gather(*[
+        get_chat_model(profile).ainvoke("Reply with OK.") for profile in get_profile_models()
+    ])
+
+async def warm_up() -> Dict[str, Any]:
+    """
+    Create clients and load shared data before the worker accepts traffic.
+
+    Each step is independent: a failing dependency is logged and reported but
+    does not stop the worker from starting, since every component is also
+    created lazily on first use.
+
+    Returns:
+        A report with the duration or error of every warm-up step
+    """
+    from core.embeddings import get_embeddings
+    from core.lexical_index import get_lexical_index
+    from core.vectorstore import get_pinecone_client, get_vector_store
+    from services.chat_service import get_intent_service
+
+    logger.info("Warming up service dependencies")
+    report: Dict[str, Any] = {}
+
+    await _timed(report, "embeddings_cache", get_embeddings)
+    await _timed(report, "pinecone_client", get_pinecone_client)
+    await _timed(report, "vector_store", get_vector_store)
+    await _timed(report, "lexical_index", get_lexical_index)
+    await _timed(report, "hotel_data", get_intent_service)
+    if settings.RERANK_ENABLED:
+        from core.reranker import get_reranker
+        await _timed(report, "reranker", get_reranker)
+    if settings.WARM_UP_LLM:
+        await _timed(report, "llm_connection", _open_llm_connection)
+
+    failed = [name for name, step in report.items() if not step["ok"]]
+    if failed:
+        logger.warning(f"Warm-up finished with failures: {', '.join(failed)}")
+    else:
+        logger.info("Warm-up finished successfully")
+    return report
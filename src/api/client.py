@@ -1,41 +1,112 @@
+import json
 import requests
-from typing import Dict, Any
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Iterator, List, Optional
+from urllib3.util.retry import Retry
 
-from src.config import API_BASE_URL
+from src.config import API_BASE_URL, API_CONNECT_TIMEOUT, API_READ_TIMEOUT, API_POOL_SIZE
 
 
 class RagAPIClient:
-    """Client for interacting with the RAG backend API"""
-    
+    """
+    Client for interacting with the RAG backend API.
+
+    Requests go through one pooled Session, so connections to the backend
+    are reused across messages instead of being opened for every call.
+    Idempotent GETs are retried on connection errors and 502/503/504.
+    """
+
     def __init__(self, base_url: str = API_BASE_URL):
         self.base_url = base_url
-        
+        self.timeout = (API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=API_POOL_SIZE,
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods={"GET"})
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            return {"error": str(e)}
+
     def crawl_url(self, url: str) -> Dict[str, Any]:
         """Crawl and index a URL through the API"""
+        return self._post("/crawl", {"url": url})
+
+    def crawl_batch(self, urls: Optional[List[str]] = None, sitemap_url: Optional[str] = None) -> Dict[str, Any]:
+        """Crawl and index a list of URLs and/or the pages of a sitemap through the API"""
+        payload = {}
+        if urls:
+            payload["urls"] = urls
+        if sitemap_url:
+            payload["sitemap_url"] = sitemap_url
+        return self._post("/crawl/batch", payload)
+
+    def submit_crawl_job(self, urls: Optional[List[str]] = None, sitemap_url: Optional[str] = None) -> Dict[str, Any]:
+        """Start a background crawl of a list of URLs and/or the pages of a sitemap; returns the job to poll"""
+        payload = {}
+        if urls:
+            payload["urls"] = urls
+        if sitemap_url:
+            payload["sitemap_url"] = sitemap_url
+        return self._post("/crawl/jobs", payload)
+
+    def get_crawl_job(self, job_id: str) -> Dict[str, Any]:
+        """Get the status and progress of a background crawl"""
         try:
-            response = requests.post(
-                f"{self.base_url}/crawl",
-                json={"url": url},
-                headers={"Content-Type": "application/json"}
-            )
+            response = self.session.get(f"{self.base_url}/crawl/jobs/{job_id}", timeout=self.timeout)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             return {"error": str(e)}
-            
-    def chat(self, message: str, conversation_history=None) -> Dict[str, Any]:
-        """Send a chat message to the API"""
+
+    def get_session_messages(self, session_id: str, offset: int = 0, limit: int = 20) -> Dict[str, Any]:
+        """Get a page of a chat session's stored messages and its summary"""
         try:
-            payload = {"message": message}
-            if conversation_history:
-                payload["conversation_history"] = conversation_history
-                
-            response = requests.post(
-                f"{self.base_url}/chat",
-                json=payload,
-                headers={"Content-Type": "application/json"}
+            response = self.session.get(
+                f"{self.base_url}/chat/sessions/{session_id}/messages",
+                params={"offset": offset, "limit": limit},
+                timeout=self.timeout
             )
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
+
+    def chat(self, message: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Send a chat message to the API; the backend keeps the session's history"""
+        return self._post("/chat", {"message": message, "session_id": session_id})
+
+    def chat_stream(self, message: str, session_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Send a chat message to the API and yield the answer's events as they arrive.
+
+        Only the new message and the session id are sent; the backend keeps
+        the session's history. Yields "delta" events with pieces of the
+        answer and a final "done" event with the response metadata. A failed
+        request yields a single "done" event whose metadata holds the error.
+        """
+        payload = {"message": message, "session_id": session_id}
+        try:
+            with self.session.post(f"{self.base_url}/chat/stream", json=payload, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if line:
+                        yield json.loads(line)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            yield {"type": "done", "content": f"Sorry, I encountered an error: {str(e)}", "metadata": {"error": str(e)}}
+
+
+@st.cache_resource
+def get_api_client() -> RagAPIClient:
+    """Get the API client shared by all sessions and reruns of the app"""
+    return RagAPIClient()
@@ -11,4 +11,11 @@ API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000/api")
 APP_TITLE = "RAG Web Crawler & Chatbot"
 APP_ICON = "🤖"
 APP_LAYOUT = "wide"
-SIDEBAR_STATE = "expanded"
\ No newline at end of file
+SIDEBAR_STATE = "expanded"
+
+# API client settings
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "5"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "120"))  # longest gap between bytes of a response
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+CRAWL_POLL_INTERVAL = float(os.getenv("CRAWL_POLL_INTERVAL", "2"))
+MEMORY_PAGE_SIZE = int(os.getenv("MEMORY_PAGE_SIZE", "20"))  # messages per page of "View Conversation Memory"
@@ -1,6 +1,15 @@
 import streamlit as st
-from src.api.client import RagAPIClient
-from src.utils.memory import get_conversation_history, add_message_to_memory, clear_chat_history
+from typing import Any, Dict, Iterator
+from src.api.client import get_api_client
+from src.utils.memory import add_message_to_memory, clear_chat_history
+
+def _answer_text(events: Iterator[Dict[str, Any]], metadata: Dict[str, Any]) -> Iterator[str]:
+    """Text pieces of a streamed answer; the final event's metadata is copied into `metadata`"""
+    for event in events:
+        if event.get("type") == "done":
+            metadata.update(event.get("metadata") or {})
+        if event.get("content"):
+            yield event["content"]
 
 def render_chatbot_tab():
     """Render the RAG chatbot tab"""
@@ -8,8 +17,8 @@ def render_chatbot_tab():
     st.header("RAG Chatbot with Memory")
     st.markdown("Chat with your indexed content using the power of RAG and conversation memory.")
     
-    # Initialize API client
-    api_client = RagAPIClient()
+    # Shared API client with pooled connections
+    api_client = get_api_client()
     
     # Clear chat button
     if st.button("Clear Chat History", key="chat_clear"):
@@ -27,22 +36,11 @@ def render_chatbot_tab():
         add_message_to_memory("user", prompt)
         st.chat_message("user").markdown(prompt)
         
-        # Process with the assistant
+        # Stream the answer from the RAG backend as it is generated
         with st.chat_message("assistant"):
-            message_placeholder = st.empty()
-            message_placeholder.markdown("Thinking...")
-            
-            # Get conversation history from memory
-            conversation_history = get_conversation_history()
-            
-            # Send request to RAG backend
-            result = api_client.chat(prompt, conversation_history)
-            
-            if "error" not in result:
-                response = result.get("response", "")
-                message_placeholder.markdown(response)
-                add_message_to_memory("assistant", response)
-            else:
-                error_message = f"Sorry, I encountered an error: {result.get('error')}"
-                message_placeholder.markdown(error_message)
-                add_message_to_memory("assistant", error_message)
\ No newline at end of file
+            # Only the new message and the session id are sent; the backend keeps the history
+            metadata: Dict[str, Any] = {}
+            response = st.write_stream(_answer_text(api_client.chat_stream(prompt, st.session_state.session_id), metadata))
+            if metadata.get("error"):
+                st.caption("The answer could not be generated completely.")
+            add_message_to_memory("assistant", response or "")
\ No newline at end of file
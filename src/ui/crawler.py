@@ -1,5 +1,37 @@
 import streamlit as st
-from src.api.client import RagAPIClient
+from src.api.client import RagAPIClient, get_api_client
+from src.config import CRAWL_POLL_INTERVAL
+
+def _render_crawl_result(job: dict):
+    """Show the outcome of a finished crawl job"""
+    if job["status"] == "failed":
+        st.error(f"Failed to crawl the URL: {job.get('error')}")
+        return
+    result = job.get("result") or {}
+    for item in result.get("results", []):
+        if item.get("success"):
+            st.success(f"Successfully crawled and indexed: {item['url']}")
+            st.info(f"Chunks created: {item.get('chunk_count', 0)}, Documents indexed: {item.get('indexed_count', 0)}")
+        else:
+            st.error(f"Failed to crawl {item['url']}: {item.get('error')}")
+
+@st.fragment(run_every=CRAWL_POLL_INTERVAL)
+def _render_crawl_progress(api_client: RagAPIClient, job_id: str):
+    """Poll a running crawl job; only this fragment reruns, so the rest of the app stays responsive"""
+    job = api_client.get_crawl_job(job_id)
+    if "status" not in job:
+        st.warning(f"Could not fetch crawl progress: {job.get('error')}")
+        return
+    if job["status"] in ("succeeded", "failed"):
+        # Stop polling and show the result with a full rerun
+        st.session_state.crawl_job = job
+        st.rerun(scope="app")
+    
+    total, done = job.get("total_urls", 0), job.get("pages_done", 0)
+    st.progress(
+        done / total if total else 0.0,
+        text=f"Crawling and indexing ({job['status']}): {done}/{total or '?'} pages fetched, {job.get('indexed_count', 0)} chunks indexed"
+    )
 
 def render_crawler_tab():
     """Render the web crawler tab"""
@@ -7,8 +39,8 @@ def render_crawler_tab():
     st.header("Web Crawler")
     st.markdown("Enter a URL to crawl and index its content for later retrieval.")
     
-    # Initialize API client
-    api_client = RagAPIClient()
+    # Shared API client with pooled connections
+    api_client = get_api_client()
     
     # Use a form to stabilize input position
     with st.form("crawl_form", clear_on_submit=False):
@@ -22,12 +54,19 @@ def render_crawler_tab():
         
         if submit:
             if url:
-                with st.spinner("Crawling and indexing the website..."):
-                    result = api_client.crawl_url(url)
-                    if "error" not in result:
-                        st.success(f"Successfully crawled and indexed: {result.get('url', url)}")
-                        st.info(f"Chunks created: {result.get('chunk_count', 0)}, Documents indexed: {result.get('indexed_count', 0)}")
-                    else:
-                        st.error(f"Failed to crawl the URL: {result.get('error')}")
+                # Crawls run as background jobs on the API, so the UI is not blocked while they run
+                job = api_client.submit_crawl_job(urls=[url])
+                if "job_id" in job:
+                    st.session_state.crawl_job = job
+                else:
+                    st.error(f"Failed to start the crawl: {job.get('error')}")
             else:
-                st.warning("Please enter a URL to crawl")
\ No newline at end of file
+                st.warning("Please enter a URL to crawl")
+    
+    job = st.session_state.get("crawl_job")
+    if job is None:
+        return
+    if job["status"] in ("queued", "running"):
+        _render_crawl_progress(api_client, job["job_id"])
+    else:
+        _render_crawl_result(job)
\ No newline at end of file
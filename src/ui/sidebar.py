@@ -1,5 +1,8 @@
+import math
 import streamlit as st
-from src.utils.memory import get_conversation_history, clear_chat_history
+from src.api.client import get_api_client
+from src.config import MEMORY_PAGE_SIZE
+from src.utils.memory import clear_chat_history
 
 def render_sidebar():
     """Render the sidebar with app info and controls"""
@@ -32,9 +35,18 @@ def render_sidebar():
         st.rerun()
     
     with st.sidebar.expander("View Conversation Memory"):
-        history = get_conversation_history()
-        if history:
-            for item in history:
+        # Fetched from the backend one page at a time
+        page = int(st.number_input("Page", min_value=1, step=1, key="memory_page"))
+        data = get_api_client().get_session_messages(
+            st.session_state.session_id, offset=(page - 1) * MEMORY_PAGE_SIZE, limit=MEMORY_PAGE_SIZE
+        )
+        if "error" in data:
+            st.error(f"Could not load the conversation memory: {data['error']}")
+        elif data["total"]:
+            if data.get("summary"):
+                st.markdown(f"**Summary**: {data['summary']}")
+            for item in data["messages"]:
                 st.markdown(f"**{item['role'].title()}**: {item['content'][:50]}...")
+            st.caption(f"Page {page} of {max(1, math.ceil(data['total'] / MEMORY_PAGE_SIZE))} ({data['total']} messages)")
         else:
             st.write("No conversation history yet.")
\ No newline at end of file
@@ -1,7 +1,12 @@
 #!/bin/bash
 
 # Start FastAPI backend
-uvicorn main:app --host 0.0.0.0 --port 8000 --reload &
+if [ "${ENVIRONMENT:-development}" = "production" ]; then
+    # Multi-worker server, worker count and warm-up come from config/settings.py
+    python main.py &
+else
+    uvicorn main:app --host 0.0.0.0 --port 8000 --reload &
+fi
 
 # Start Streamlit frontend
 streamlit run app.py --server.port 8501 --server.address 0.0.0.0
\ No newline at end of file
@@ -0,0 +1,113 @@
+import asyncio
+import os
+
+for name in ("GOOGLE_API_KEY", "PINECONE_API_KEY", "GEMINI_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+import pytest
+
+from core.admission import BATCH, INTERACTIVE, AdmissionPool, AdmissionRejected, PriorityGate
+
+
+def make_pool(max_concurrency=1, queue_size=1, queue_timeout=1.0):
+    return AdmissionPool("test", max_concurrency, queue_size, queue_timeout, retry_after=2.0)
+
+
+def test_pool_sheds_when_queue_is_full():
+    async def main():
+        pool = make_pool()
+        await pool.acquire()
+        waiting = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await pool.acquire()
+        assert rejected.value.retry_after == 2.0
+
+        pool.release()
+        await waiting
+        assert pool.stats() == {"active": 1, "queued": 0, "rejected": 1}
+
+    asyncio.run(main())
+
+
+def test_pool_rejects_after_queue_timeout_and_frees_the_queue_spot():
+    async def main():
+        pool = make_pool(queue_timeout=0.01)
+        await pool.acquire()
+
+        with pytest.raises(AdmissionRejected):
+            await pool.acquire()
+        assert pool.stats()["queued"] == 0
+
+        pool.release()
+        assert pool.stats()["active"] == 0
+
+    asyncio.run(main())
+
+
+def test_pool_hands_released_slots_to_waiters_in_order():
+    async def main():
+        pool = make_pool(queue_size=2)
+        order = []
+        await pool.acquire()
+
+        async def wait(name):
+            await pool.acquire()
+            order.append(name)
+
+        first, second = asyncio.create_task(wait("first")), asyncio.create_task(wait("second"))
+        await asyncio.sleep(0)
+        pool.release()
+        await first
+        pool.release()
+        await second
+        assert order == ["first", "second"]
+        assert pool.stats()["active"] == 1
+
+    asyncio.run(main())
+
+
+def test_gate_serves_interactive_before_queued_batch():
+    async def main():
+        gate = PriorityGate("llm", limit=1, batch_limit=1)
+        order = []
+
+        async def call(name, lane):
+            async with gate.slot(lane):
+                order.append(name)
+                await asyncio.sleep(0)
+
+        async with gate.slot(INTERACTIVE):
+            batch = asyncio.create_task(call("batch", BATCH))
+            await asyncio.sleep(0)
+            interactive = asyncio.create_task(call("interactive", INTERACTIVE))
+            await asyncio.sleep(0)
+        await asyncio.gather(batch, interactive)
+        assert order == ["interactive", "batch"]
+
+    asyncio.run(main())
+
+
+def test_gate_keeps_slots_free_for_interactive_under_batch_load():
+    async def main():
+        gate = PriorityGate("llm", limit=3, batch_limit=1)
+        release = asyncio.Event()
+        started = []
+
+        async def call(name, lane):
+            async with gate.slot(lane):
+                started.append(name)
+                await release.wait()
+
+        tasks = [asyncio.create_task(call(f"batch-{i}", BATCH)) for i in range(3)]
+        tasks.append(asyncio.create_task(call("interactive", INTERACTIVE)))
+        await asyncio.sleep(0.01)
+        assert started == ["batch-0", "interactive"]
+        assert gate.stats()["queued_batch"] == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert gate.stats() == {"active_interactive": 0, "active_batch": 0, "queued_interactive": 0, "queued_batch": 0}
+
+    asyncio.run(main())
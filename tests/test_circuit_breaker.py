@@ -0,0 +1,69 @@
+import asyncio
+import os
+
+for name in ("GOOGLE_API_KEY", "PINECONE_API_KEY", "GEMINI_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+import pytest
+
+from core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from core.deadline import DeadlineExceeded
+
+
+def fail(breaker, error=ConnectionError("pinecone down")):
+    with pytest.raises(type(error)):
+        with breaker.guard():
+            raise error
+
+
+def test_guard_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker("vectorstore", failure_threshold=2, recovery_timeout=60, half_open_max_calls=1)
+    fail(breaker)
+    assert breaker.state == CLOSED
+    fail(breaker)
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        with breaker.guard():
+            pytest.fail("an open circuit must not call the dependency")
+    assert breaker.rejected == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("vectorstore", failure_threshold=2, recovery_timeout=60, half_open_max_calls=1)
+    fail(breaker)
+    with breaker.guard():
+        pass
+    fail(breaker)
+
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_closes_or_reopens_the_circuit():
+    breaker = CircuitBreaker("embeddings", failure_threshold=1, recovery_timeout=0, half_open_max_calls=1)
+    fail(breaker)
+    fail(breaker)  # the probe fails
+    assert breaker.state == OPEN
+
+    with breaker.guard():
+        assert breaker.state == HALF_OPEN
+    assert breaker.state == CLOSED
+
+
+def test_cancellation_and_deadline_do_not_count_as_failures():
+    breaker = CircuitBreaker("llm.fast", failure_threshold=1, recovery_timeout=60, half_open_max_calls=1)
+    fail(breaker, asyncio.CancelledError())
+    fail(breaker, DeadlineExceeded("Request deadline exceeded"))
+
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
+
+
+def test_cancelled_probe_gives_its_slot_back():
+    breaker = CircuitBreaker("llm.fast", failure_threshold=1, recovery_timeout=0, half_open_max_calls=1)
+    fail(breaker)
+    fail(breaker, asyncio.CancelledError())  # the probe is cancelled
+
+    with breaker.guard():
+        pass
+    assert breaker.state == CLOSED
@@ -0,0 +1,61 @@
+import asyncio
+import os
+
+for name in ("GOOGLE_API_KEY", "PINECONE_API_KEY", "GEMINI_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+import httpx
+
+from core.content_extraction import ContentExtractor, SiteBlockTracker, link_density
+from core.crawler import WebCrawlerManager
+
+MENU_ITEMS = "".join(
+    f"<p>{dish} is slow-cooked with saffron, cardamom and fried onions and served with raita for {price} rupees.</p>"
+    for dish, price in [("Lucknowi biryani", 320), ("Galouti kebab", 280), ("Nihari", 300), ("Sheermal", 60)]
+)
+PAGE = f"""<!DOCTYPE html>
+<html><body>
+<!-- analytics snippet -->
+<nav><ul>
+<li><a href="/">Home</a></li><li><a href="/menu">Menu</a></li><li><a href="/rooms">Rooms</a></li>
+<li><a href="/offers">Offers</a></li><li><a href="/contact">Contact</a></li>
+</ul></nav>
+<main><h1>Dinner menu</h1>{MENU_ITEMS}</main>
+</body></html>"""
+
+
+def fetch_over_http(html: str):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, text=html)
+
+    async def fetch():
+        WebCrawlerManager._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await WebCrawlerManager.fetch_http("https://hotel.example/menu")
+        finally:
+            await WebCrawlerManager.close()
+
+    return asyncio.run(fetch())
+
+
+def test_http_tier_keeps_links_and_drops_comments():
+    page = fetch_over_http(PAGE)
+
+    assert page is not None and page.tier == "http"
+    assert "[Menu](/menu)" in page.markdown
+    assert "analytics snippet" not in page.markdown
+
+
+def test_link_list_from_http_tier_is_removed_on_first_page():
+    markdown = fetch_over_http(PAGE).markdown
+    nav = next(block for block in markdown.split("\n\n") if "[Home](/)" in block)
+    assert link_density(nav) > 0.5
+
+    # A fresh tracker, so only the link-density rule can remove the nav
+    extractor = ContentExtractor(max_link_density=0.5, min_words=25, repeat_min_pages=3,
+                                 tracker=SiteBlockTracker(1000, 3))
+    result = extractor.extract("https://hotel.example/menu", markdown)
+
+    assert result.blocks_removed == 1
+    assert "[Home](/)" not in result.text
+    assert "Galouti kebab" in result.text
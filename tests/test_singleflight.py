@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+for name in ("GOOGLE_API_KEY", "PINECONE_API_KEY", "GEMINI_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+from utils.singleflight import SingleFlight, normalize_url
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight("test")
+    runs = 0
+
+    async def work():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.01)
+        return "biryani"
+
+    async def main():
+        return await asyncio.gather(*[flight.do("menu", work) for _ in range(5)])
+
+    assert asyncio.run(main()) == ["biryani"] * 5
+    assert runs == 1
+    assert flight.coalesced == 4
+
+
+def test_key_is_released_once_the_call_finishes():
+    flight = SingleFlight("test")
+    runs = 0
+
+    async def work():
+        nonlocal runs
+        runs += 1
+        return runs
+
+    async def main():
+        return [await flight.do("menu", work), await flight.do("menu", work)]
+
+    assert asyncio.run(main()) == [1, 2]
+
+
+def test_callers_share_the_exception():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("crawl failed")
+
+    async def main():
+        return await asyncio.gather(*[flight.do("page", work) for _ in range(3)], return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert all(isinstance(error, ValueError) for error in errors)
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.create_task(flight.do("page", work))
+        second = asyncio.create_task(flight.do("page", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_normalize_url_ignores_case_fragment_and_trailing_slash():
+    assert normalize_url("HTTPS://Hotel.Example/menu/#lunch") == normalize_url("https://hotel.example/menu")
@@ -0,0 +1,57 @@
+import os
+
+for name in ("GOOGLE_API_KEY", "PINECONE_API_KEY", "GEMINI_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+from core.text_processing import CHARS_PER_TOKEN, TextProcessor
+
+
+def batch_output(*blocks):
+    return "\n".join(f"<<<RESULT {n}>>>\n{text}\n<<<END RESULT {n}>>>" for n, text in blocks)
+
+
+def test_parse_batch_output_returns_results_in_chunk_order():
+    output = "Here you go:\n" + batch_output((2, "Naan: 40 rupees"), (1, "Biryani: 320 rupees"), (3, "NO_RELEVANT_DATA"))
+
+    assert TextProcessor.parse_batch_output(output, 3) == ["Biryani: 320 rupees", "Naan: 40 rupees", "NO_RELEVANT_DATA"]
+
+
+def test_parse_batch_output_rejects_duplicate_result():
+    output = batch_output((1, "Biryani"), (1, "Kebab"), (2, "Naan"))
+
+    assert TextProcessor.parse_batch_output(output, 2) is None
+
+
+def test_parse_batch_output_rejects_missing_or_extra_result():
+    assert TextProcessor.parse_batch_output(batch_output((1, "Biryani"), (3, "Naan")), 3) is None
+    assert TextProcessor.parse_batch_output(batch_output((1, "Biryani"), (2, "Naan")), 1) is None
+
+
+def test_parse_batch_output_rejects_empty_result():
+    assert TextProcessor.parse_batch_output(batch_output((1, "Biryani"), (2, "  ")), 2) is None
+
+
+def test_parse_batch_output_ignores_mismatched_markers():
+    output = "<<<RESULT 1>>>Biryani<<<END RESULT 2>>>\n" + batch_output((2, "Naan"))
+
+    assert TextProcessor.parse_batch_output(output, 2) is None
+
+
+def test_pack_batches_respects_token_budget_and_chunk_limit():
+    chunks = ["x" * (CHARS_PER_TOKEN * 9)] * 5  # 10 estimated tokens each
+
+    assert TextProcessor.pack_batches(chunks, token_budget=25, max_chunks=10) == [[0, 1], [2, 3], [4]]
+    assert TextProcessor.pack_batches(chunks, token_budget=1000, max_chunks=2) == [[0, 1], [2, 3], [4]]
+
+
+def test_pack_batches_gives_oversized_chunk_its_own_batch():
+    small, large = "x" * CHARS_PER_TOKEN, "x" * (CHARS_PER_TOKEN * 100)
+
+    batches = TextProcessor.pack_batches([small, large, small, small], token_budget=10, max_chunks=10)
+
+    assert batches == [[0], [1], [2, 3]]
+    assert [i for batch in batches for i in batch] == [0, 1, 2, 3]
+
+
+def test_pack_batches_of_nothing_is_empty():
+    assert TextProcessor.pack_batches([], token_budget=10, max_chunks=10) == []
@@ -1,4 +1,5 @@
 """Utilities module for the RAG API."""
 from .logging_utils import setup_logging
+from .singleflight import SingleFlight
 
-__all__ = ["setup_logging"]
\ No newline at end of file
+__all__ = ["setup_logging", "SingleFlight"]
\ No newline at end of file
@@ -0,0 +1,36 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so only the in-process locks apply
+    fcntl = None
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """
+    Hold an exclusive cross-process lock on a sidecar file.
+
+    Append-only logs shared by server workers and scripts take this lock
+    around every append and around any rewrite that replaces the log, so
+    an append can never land on a log that is about to be replaced. The
+    lock file itself is never replaced, which is why it sits beside the log
+    instead of locking the log directly.
+
+    Locks are per open file, so the same process must not nest two
+    file_lock calls on one path; callers take their threading lock first.
+
+    Args:
+        path: Path of the lock file, created if missing
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
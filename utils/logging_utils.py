@@ -1,41 +1,112 @@
+import random
 import sys
-import os
+import uuid
+from contextvars import ContextVar
 from pathlib import Path
 from loguru import logger
 from config.settings import settings
 
+# Id of the request being served, attached to every log record made while serving it
+current_request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Logger for high-volume debug events (per chunk, per search); only LOG_SAMPLE_RATE of them are kept
+sampled_logger = logger.bind(sampled=True)
+
+def _add_request_id(record):
+    record["extra"].setdefault("request_id", current_request_id.get())
+
+def _keep(record) -> bool:
+    return not record["extra"].get("sampled") or random.random() < settings.LOG_SAMPLE_RATE
+
+def preview(text: str, limit: int = None) -> str:
+    """
+    Shorten user-supplied text for logging.
+
+    Args:
+        text: The text to log, e.g. a chat message or query
+        limit: Maximum characters kept; LOG_PREVIEW_CHARS by default
+
+    Returns:
+        The text, cut to the limit with the full length noted when longer
+    """
+    limit = settings.LOG_PREVIEW_CHARS if limit is None else limit
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... ({len(text)} chars)"
+
 def setup_logging():
-    """Configure application logging with loguru."""
+    """
+    Configure application logging with loguru.
+
+    Sinks are enqueued: records are written by a background thread, so log
+    I/O never blocks a request. Production (LOG_JSON) writes one JSON object
+    per record; tracebacks are extended with variable values only when DEBUG
+    is set.
+    """
     # Clear any existing handlers
     logger.remove()
-    
-    # Set up console logging
-    log_format = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
-    
-    # Add console handler with appropriate log level
-    logger.add(
-        sys.stderr,
-        format=log_format,
+    logger.configure(patcher=_add_request_id)
+
+    if settings.LOG_JSON:
+        options = {"serialize": True}
+    else:
+        options = {"format": "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | {extra[request_id]} | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"}
+    options.update(
         level=settings.LOG_LEVEL,
-        backtrace=True,
-        diagnose=True,
+        filter=_keep,
+        enqueue=True,
+        backtrace=settings.DEBUG,
+        diagnose=settings.DEBUG,
     )
-    
+
+    # Add console handler with appropriate log level
+    logger.add(sys.stderr, **options)
+
     # Add file handler for persistent logs
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
-    
+
     logger.add(
         log_dir / "app.log",
         rotation="10 MB",
         retention="1 week",
-        format=log_format,
-        level=settings.LOG_LEVEL,
-        backtrace=True,
-        diagnose=True,
+        **options,
     )
-    
+
     # Log startup information
     logger.info(f"Logging initialized at level {settings.LOG_LEVEL}")
-    
-    return logger
\ No newline at end of file
+
+    return logger
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware giving every HTTP request an id for its log records.
+
+    The id is taken from the REQUEST_ID_HEADER request header when the
+    caller sends one, generated otherwise, and returned in the same header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.header = settings.REQUEST_ID_HEADER.lower().encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = next(
+            (value.decode("latin-1")[:64] for name, value in scope["headers"] if name == self.header),
+            None
+        ) or uuid.uuid4().hex[:16]
+        token = current_request_id.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (self.header, request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            current_request_id.reset(token)
@@ -0,0 +1,57 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+from urllib.parse import urlsplit, urlunsplit
+from loguru import logger
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one in-flight computation.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same task and receive the same result (or
+    exception). Once the task finishes the key is released, so results are
+    never cached beyond the lifetime of the call.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.coalesced = 0
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run func for key, or join the call already in flight for it.
+
+        Args:
+            key: Normalized identity of the unit of work
+            func: Zero-argument coroutine function doing the work
+
+        Returns:
+            The result of the shared computation
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+        else:
+            self.coalesced += 1
+            logger.debug(f"Joined in-flight {self.name} call ({len(self._calls)} distinct keys in flight)")
+        # Shield so one caller disconnecting does not cancel the work for the others
+        return await asyncio.shield(task)
+
+    def _release(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and collapse whitespace for use in coalescing keys."""
+    return " ".join(text.lower().split())
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL for use in coalescing keys (case of scheme/host, fragment, trailing slash)."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))